@@ -3,17 +3,33 @@
 import configparser
 import logging
 import os
+import re
 import runpy
 import textwrap
 import time
 from collections import namedtuple
+from functools import partial
 from enum import Enum
 from pathlib import Path
 
 import dotenv
 import pandas as pd
 
+from .distros import Distro, SQLDistroNotFound, SQLite
+from .plan import BuildPlan, plan_key
+from .report import BuildReport
+from .results import (
+    QueryResult,
+    ResultRegistry,
+    SpilledResult,
+    StreamedResult,
+    frame_bytes,
+    materialize,
+)
+from .schedule import BuildGraph, ParallelScheduler, Resource
 from .sql import Channel, Script, Table, execute
+from .state import STATE_DIR
+from .toolbox import is_true, parse_size
 
 logger = logging.getLogger(__name__)
 logger.debug(__name__)
@@ -33,6 +49,7 @@ class Verb(Enum):
     ECHO = "echo"
     EXECUTE = "execute"
     EXIST = "exist"
+    TRANSFER = "transfer"
 
 
 def get_verb(raw):
@@ -60,6 +77,7 @@ class Target(Enum):
     XLSX = ".xlsx"
     RAWQUERY = "SQL query"
     SQLTABLE = "SQL table"
+    RESULT = "named result"
     ANY = "(all)"
 
     @classmethod
@@ -67,6 +85,9 @@ class Target(Enum):
 
         content = str(raw_content).strip()
 
+        if content.startswith("@"):
+            return Target.RESULT
+
         if ";" in content or "\n" in content:
             return Target.RAWQUERY
 
@@ -91,32 +112,121 @@ class TaskExecutionError(RuntimeError):
 
 
 class TaskList:
-    """TaskList
+    """Tasks loaded from a build INI, section by section, and executed in turn
+
+    The options a build INI may set are described in the docs (see
+    "Build options").
 
-    .. todo:: Implement cache_results=False
+    :param targets: Build only these sections, along with those upstream.
+    :param tags: Build only sections tagged with any of these, likewise.
+    :param use_plan: Keep the tasks as a :class:`laforge.plan.BuildPlan`,
+        loading them from there while the INI and .env are unchanged.
     """
 
     _SQL_KEYS = ["distro", "server", "database", "schema"]
     _KNOWN_DIRS = {f"{verb.value}_dir": verb for verb in Verb}
 
-    def __init__(self, from_string, location="."):
-
-        self.parser = configparser.ConfigParser(
-            interpolation=configparser.ExtendedInterpolation(), strict=False
-        )
+    def __init__(
+        self, from_string, location=".", targets=None, tags=None, use_plan=False
+    ):
 
-        self.parser.read_string(from_string)
+        self.from_string = from_string
+        self._parser = None
         self.location = Path(location).resolve(strict=True)
 
-        self.env_config = load_env(self.location)
+        env_path = find_env(self.location)
+        self.env_config = dotenv.dotenv_values(env_path) if env_path else {}
 
-        self.config = self.load_section_config("DEFAULT")
-
-        self.tasks = list(self.load_tasks())
-        logger.debug("Loaded %s tasks.", len(self.tasks))
+        if use_plan:
+            self.plan = self.load_plan(env_path, targets, tags)
+        else:
+            self.plan = None
+            self.config = self.load_section_config("DEFAULT")
+            self.tasks = self.load_selected_tasks(targets, tags)
         self.prior_results = None
+        self.state = None
+        self.cache = None
+        self.checkpoint = None
+        self.catalog = None
+        self.report = BuildReport()
+        self._skip = set()
+
+        max_memory = self.config.get("max_memory")
+        self.registry = ResultRegistry(
+            max_bytes=parse_size(max_memory) if max_memory else None,
+            spill_dir=self.config["build_dir"] / STATE_DIR / "spill",
+        )
+        for task in self.tasks:
+            task.registry = self.registry
 
-    def load_tasks(self):
+    @property
+    def parser(self):
+        if self._parser is None:
+            self._parser = configparser.ConfigParser(
+                interpolation=configparser.ExtendedInterpolation(), strict=False
+            )
+            self._parser.read_string(self.from_string)
+        return self._parser
+
+    def load_plan(self, env_path=None, targets=None, tags=None):
+        """Take config and tasks from the plan kept on disk, compiling it if need be"""
+        path = BuildPlan.path_in(self.location)
+        key = plan_key(self.from_string, self.location, env_path, targets, tags)
+        plan = BuildPlan.load(path, key, env=self.env_config)
+        if plan:
+            self.config = plan.config
+            self.tasks = plan.construct(Task.from_qualified)
+            logger.debug("Loaded %s tasks from %s.", len(self.tasks), path)
+            return plan
+        self.config = self.load_section_config("DEFAULT")
+        self.tasks = self.load_selected_tasks(targets, tags)
+        plan = BuildPlan.compile(key, self.config, self.tasks)
+        plan.save(path, env=self.env_config)
+        return plan
+
+    def load_selected_tasks(self, targets=None, tags=None):
+        selected = self.select_sections(targets, tags)
+        tasks = list(self.load_tasks(until=selected[-1] if selected else None))
+        logger.debug("Loaded %s tasks.", len(tasks))
+        if selected:
+            tasks = self.with_upstream(tasks, selected)
+        return tasks
+
+    def select_sections(self, targets=None, tags=None):
+        """Sections named in targets or tagged with any of tags, in INI order"""
+        if not targets and not tags:
+            return []
+        targets, tags = set(targets or ()), set(tags or ())
+        sections = [x for x in self.parser if x != self.parser.default_section]
+        missing = targets.difference(sections)
+        if missing:
+            raise TaskConstructionError(
+                f"No such section(s) to build: {', '.join(sorted(missing))}"
+            )
+        selected = [
+            section
+            for section in sections
+            if section in targets
+            or tags.intersection(parse_tags(self.parser[section].get("tags")))
+        ]
+        if not selected:
+            raise TaskConstructionError(f"No section tagged {', '.join(sorted(tags))}")
+        return selected
+
+    @staticmethod
+    def with_upstream(tasks, selected):
+        """Tasks of the selected sections and whatever they depend upon"""
+        graph = BuildGraph(tasks)
+        keep = graph.closure(s for s in selected if s in graph.upstream)
+        logger.info(
+            "Building %s of %s sections loaded: %s",
+            len(keep),
+            len(graph),
+            ", ".join(s.name for s in graph.sections if s.name in keep),
+        )
+        return [task for task in tasks if task.config["section"] in keep]
+
+    def load_tasks(self, until=None):
         skip_to_start = self.parser.has_section("start")
         if skip_to_start:
             logger.warning("Starting execution at section [start].")
@@ -135,23 +245,26 @@ class TaskList:
                     section,
                 )
                 break
-            section_config = self.load_section_config(section)
-            section_config["section"] = section
-            # Each section can have up to 1 of each verb as a key
-            for option in self.parser[section]:
-                if not is_verb(option):
-                    continue
-                raw_content = self.parser[section][option]
-                if raw_content is None:
-                    continue
-                templated_content = self.template_content(raw_content, section_config)
-                task = Task.from_strings(
-                    raw_verb=option,
-                    raw_content=templated_content,
-                    config=section_config,
-                )
-                logger.debug(task)
-                yield task
+            yield from self.load_section_tasks(section)
+            if section == until:
+                break
+
+    def load_section_tasks(self, section):
+        section_config = self.load_section_config(section)
+        section_config["section"] = section
+        # Each section can have up to 1 of each verb as a key
+        for option in self.parser[section]:
+            if not is_verb(option):
+                continue
+            raw_content = self.parser[section][option]
+            if raw_content is None:
+                continue
+            templated_content = self.template_content(raw_content, section_config)
+            task = Task.from_strings(
+                raw_verb=option, raw_content=templated_content, config=section_config
+            )
+            logger.debug(task)
+            yield task
 
     @classmethod
     def template_content(cls, content, config):
@@ -194,26 +307,172 @@ class TaskList:
         )
         return section_config
 
-    def execute(self):
+    def execute(
+        self,
+        jobs=1,
+        state=None,
+        cache=None,
+        profile_dir=None,
+        checkpoint=None,
+        stream=False,
+        catalog=None,
+    ):
         """Execute each task in the list.
 
+        :param jobs: Run up to this many sections at once, each as soon as
+            those it depends on have finished.
+        :param state: :class:`laforge.state.BuildState` whose up-to-date
+            sections are skipped.
+        :param cache: :class:`laforge.cache.ResultCache` to take cacheable
+            reads from.
+        :param profile_dir: Profile each task into this directory.
+        :param checkpoint: :class:`laforge.checkpoint.Checkpoint` to record
+            progress in and resume from.
+        :param stream: Read every section as if set to ``stream: true``.
+        :param catalog: :class:`laforge.catalog.SchemaCatalog` of the column
+            types of tables written.
+
         .. todo::
 
             Restore quiet?
 
         """
-        n_tasks = len(self)
-        for i, task in enumerate(self.tasks):
-            log_prefix = f"Task {i + 1} of {n_tasks}: "
-            log_intro = f"{log_prefix}{task.identifier} {task.description}"
-
-            logger.info(log_intro)
-            # Rotate results during implementation
-            self.prior_results = task.implement(self.prior_results)
+        if jobs > 1 and any(uses_memory_database(task) for task in self.tasks):
+            logger.warning(
+                "In-memory SQLite cannot be shared between threads; "
+                "executing one section at a time."
+            )
+            jobs = 1
+        if jobs > 1 and profile_dir:
+            logger.warning("Profiling tasks one section at a time.")
+            jobs = 1
+        self.state = state
+        self.cache = cache
+        self.checkpoint = checkpoint
+        self.catalog = catalog
+        for task in self.tasks:
+            task.streaming = stream or is_true(task.config.get("stream", False))
+            task.catalog = catalog
+        self.prior_results = None
+        self.report = BuildReport(profile_dir=profile_dir)
+        graph = BuildGraph(self.tasks)
+        for section in graph.sections:
+            for reader, writer in zip(section.tasks, section.tasks[1:]):
+                reader.pushdown = can_push_down(reader, writer)
+        self._skip = state.plan(graph) if state else set()
+        self._expect_results(graph)
+        profiled = use_sqlite_profiles(self.tasks)
+        try:
+            if jobs > 1:
+                logger.info("Executing %s sections with %s jobs.", len(graph), jobs)
+                scheduler = ParallelScheduler(graph, jobs=jobs)
+                self.prior_results = scheduler.run(self._execute_section)
+            else:
+                for section in graph.sections:
+                    # Rotate results during implementation
+                    self.prior_results = self._execute_section(
+                        section, self.prior_results
+                    )
+            if checkpoint is not None:
+                checkpoint.clear()
+        finally:
+            for engine in profiled:
+                SQLite.restore(engine)
+            self.report.finish()
+            self.registry.clear()
+            if state:
+                state.save()
+            if catalog is not None:
+                catalog.save()
+
+    def _expect_results(self, graph):
+        readers = {}
+        for section in graph.sections:
+            if section.name in self._skip:
+                continue
+            for task in section.tasks:
+                if self.checkpoint is not None and self.checkpoint.done(task):
+                    continue
+                if task.verb is Verb.READ and task.target is Target.RESULT:
+                    readers[task.result_name] = readers.get(task.result_name, 0) + 1
+        for name, count in readers.items():
+            self.registry.expect(name, count)
+
+    def _execute_section(self, section, prior_results=None):
+        if section.name in self._skip:
+            self.report.skip(section.name)
+            return None
+        if self.state:
+            self.state.forget(section)
+        for task in section.tasks:
+            if self.checkpoint is not None and self.checkpoint.done(task):
+                prior_results = self._resume(task)
+                continue
+            results = self._implement(task, prior_results, section)
+            if self.checkpoint is not None:
+                self.checkpoint.record(task, prior_results, results)
+            prior_results = results
+        if self.state:
+            self.state.record(section)
+        return prior_results
+
+    def _resume(self, task):
+        """Results as handed on by a task completed in an earlier build"""
+        logger.info("Already complete: %s", task.identifier)
+        results = self.checkpoint.result_of(task)
+        if task.verb is Verb.WRITE and task.target is Target.RESULT:
+            if self.registry.readers(task.result_name):
+                task.implement(results)
+            return None
+        return results
+
+    def _implement(self, task, prior_results, section):
+        log_prefix = f"Task {self.tasks.index(task) + 1} of {len(self)}: "
+        log_intro = f"{log_prefix}{task.identifier} {task.description}"
+
+        logger.info(log_intro)
+        with self.report.measure(task, section.name, prior_results) as measurement:
+            cache_key = self._cache_key(task, section)
+            if cache_key:
+                max_age = task.config.get("cache_max_age")
+                results = self.cache.get(cache_key, max_age=max_age and float(max_age))
+                if results is not None:
+                    logger.info(
+                        "%sReused cached result of %s", log_prefix, task.identifier
+                    )
+                    measurement.cached = True
+                    measurement.results = results
+                    return results
+            results = task.implement(prior_results)
+            if cache_key and isinstance(results, pd.DataFrame):
+                self.cache.put(cache_key, results, label=task.identifier)
             logger.debug("%s complete", log_prefix)
+            measurement.results = self._spill(task, results)
+            return measurement.results
+
+    def _spill(self, task, results):
+        """Move results beyond the spill_threshold out of memory"""
+        threshold = task.config.get("spill_threshold")
+        if not threshold or frame_bytes(results) <= parse_size(threshold):
+            return results
+        return SpilledResult(
+            results,
+            directory=self.config["build_dir"] / STATE_DIR / "spill",
+            chunksize=task.config.get("spill_chunksize", 100000),
+        )
+
+    def _cache_key(self, task, section):
+        if self.cache is None or self.state is None or not task.cacheable:
+            return None
+        fingerprint = self.state.fingerprints.get(section.name)
+        if not fingerprint:
+            return None
+        return self.cache.key(task, fingerprint["key"])
 
-    def dry_run(self):
+    def dry_run(self, state=None):
         """List each task in the list. """
+        if state:
+            state.plan(BuildGraph(self.tasks))
         for i, task in enumerate(self.tasks):
             logger.info(f"{(i + 1):>2}/{len(self)}: {str(task)}")
 
@@ -310,10 +569,67 @@ class BaseTask:
         self.content = content
         self.config = config
         self.description = config.get("description", "")
+        self.registry = None
+        self.streaming = is_true(config.get("stream", False))
+        self.pushdown = False
+        self.catalog = None
 
     def implement(self, prior_results=None):
         raise NotImplementedError
 
+    @property
+    def resource(self):
+        """What the content refers to, for working out dependencies between tasks"""
+        return None
+
+    @property
+    def inputs(self):
+        if self.verb in (Verb.READ, Verb.EXIST) and self.resource:
+            return {self.resource}
+        return set()
+
+    @property
+    def outputs(self):
+        if self.verb in (Verb.WRITE, Verb.EXECUTE) and self.resource:
+            return {self.resource}
+        return set()
+
+    @property
+    def consumes_results(self):
+        """Whether the task makes use of prior results"""
+        return self.verb is Verb.WRITE
+
+    @property
+    def produces(self):
+        """Outputs certain to be written, unlike whatever a script may touch"""
+        if self.verb is Verb.EXECUTE:
+            return set()
+        return self.outputs
+
+    @property
+    def reads_unknown(self):
+        """Whether the task may read anything, which cannot be fingerprinted"""
+        return False
+
+    @property
+    def source_files(self):
+        """Files whose content determines what the task does"""
+        return []
+
+    @property
+    def chunksize(self):
+        """Rows per chunk when streaming"""
+        return int(self.config.get("stream_chunksize", 100000))
+
+    @property
+    def cacheable(self):
+        """Whether results may be kept in (and taken from) a result cache"""
+        return self.verb is Verb.READ and is_true(self.config.get("cache", False))
+
+    def output_stamp(self):
+        """JSON-friendly snapshot of the task's output; None if it is missing"""
+        return ""
+
     @property
     def path(self):
         """For handlers where dir[verb] + content = path"""
@@ -354,13 +670,63 @@ class FileReader(BaseTask):
         Target.XLSX: FileCall(method="read_excel", kwargs={}),  # kwargs={"dtype"}),
     }
 
+    @property
+    def resource(self):
+        return file_resource(self.path)
+
+    @property
+    def source_files(self):
+        return [self.path]
+
     def implement(self, prior_results=None):
         logger.debug("Reading %s", self.path)
         method, kwargs = self.filetypes[self.target]
+        if self.streaming and self.target is Target.CSV:
+            logger.info("Streaming %s", self.path)
+            return StreamedResult(self._read_csv_chunks, label=str(self.path))
         df = getattr(pd, method)(self.path, **kwargs)
         logger.info("Read %s", self.path)
         return df
 
+    def _read_csv_chunks(self):
+        _, kwargs = self.filetypes[Target.CSV]
+        reader = pd.read_csv(self.path, chunksize=self.chunksize, **kwargs)
+        try:
+            yield from reader
+        finally:
+            reader.close()
+
+
+@Task.register(Verb.READ, Target.RESULT)
+@Task.register(Verb.WRITE, Target.RESULT)
+class ResultKeeper(BaseTask):
+    """Keep prior results by name (write: @name) for later (read: @name)"""
+
+    @property
+    def result_name(self):
+        return self.content.lstrip("@").strip()
+
+    @property
+    def resource(self):
+        return Resource("result", None, self.result_name)
+
+    def implement(self, prior_results=None):
+        if self.verb is Verb.WRITE:
+            self.validate_results(prior_results)
+            self.registry.put(self.result_name, prior_results)
+            logger.info("Kept results as @%s", self.result_name)
+            return None
+        try:
+            df = self.registry.take(self.result_name)
+        except KeyError as err:
+            raise TaskExecutionError(*err.args)
+        logger.info("Read @%s", self.result_name)
+        return df
+
+    @property
+    def path(self):
+        return self.content
+
 
 @Task.register(Verb.EXECUTE, Target.PY)
 class InternalPythonExecutor(BaseTask):
@@ -374,12 +740,26 @@ class InternalPythonExecutor(BaseTask):
 
     """
 
+    consumes_results = True
+
+    @property
+    def source_files(self):
+        return [self.path]
+
+    @property
+    def outputs(self):
+        # The script could touch anything at all
+        return {Resource.everything()}
+
     def implement(self, prior_results=None):
 
         logger.debug("Running %s", self.path)
         runpy.run_path(
             str(self.path),
-            init_globals={"config": self.config, "prior_results": prior_results},
+            init_globals={
+                "config": self.config,
+                "prior_results": materialize(prior_results),
+            },
             run_name="laforge",
         )
         logger.info("Executed: %s", self.path)
@@ -397,11 +777,28 @@ class Echoer(BaseTask):
 @Task.register(Verb.READ, Target.RAWQUERY)
 @Task.register(Verb.EXECUTE, Target.RAWQUERY)
 class SQLQueryReader(BaseTask):
+    @property
+    def resource(self):
+        return sql_resource(self.config)
+
     def implement(self, prior_results=None):
         logger.debug("Reading from %s", self.short_content)
         fetch = "df"
         if self.verb is Verb.EXECUTE:
             fetch = False
+        elif self.pushdown:
+            logger.info("Leaving %s on the server", self.short_content)
+            return QueryResult(
+                Channel(**self.config["sql"]), self.content, chunksize=self.chunksize
+            )
+        elif self.streaming:
+            channel = Channel(**self.config["sql"])
+            logger.info("Streaming from %s", self.short_content)
+            return StreamedResult(
+                partial(channel.read_chunks, self.content, chunksize=self.chunksize),
+                label=self.short_content,
+                channel=channel,
+            )
         df = execute(self.content, channel=Channel(**self.config["sql"]), fetch=fetch)
         logger.info("Read in from %s", self.short_content)
         return df
@@ -409,6 +806,18 @@ class SQLQueryReader(BaseTask):
 
 @Task.register(Verb.EXECUTE, Target.SQL)
 class SQLExecutor(BaseTask):
+    @property
+    def resource(self):
+        return sql_resource(self.config)
+
+    @property
+    def reads_unknown(self):
+        return True
+
+    @property
+    def source_files(self):
+        return [self.path]
+
     def implement(self, prior_results=None):
         query = self.path.read_text()
         query_len = query.count("\n")
@@ -421,21 +830,179 @@ class SQLExecutor(BaseTask):
 @Task.register(Verb.READ, Target.SQLTABLE)
 @Task.register(Verb.WRITE, Target.SQLTABLE)
 class SQLReaderWriter(BaseTask):
+    @property
+    def resource(self):
+        return sql_resource(self.config, self.content)
+
+    def output_stamp(self):
+        if self.verb is not Verb.WRITE:
+            return ""
+        try:
+            table = Table(self.content, channel=Channel(**self.config["sql"]))
+            exists = table.exists()
+        except Exception as err:  # pylint: disable=broad-except
+            logger.debug("Could not check %s: %s", self.content, err)
+            return None
+        return "exists" if exists else None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # pylint: disable=pointless-statement # Each validates the config
+        if self.verb is Verb.WRITE:
+            self.write_chunksize
+            self.write_method
+            self.write_workers
+        else:
+            self.read_partitions
+
+    @property
+    def write_chunksize(self):
+        """Rows per INSERT batch, ``"auto"`` to tune it while writing, or None"""
+        raw = self.config.get("write_chunksize")
+        if raw is None or not str(raw).strip():
+            return None
+        if str(raw).strip().lower() == "auto":
+            return "auto"
+        try:
+            chunksize = int(raw)
+        except ValueError:
+            chunksize = 0
+        if chunksize < 1:
+            raise TaskConstructionError(
+                f"write_chunksize of [{self.config.get('section')}] must be "
+                f"a whole number of rows, at least 1, or auto; not {raw!r}"
+            )
+        return chunksize
+
+    @property
+    def write_method(self):
+        """``"multi"`` for INSERT statements of many rows each, or None"""
+        raw = self.config.get("write_method")
+        if raw is None or not str(raw).strip():
+            return None
+        if str(raw).strip().lower() != "multi":
+            raise TaskConstructionError(
+                f"write_method of [{self.config.get('section')}] must be "
+                f"multi or left blank; not {raw!r}"
+            )
+        return "multi"
+
+    @property
+    def write_workers(self):
+        """Connections to write the table over at once"""
+        raw = self.config.get("write_workers", 1)
+        try:
+            workers = int(raw)
+        except ValueError:
+            workers = 0
+        if workers < 1:
+            raise TaskConstructionError(
+                f"write_workers of [{self.config.get('section')}] must be "
+                f"a whole number, at least 1; not {raw!r}"
+            )
+        return workers
+
+    @property
+    def read_partitions(self):
+        """Ranges to read the table in at once, each over its own connection"""
+        raw = self.config.get("read_partitions", 1)
+        try:
+            partitions = int(raw)
+        except ValueError:
+            partitions = 0
+        if partitions < 1:
+            raise TaskConstructionError(
+                f"read_partitions of [{self.config.get('section')}] must be "
+                f"a whole number, at least 1; not {raw!r}"
+            )
+        return partitions
+
+    def partition_column(self, table):
+        """Column named by ``partition_column``, checked against the table; or None"""
+        column = self.config.get("partition_column") or None
+        if column is not None and column not in table.metal.columns:
+            raise KeyError(
+                f"partition_column of [{self.config.get('section')}] is {column!r}, "
+                f"which is not a column of {table}"
+            )
+        return column
+
     def implement(self, prior_results=None):
         table = Table(self.content, channel=Channel(**self.config["sql"]))
         if self.verb is Verb.WRITE:
             logger.debug("Writing %s", table)
             self.validate_results(prior_results)
-            table.write(prior_results)
+            table.write(
+                prior_results,
+                chunksize=self.write_chunksize,
+                method=self.write_method,
+                workers=self.write_workers,
+                inference={"sample": int(self.config.get("infer_sample", 0)) or None},
+                catalog=self.catalog,
+            )
             logger.info("Wrote %s", table)
             return None
 
+        if self.pushdown:
+            logger.info("Leaving %s on the server", table)
+            return QueryResult.of_table(table, chunksize=self.chunksize)
+        if self.streaming:
+            logger.info("Streaming %s", table)
+            return StreamedResult(
+                partial(table.read_chunks, chunksize=self.chunksize),
+                label=str(table),
+                channel=table.channel,
+            )
         logger.debug("Reading %s", table)
-        df = table.read()
+        partitions = self.read_partitions
+        df = table.read(
+            partitions=partitions,
+            partition_column=self.partition_column(table) if partitions > 1 else None,
+        )
         logger.info("Read %s", table)
         return df
 
 
+@Task.register(Verb.TRANSFER)
+class SQLTransfer(BaseTask):
+    """Copy a table from another channel, row by row, without pandas
+
+    ``transfer = source -> destination`` (or just ``source``, keeping its name)
+    reads over the channel given by ``source_distro``, ``source_server``,
+    ``source_database``, and ``source_schema``, writing to the section's own.
+    """
+
+    _SOURCE_KEYS = [f"source_{k}" for k in TaskList._SQL_KEYS]
+
+    @property
+    def source_sql(self):
+        return {k[len("source_") :]: self.config.get(k) for k in self._SOURCE_KEYS}
+
+    @property
+    def names(self):
+        source, _, destination = self.content.partition("->")
+        source = source.strip()
+        return source, destination.strip() or source.split(".")[-1]
+
+    @property
+    def inputs(self):
+        return {sql_resource({"sql": self.source_sql}, self.names[0])}
+
+    @property
+    def outputs(self):
+        return {sql_resource(self.config, self.names[1])}
+
+    def implement(self, prior_results=None):
+        source_name, destination_name = self.names
+        if not self.source_sql["distro"]:
+            raise TaskExecutionError(f"No source_distro to transfer {source_name} from")
+        source = Table(source_name, channel=Channel(**self.source_sql))
+        destination = Table(destination_name, channel=Channel(**self.config["sql"]))
+        logger.debug("Transferring %s to %s", source, destination)
+        rows = destination.transfer_from(source, chunksize=self.chunksize)
+        logger.info("Transferred %s rows from %s to %s", rows, source, destination)
+
+
 @Task.register(Verb.WRITE, Target.CSV)
 @Task.register(Verb.WRITE, Target.HTML)
 @Task.register(Verb.WRITE, Target.XLSX)
@@ -457,6 +1024,17 @@ class FileWriter(BaseTask):
         ),
     }
 
+    @property
+    def resource(self):
+        return file_resource(self.path)
+
+    def output_stamp(self):
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
     def implement(self, prior_results=None):
         logger.debug("Writing %s", self.path)
         self.validate_results(prior_results)
@@ -465,22 +1043,16 @@ class FileWriter(BaseTask):
 
     @classmethod
     def write(cls, *, path, target, df, retry_attempts=3, retry_seconds=5):
-        logger.debug(
-            f"Preparing to write {len(df):,} rows, {len(df.columns)} columns to {path}"
-        )
-
-        pd.set_option("display.max_colwidth", 100)  # Weirdly affects html output
-
-        if df.empty:
-            logger.warning(f"Writing an empty dataset to {path}")
+        if target is Target.CSV and hasattr(df, "export_csv"):
+            write_file = cls._exporter(path, df)
+        else:
+            write_file = cls._writer(path, target, df)
         if not path.parent.exists():
             path.parent.mkdir(parents=True)
 
-        method, kwargs = cls.filetypes[target]
-
         for i in range(retry_attempts):
             try:
-                getattr(df, method)(path, **kwargs)
+                write_file()
                 return None
             except PermissionError:
                 error_message = (
@@ -497,9 +1069,57 @@ class FileWriter(BaseTask):
             time.sleep(retry_seconds)
         raise PermissionError(f"Permission denied to {path}")
 
+    @staticmethod
+    def _exporter(path, df):
+        """Export rows left on the server straight to CSV"""
+        logger.debug(f"Preparing to export {df} to {path}")
+        return partial(df.export_csv, path)
+
+    @classmethod
+    def _writer(cls, path, target, df):
+        if hasattr(df, "chunks"):
+            logger.debug(f"Preparing to write {len(df.columns)} columns to {path}")
+        else:
+            logger.debug(
+                f"Preparing to write {len(df):,} rows, {len(df.columns)} columns "
+                f"to {path}"
+            )
+
+        pd.set_option("display.max_colwidth", 100)  # Weirdly affects html output
+
+        if df.empty:
+            logger.warning(f"Writing an empty dataset to {path}")
+
+        method, kwargs = cls.filetypes[target]
+        if not hasattr(df, "chunks"):
+            return partial(getattr(df, method), path, **kwargs)
+        if target is Target.CSV:
+            return partial(cls._write_csv_chunks, path, df, kwargs)
+        return partial(getattr(materialize(df), method), path, **kwargs)
+
+    @staticmethod
+    def _write_csv_chunks(path, chunked, kwargs):
+        chunks = chunked.chunks()
+        next(chunks, pd.DataFrame(columns=chunked.columns)).to_csv(path, **kwargs)
+        for chunk in chunks:
+            chunk.to_csv(path, mode="a", header=False, **kwargs)
+
 
 @Task.register(Verb.EXIST)
 class ExistenceChecker(BaseTask):
+    @property
+    def inputs(self):
+        resources = set()
+        for line in (s.strip() for s in self.content.splitlines()):
+            target = Target.parse(line)
+            if target is Target.SQLTABLE:
+                resources.add(sql_resource(self.config, line))
+            elif target is Target.RAWQUERY:
+                resources.add(sql_resource(self.config))
+            elif line:
+                resources.add(file_resource(self.config["build_dir"] / line))
+        return resources
+
     def implement(self, prior_results=None):
         # Ensure that some content exists in these lines
         lines = [s for s in self.content.splitlines() if s.strip()]
@@ -529,6 +1149,74 @@ class ExistenceChecker(BaseTask):
         assert not df.empty
 
 
+def file_resource(path):
+    return Resource("file", None, str(Path(path).resolve()))
+
+
+def sql_resource(config, name=None):
+    """Resource for a table -- or with no name, anything -- through the SQL config
+
+    SQLite locks the entire database file, so its tables are never told apart.
+    """
+    sql = config.get("sql", {})
+    try:
+        distro = Distro(sql.get("distro")).name
+    except SQLDistroNotFound:
+        distro = str(sql.get("distro"))
+    scope = (distro, sql.get("server"), sql.get("database"))
+    if name is None or distro == SQLite.name:
+        return Resource("sql", scope, None)
+    name = str(name).strip().lower()
+    if "." not in name and sql.get("schema"):
+        name = f"{sql['schema']}.{name}".lower()
+    return Resource("sql", scope, name)
+
+
+def uses_memory_database(task):
+    return any(
+        r.kind == "sql" and r.scope[0] == SQLite.name and SQLite.is_memory(r.scope[2])
+        for r in task.inputs | task.outputs
+    )
+
+
+def can_push_down(reader, writer):
+    """Whether a SQL read can stay on the server for the following write
+
+    Tables are copied to tables on the same channel, and tables or queries are
+    exported to CSV.
+    """
+    if reader.verb is not Verb.READ or writer.verb is not Verb.WRITE:
+        return False
+    if not is_true(reader.config.get("pushdown", True)):
+        return False
+    to_csv = isinstance(writer, FileWriter) and writer.target is Target.CSV
+    if isinstance(reader, SQLQueryReader):
+        return to_csv
+    if isinstance(reader, SQLReaderWriter):
+        return to_csv or (
+            isinstance(writer, SQLReaderWriter)
+            and reader.config["sql"] == writer.config["sql"]
+        )
+    return False
+
+
+def use_sqlite_profiles(tasks):
+    """Apply the ``sqlite_profile`` of each SQLite database; return engines changed"""
+    engines = {}
+    for task in tasks:
+        profile = task.config.get("sqlite_profile")
+        sql = task.config.get("sql", {})
+        if not profile or sql_resource(task.config).scope[0] != SQLite.name:
+            continue
+        if SQLite.is_memory(sql.get("database")):
+            continue
+        engine = Channel(**sql).engine
+        if engine not in engines:
+            SQLite.use_profile(engine, profile)
+            engines[engine] = profile
+    return list(engines)
+
+
 class DirectoryVisit:
     def __init__(self, path):
         self.old = Path(".").resolve()
@@ -544,16 +1232,25 @@ class DirectoryVisit:
             os.chdir(self.old)
 
 
-def load_env(path):
-    """Get .env values without dotenv's default to silently pull package dir"""
+def parse_tags(raw):
+    return {tag for tag in re.split(r"[,\s]+", raw or "") if tag}
+
+
+def find_env(path):
+    """Path of the .env applying to path, or None"""
     with DirectoryVisit(path):
         try:
-            env_config = dotenv.dotenv_values(
-                dotenv.find_dotenv(usecwd=True, raise_error_if_not_found=True)
-            )
+            return Path(dotenv.find_dotenv(usecwd=True, raise_error_if_not_found=True))
         except IOError:
-            env_config = {}
-    return env_config
+            return None
+
+
+def load_env(path):
+    """Get .env values without dotenv's default to silently pull package dir"""
+    env_path = find_env(path)
+    if env_path is None:
+        return {}
+    return dotenv.dotenv_values(env_path)
 
 
 """
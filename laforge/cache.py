@@ -0,0 +1,201 @@
+"""On-disk cache of DataFrames read during builds, evicting least recently used.
+
+Frames are stored as Parquet when pyarrow is available, otherwise pickled.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from .state import STATE_DIR, digest
+
+logger = logging.getLogger(__name__)
+logger.debug(__name__)
+
+try:
+    import pyarrow  # noqa: F401 pylint: disable=unused-import
+
+    FRAME_SUFFIX = ".parquet"
+except ImportError:
+    FRAME_SUFFIX = ".pickle"
+
+DEFAULT_CACHE_SIZE = "2GB"
+
+
+def save_frame(df, path):
+    """Save DataFrame to path; returns the path actually used
+
+    Parquet cannot hold every DataFrame (e.g., mixed object columns), so any that
+    fail are pickled instead.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".parquet":
+        try:
+            df.to_parquet(path, index=True)
+            return path
+        except Exception as err:  # pylint: disable=broad-except
+            logger.debug("Falling back to pickle for %s: %s", path, err)
+            if path.exists():
+                path.unlink()
+            path = path.with_suffix(".pickle")
+    df.to_pickle(path)
+    return path
+
+
+def load_frame(path):
+    path = Path(path)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+class ResultCache:
+    """Content-addressed results, each a frame file alongside a JSON description.
+
+    :param directory: Where to keep cached results.
+    :param max_bytes: Evict least recently used results beyond this total.
+    :param refresh: Ignore existing results, but store new ones.
+    :param keep_in_memory: Also hold results in memory, for builds run again and
+        again by one process (e.g., ``laforge build --watch``).
+    """
+
+    def __init__(self, directory, max_bytes, refresh=False, keep_in_memory=False):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.keep_in_memory = keep_in_memory
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def in_build_dir(cls, build_dir, **kwargs):
+        return cls(Path(build_dir) / STATE_DIR / "cache", **kwargs)
+
+    @staticmethod
+    def key(task, fingerprint):
+        return digest(task.identifier, task.verb.value, task.content, fingerprint)
+
+    def get(self, key, max_age=None):
+        """Cached DataFrame for key, or None"""
+        entry = self._read_entry(key)
+        if self.refresh or entry is None:
+            return None
+        if max_age is not None and time.time() - entry["created"] > max_age:
+            logger.debug("Cached result %s too old to use.", key)
+            return None
+        df = self._frames.get(key)
+        if df is None:
+            try:
+                df = load_frame(self.directory / entry["file"])
+            except (OSError, ValueError) as err:
+                logger.warning("Discarding unreadable cached result %s: %s", key, err)
+                self.remove(key)
+                return None
+            if self.keep_in_memory:
+                self._frames[key] = df
+        entry["used"] = time.time()
+        self._write_entry(key, entry)
+        return df.copy() if self.keep_in_memory else df
+
+    def put(self, key, df, label=""):
+        if self.keep_in_memory:
+            self._frames[key] = df.copy()
+        path = save_frame(df, self.directory / f"{key}{FRAME_SUFFIX}")
+        now = time.time()
+        entry = {
+            "label": label,
+            "file": path.name,
+            "bytes": path.stat().st_size,
+            "rows": len(df),
+            "created": now,
+            "used": now,
+        }
+        self._write_entry(key, entry)
+        self.prune()
+
+    def entries(self):
+        """All cached results, most recently used first"""
+        found = []
+        for description in self.directory.glob("*.json"):
+            entry = self._read_entry(description.stem)
+            if entry:
+                found.append(dict(entry, key=description.stem))
+        return sorted(found, key=lambda x: x["used"], reverse=True)
+
+    def size(self):
+        return sum(entry["bytes"] for entry in self.entries())
+
+    def prune(self, max_bytes=None):
+        """Evict least recently used results to get under max_bytes"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        removed = []
+        with self._lock:
+            entries = self.entries()
+            total = sum(entry["bytes"] for entry in entries)
+            while entries and total > max_bytes:
+                entry = entries.pop()
+                total -= entry["bytes"]
+                self.remove(entry["key"])
+                removed.append(entry)
+        for entry in removed:
+            logger.debug("Evicted cached result %s (%s)", entry["key"], entry["label"])
+        return removed
+
+    def clear(self):
+        return self.prune(max_bytes=0)
+
+    def remove(self, key):
+        self._frames.pop(key, None)
+        entry = self._read_entry(key)
+        paths = [self.directory / f"{key}.json"]
+        if entry:
+            paths.append(self.directory / entry["file"])
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _read_entry(self, key):
+        try:
+            return json.loads((self.directory / f"{key}.json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, key, entry):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{key}.json"
+        temporary = path.with_suffix(f".{threading.get_ident()}.tmp")
+        temporary.write_text(json.dumps(entry))
+        os.replace(str(temporary), str(path))
+
+    def __len__(self):
+        return len(self.entries())
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.directory})>"
+
+
+"""
+Copyright 2019 Matt VanEseltine.
+
+This file is part of laforge.
+
+laforge is free software: you can redistribute it and/or modify it under
+the terms of the GNU Affero General Public License as published by the Free
+Software Foundation, either version 3 of the License, or (at your option) any
+later version.
+
+laforge is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.  See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with laforge.  If not, see <https://www.gnu.org/licenses/>.
+"""
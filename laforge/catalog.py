@@ -0,0 +1,143 @@
+"""Remember the column types inferred for each table written, for the next build.
+
+Tables reloaded night after night with the same shape need not be inferred
+afresh: each column keeps its recorded type for as long as the incoming data
+fits, and only a column that overflows is inferred again and widened. Types
+therefore never narrow from one build to the next, keeping the DDL stable.
+"""
+
+import json
+import logging
+import os
+import threading
+from importlib import import_module
+from pathlib import Path
+
+import sqlalchemy as sa
+
+from .state import STATE_DIR
+
+logger = logging.getLogger(__name__)
+logger.debug(__name__)
+
+
+def dump_type(spec):
+    """JSON-ready description of a SQL type (either a class or an instance)"""
+    sqltype = spec if isinstance(spec, type) else type(spec)
+    description = {"type": sqltype.__name__}
+    if getattr(sa.types, sqltype.__name__, None) is not sqltype:
+        # Types of one dialect alone, such as TINYINT
+        description["module"] = sqltype.__module__
+    if sqltype is not spec:
+        description["arguments"] = {
+            k: getattr(spec, k)
+            for k in ("length", "precision", "scale", "timezone", "fsp")
+            if getattr(spec, k, None) is not None
+        }
+    return description
+
+
+def load_type(description):
+    """SQL type from :func:`dump_type`; None if SQLAlchemy has no such type"""
+    module = description.get("module", "sqlalchemy.types")
+    if not module.startswith("sqlalchemy."):
+        return None
+    try:
+        namespace = import_module(module)
+    except ImportError:
+        return None
+    sqltype = getattr(namespace, description.get("type", ""), None)
+    if not (isinstance(sqltype, type) and issubclass(sqltype, sa.types.TypeEngine)):
+        return None
+    if "arguments" in description:
+        return sqltype(**description["arguments"])
+    return sqltype
+
+
+class SchemaCatalog:
+    """Column types last written to each table, stored as JSON in the build dir."""
+
+    FILENAME = "catalog.json"
+    VERSION = 1
+
+    def __init__(self, path, refresh=False):
+        self.path = Path(path)
+        self.refresh = refresh
+        self.tables = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def in_build_dir(cls, build_dir, **kwargs):
+        return cls(Path(build_dir) / STATE_DIR / cls.FILENAME, **kwargs)
+
+    @staticmethod
+    def key(table):
+        pieces = (table.distro.name, table.server, table.database, table.schema)
+        return ";".join(str(x or "") for x in pieces) + f";{table.name}"
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            content = json.loads(self.path.read_text())
+        except (OSError, ValueError) as err:
+            logger.warning("Ignoring unreadable schema catalog %s: %s", self.path, err)
+            return
+        if content.get("version") != self.VERSION:
+            logger.warning(
+                "Ignoring schema catalog from another version: %s", self.path
+            )
+            return
+        self.tables = content.get("tables", {})
+
+    def save(self):
+        with self._lock:
+            content = {"version": self.VERSION, "tables": self.tables}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_suffix(".tmp")
+            temporary.write_text(json.dumps(content, indent=1, sort_keys=True))
+            os.replace(str(temporary), str(self.path))
+        logger.debug("Saved schema catalog to %s", self.path)
+
+    def get(self, table):
+        """Recorded types of table's columns; None if unknown or refreshing"""
+        if self.refresh:
+            return None
+        with self._lock:
+            recorded = self.tables.get(self.key(table))
+        if recorded is None:
+            return None
+        dtypes = {column: load_type(spec) for column, spec in recorded.items()}
+        return {k: v for k, v in dtypes.items() if v is not None}
+
+    def put(self, table, dtypes):
+        """Record the types just written to table"""
+        recorded = {str(column): dump_type(spec) for column, spec in dtypes.items()}
+        with self._lock:
+            self.tables[self.key(table)] = recorded
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.path})>"
+
+
+"""
+Copyright 2019 Matt VanEseltine.
+
+This file is part of laforge.
+
+laforge is free software: you can redistribute it and/or modify it under
+the terms of the GNU Affero General Public License as published by the Free
+Software Foundation, either version 3 of the License, or (at your option) any
+later version.
+
+laforge is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.  See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with laforge.  If not, see <https://www.gnu.org/licenses/>.
+"""
@@ -0,0 +1,190 @@
+"""Record progress task by task, so that a failed build can resume where it failed.
+
+After each task, its identifier is recorded along with -- whenever the next task
+makes use of it -- the result it handed on. Resuming skips recorded tasks and
+hands the next task the result it would have received. Named results
+(``write: @name``) are kept as well, so that later readers can still have them.
+Streamed and spilled results are not kept; the tasks reading them are simply run
+again, rather than loading whole into memory what was kept out of it.
+
+A checkpoint only applies to the very same tasks, reading and writing in the very
+same places; any change to the INI means starting over. Changes to files read by completed tasks are not noticed.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from .builder import Target, Verb
+from .cache import FRAME_SUFFIX, load_frame, save_frame
+from .results import SpilledResult, StreamedResult, materialize
+from .state import STATE_DIR, digest
+
+logger = logging.getLogger(__name__)
+logger.debug(__name__)
+
+
+def tasks_digest(tasks):
+    """Digest of each task and where it reads and writes: its connection and dirs"""
+    return digest(
+        *(
+            f"{t.identifier}|{t.verb.value}|{t.content}"
+            f"|{sorted(t.config.get('sql', {}).items())}"
+            f"|{sorted((str(k), str(v)) for k, v in t.config.get('dir', {}).items())}"
+            for t in tasks
+        )
+    )
+
+
+class Checkpoint:
+    """Tasks completed so far, and the results needed to carry on from them.
+
+    :param directory: Where to keep the checkpoint.
+    :param tasks: Every task of the build, in order.
+    :param resume: Carry on from an existing checkpoint rather than start over.
+    """
+
+    FILENAME = "checkpoint.json"
+
+    def __init__(self, directory, tasks, resume=False):
+        self.directory = Path(directory)
+        self.tasks = list(tasks)
+        self.key = tasks_digest(self.tasks)
+        self.completed = set()
+        self.results = {}
+        self._lock = threading.Lock()
+        if resume:
+            self._load()
+        else:
+            self.clear()
+
+    @classmethod
+    def in_build_dir(cls, build_dir, tasks, **kwargs):
+        return cls(Path(build_dir) / STATE_DIR / "checkpoint", tasks, **kwargs)
+
+    @property
+    def path(self):
+        return self.directory / self.FILENAME
+
+    def _load(self):
+        try:
+            content = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            logger.warning("No checkpoint to resume from; starting from the top.")
+            return
+        except (OSError, ValueError) as err:
+            logger.warning("Ignoring unreadable checkpoint %s: %s", self.path, err)
+            return
+        if content.get("key") != self.key:
+            logger.warning("Build has changed since its checkpoint; starting over.")
+            self.clear()
+            return
+        self.completed = set(content["completed"])
+        self.results = content["results"]
+        logger.info(
+            "Resuming with %s of %s tasks already complete.",
+            len(self.completed),
+            len(self.tasks),
+        )
+
+    def save(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        content = {
+            "key": self.key,
+            "completed": sorted(self.completed),
+            "results": self.results,
+        }
+        temporary = self.path.with_suffix(f".{threading.get_ident()}.tmp")
+        temporary.write_text(json.dumps(content, indent=1))
+        os.replace(str(temporary), str(self.path))
+
+    def done(self, task):
+        return task.identifier in self.completed
+
+    def record(self, task, prior_results, results):
+        """Note task as complete, keeping whatever may yet be needed from it"""
+        with self._lock:
+            kept = self._is_kept_result(task)
+            handed_on = prior_results if kept else results
+            if isinstance(handed_on, (SpilledResult, StreamedResult)):
+                # Reading the source again is cheaper than saving it whole
+                return
+            self.completed.add(task.identifier)
+            if kept or self._is_carried(task):
+                self._keep(task, prior_results if kept else results)
+            previous = self._previous(task)
+            if previous is not None and not self._is_kept_result(previous):
+                self._discard(previous)
+            self.save()
+
+    def result_of(self, task):
+        """What task handed on (or, for write: @name, kept); None if not saved"""
+        filename = self.results.get(task.identifier)
+        if filename is None:
+            return None
+        return load_frame(self.directory / filename)
+
+    def clear(self):
+        """Forget all progress"""
+        self.completed = set()
+        self.results = {}
+        if self.directory.exists():
+            shutil.rmtree(str(self.directory))
+
+    @staticmethod
+    def _is_kept_result(task):
+        return task.verb is Verb.WRITE and task.target is Target.RESULT
+
+    def _is_carried(self, task):
+        following = self._following(task)
+        return following is not None and following.consumes_results
+
+    def _keep(self, task, df):
+        df = materialize(df)
+        if not isinstance(df, pd.DataFrame):
+            return
+        path = self.directory / (digest(task.identifier)[:16] + FRAME_SUFFIX)
+        self.results[task.identifier] = save_frame(df, path).name
+
+    def _discard(self, task):
+        filename = self.results.pop(task.identifier, None)
+        if filename:
+            (self.directory / filename).unlink()
+
+    def _following(self, task):
+        i = self.tasks.index(task)
+        return self.tasks[i + 1] if i + 1 < len(self.tasks) else None
+
+    def _previous(self, task):
+        i = self.tasks.index(task)
+        return self.tasks[i - 1] if i > 0 else None
+
+    def __len__(self):
+        return len(self.completed)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.directory})>"
+
+
+"""
+Copyright 2019 Matt VanEseltine.
+
+This file is part of laforge.
+
+laforge is free software: you can redistribute it and/or modify it under
+the terms of the GNU Affero General Public License as published by the Free
+Software Foundation, either version 3 of the License, or (at your option) any
+later version.
+
+laforge is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.  See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with laforge.  If not, see <https://www.gnu.org/licenses/>.
+"""
@@ -2,6 +2,7 @@
 """Command-line interface for laforge."""
 
 import logging
+import socket
 import sys
 import time
 from pathlib import Path
@@ -12,6 +13,8 @@ import click
 from . import __doc__ as package_docstring
 from . import __version__ as package_version
 from . import logo
+from .state import STATE_DIR, BuildState
+from .toolbox import is_true, parse_size
 
 CONTEXT_SETTINGS = {"help_option_names": ["-h", "--help"]}
 
@@ -29,15 +32,137 @@ def run_cli():
 @click.option("--debug", default=False, is_flag=True)
 @click.option("--dry-run", "-n", default=False, is_flag=True)
 @click.option("--loop", default=False, is_flag=True)
+@click.option(
+    "--watch",
+    default=False,
+    is_flag=True,
+    help="Rebuild whatever is affected each time a file of the build changes.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Execute up to JOBS independent sections at once.",
+)
+@click.option(
+    "--force", default=False, is_flag=True, help="Build even up-to-date sections."
+)
+@click.option(
+    "--explain",
+    default=False,
+    is_flag=True,
+    help="Explain why each section is built or skipped.",
+)
+@click.option(
+    "--target",
+    "-t",
+    "targets",
+    multiple=True,
+    help="Build only section TARGET and those it depends upon; repeatable.",
+)
+@click.option(
+    "--tag",
+    "tags",
+    multiple=True,
+    help="Build only sections tagged TAG and those they depend upon; repeatable.",
+)
+@click.option(
+    "--stream",
+    default=False,
+    is_flag=True,
+    help="Read and write every section chunk by chunk, as if set to stream: true.",
+)
+@click.option(
+    "--report",
+    default=None,
+    type=click.Path(resolve_path=True, dir_okay=False),
+    help="Write time, rows, and memory of each task as JSON to REPORT.",
+)
+@click.option(
+    "--profile",
+    default=False,
+    is_flag=True,
+    help="Profile each task into .laforge/profile within the build directory.",
+)
+@click.option(
+    "--resume",
+    default=False,
+    is_flag=True,
+    help="Carry on from the task where the last build failed (checkpoint = true).",
+)
+@click.option(
+    "--local",
+    default=False,
+    is_flag=True,
+    help="Build in this process even if laforge serve is running.",
+)
 @click.option(
     "--log",
     default="laforge.log",
     type=click.Path(resolve_path=True, dir_okay=False),
     help="Log build process at LOG.",
 )
-def build(ini, log="./laforge.log", debug=False, dry_run=False, loop=False):
+def build(
+    ini,
+    log="./laforge.log",
+    debug=False,
+    dry_run=False,
+    loop=False,
+    watch=False,
+    jobs=1,
+    force=False,
+    explain=False,
+    targets=(),
+    tags=(),
+    stream=False,
+    report=None,
+    profile=False,
+    resume=False,
+    local=False,
+):
+    if not (local or loop or watch) and hasattr(socket, "AF_UNIX"):
+        from .serve import BuildClient
+
+        client = BuildClient.if_running()
+        if client:
+            succeeded = client.build(
+                ini=find_build_config(ini),
+                log=Path(log),
+                debug=debug,
+                dry_run=dry_run,
+                jobs=jobs,
+                force=force,
+                explain=explain,
+                report=report,
+                profile=profile,
+                resume=resume,
+                targets=targets,
+                tags=tags,
+                stream=stream,
+                echo=click.echo,
+            )
+            sys.exit(0 if succeeded else 1)
+
     from .builder import TaskList
 
+    if watch:
+        from .watch import Watcher
+
+        get_package_logger(Path(log), debug)
+        watcher = Watcher(
+            find_build_config(ini),
+            list_class=TaskList,
+            jobs=jobs,
+            force=force,
+            explain=explain,
+            targets=targets,
+            tags=tags,
+            stream=stream,
+        )
+        watcher.run()
+        return
+
     runs = 1 if not loop else 100
     for _ in range(runs):
         run_build(
@@ -46,6 +171,15 @@ def build(ini, log="./laforge.log", debug=False, dry_run=False, loop=False):
             log=Path(log),
             debug=debug,
             dry_run=dry_run,
+            jobs=jobs,
+            force=force,
+            explain=explain,
+            report=report and Path(report),
+            profile=profile,
+            resume=resume,
+            targets=targets,
+            tags=tags,
+            stream=stream,
         )
         if loop:
             response = input("\nEnter to rebuild, anything else to quit: ")
@@ -54,28 +188,137 @@ def build(ini, log="./laforge.log", debug=False, dry_run=False, loop=False):
             print("")
 
 
-def run_build(*, list_class, script_path, log, debug=False, dry_run=False):
+def run_build(
+    *,
+    list_class,
+    script_path,
+    log,
+    debug=False,
+    dry_run=False,
+    jobs=1,
+    force=False,
+    explain=False,
+    report=None,
+    profile=False,
+    resume=False,
+    targets=(),
+    tags=(),
+    stream=False,
+):
     path = find_build_config(script_path)
 
-    start_time = time.time()
     logger = get_package_logger(log, debug)
 
     # THEN set logging -- helps avoid importing pandas at debug level
 
-    logger.info("%s launched.", path)
     if debug:
         click.echo("Debug mode is on.")
+    build_config(
+        path,
+        list_class=list_class,
+        dry_run=dry_run,
+        jobs=jobs,
+        force=force,
+        explain=explain,
+        report=report,
+        profile=profile,
+        resume=resume,
+        targets=targets,
+        tags=tags,
+        stream=stream,
+        logger=logger,
+    )
+
+
+def build_config(
+    path,
+    *,
+    list_class,
+    dry_run=False,
+    jobs=1,
+    force=False,
+    explain=False,
+    report=None,
+    profile=False,
+    resume=False,
+    targets=(),
+    tags=(),
+    stream=False,
+    logger,
+):
+    start_time = time.time()
+    logger.info("%s launched.", path)
     logger.debug("Debug mode is on.")
 
-    task_list = list_class(path.read_text(), location=path.parent)
+    task_list = list_class(
+        path.read_text(),
+        location=path.parent,
+        targets=targets,
+        tags=tags,
+        use_plan=True,
+    )
+    build_dir = task_list.config["build_dir"]
+    state = BuildState.in_build_dir(build_dir, force=force, explain=explain)
     if dry_run:
-        task_list.dry_run()
+        task_list.dry_run(state=state if explain else None)
     else:
-        task_list.execute()
+        cache = get_result_cache(task_list, refresh=force)
+        profile_dir = build_dir / STATE_DIR / "profile" if profile else None
+        checkpoint = get_checkpoint(task_list, resume=resume)
+        catalog = get_schema_catalog(task_list, refresh=force)
+        try:
+            task_list.execute(
+                jobs=jobs,
+                state=state,
+                cache=cache,
+                profile_dir=profile_dir,
+                checkpoint=checkpoint,
+                stream=stream,
+                catalog=catalog,
+            )
+        finally:
+            if len(task_list.report):
+                logger.info("Slowest tasks:\n%s", task_list.report.summary())
+            if profile_dir and len(task_list.report):
+                logger.info("Hotspots:\n%s", task_list.report.hotspots())
+            if report:
+                task_list.report.write(report)
         elapsed = round(time.time() - start_time, 2)
         logger.info("%s completed in %s seconds.", path, elapsed)
 
 
+def get_checkpoint(task_list, resume=False):
+    from .checkpoint import Checkpoint
+
+    if not is_true(task_list.config.get("checkpoint", False)):
+        if resume:
+            raise click.UsageError("Cannot resume a build without checkpoint = true.")
+        return None
+    return Checkpoint.in_build_dir(
+        task_list.config["build_dir"], task_list.tasks, resume=resume
+    )
+
+
+def get_schema_catalog(task_list, refresh=False):
+    from .catalog import SchemaCatalog
+
+    if not is_true(task_list.config.get("schema_catalog", True)):
+        return None
+    return SchemaCatalog.in_build_dir(task_list.config["build_dir"], refresh=refresh)
+
+
+def get_result_cache(task_list, refresh=False, keep_in_memory=False):
+    from .cache import DEFAULT_CACHE_SIZE, ResultCache
+
+    max_bytes = parse_size(task_list.config.get("cache_size", DEFAULT_CACHE_SIZE))
+    return ResultCache.in_build_dir(
+        task_list.config["build_dir"],
+        max_bytes=max_bytes,
+        refresh=refresh,
+        keep_in_memory=keep_in_memory,
+    )
+
+
 def find_build_config(path):
     path = Path(path)
     if path.is_file():
@@ -95,17 +338,7 @@ def find_build_config(path):
 
 def get_package_logger(log_file, debug):
     noisiness = logging.DEBUG if debug else logging.INFO
-
-    if noisiness == logging.DEBUG:
-        formatter = logging.Formatter(
-            fmt="{asctime} {name:<20} {lineno:>3}:{levelname:<7} | {message}",
-            style="{",
-            datefmt=r"%Y%m%d-%H%M%S",
-        )
-    else:
-        formatter = logging.Formatter(
-            fmt="{asctime} {levelname:>7} | {message}", style="{", datefmt=r"%H:%M:%S"
-        )
+    formatter = get_log_formatter(debug)
     file_handler = logging.FileHandler(filename=log_file)
     file_handler.setFormatter(formatter)
     stream_handler = logging.StreamHandler(sys.stdout)
@@ -120,6 +353,114 @@ def get_package_logger(log_file, debug):
     return new_logger
 
 
+def get_log_formatter(debug):
+    if debug:
+        return logging.Formatter(
+            fmt="{asctime} {name:<20} {lineno:>3}:{levelname:<7} | {message}",
+            style="{",
+            datefmt=r"%Y%m%d-%H%M%S",
+        )
+    return logging.Formatter(
+        fmt="{asctime} {levelname:>7} | {message}", style="{", datefmt=r"%H:%M:%S"
+    )
+
+
+@click.command(help="Inspect or prune the result cache of a laforge build.")
+@click.argument(
+    "ini", type=click.Path(exists=True, resolve_path=True, dir_okay=True), default="."
+)
+@click.option(
+    "--prune",
+    "max_size",
+    default=None,
+    help="Evict least recently used results beyond MAX_SIZE (e.g., 500MB).",
+)
+@click.option("--clear", default=False, is_flag=True, help="Evict every result.")
+def cache(ini, max_size=None, clear=False):
+    from .builder import TaskList
+
+    path = find_build_config(ini)
+    task_list = TaskList(path.read_text(), location=path.parent)
+    result_cache = get_result_cache(task_list)
+    if clear:
+        max_size = 0
+    if max_size is not None:
+        removed = result_cache.prune(max_bytes=parse_size(max_size))
+        click.echo(f"Evicted {len(removed)} cached result(s).")
+    entries = result_cache.entries()
+    click.echo(f"{len(entries)} cached result(s) in {result_cache.directory}")
+    for entry in entries:
+        used = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["used"]))
+        click.echo(
+            f"{entry['label']:<30} {entry['rows']:>12,} rows "
+            f"{entry['bytes']:>14,} bytes  last used {used}"
+        )
+    total = sum(entry["bytes"] for entry in entries)
+    click.echo(f"Total: {total:,} of {result_cache.max_bytes:,} bytes")
+
+
+@click.command(help="Compile a laforge build INI into a plan and show it.")
+@click.argument(
+    "ini", type=click.Path(exists=True, resolve_path=True, dir_okay=True), default="."
+)
+@click.option("--target", "-t", "targets", multiple=True)
+@click.option("--tag", "tags", multiple=True)
+def plan(ini, targets=(), tags=()):
+    from .builder import TaskList
+    from .plan import BuildPlan
+
+    path = find_build_config(ini)
+    task_list = TaskList(
+        path.read_text(),
+        location=path.parent,
+        targets=targets,
+        tags=tags,
+        use_plan=True,
+    )
+    click.echo(task_list.plan.describe())
+    click.echo(f"Kept at {BuildPlan.path_in(task_list.location)}")
+
+
+@click.command(help="Serve builds from one resident process, keeping it warm.")
+@click.option(
+    "--socket",
+    "socket_path",
+    default=None,
+    type=click.Path(resolve_path=True, dir_okay=False),
+    help="Listen at SOCKET rather than $LAFORGE_SOCKET or the default.",
+)
+@click.option("--stop", default=False, is_flag=True, help="Stop a running server.")
+@click.option("--debug", default=False, is_flag=True)
+def serve(socket_path=None, stop=False, debug=False):
+    if not hasattr(socket, "AF_UNIX"):
+        raise click.ClickException(
+            "laforge serve needs Unix sockets, which this platform lacks; "
+            "builds will run in their own processes."
+        )
+    from .serve import BuildClient, BuildServer
+
+    if stop:
+        client = BuildClient.if_running(socket_path)
+        if not client:
+            raise click.ClickException("laforge serve is not running.")
+        client.stop()
+        click.echo(f"Stopped laforge serve at {client.path}.")
+        return
+
+    logging.basicConfig(level=logging.DEBUG if debug else logging.INFO)
+    BuildServer.warm_up()
+    try:
+        server = BuildServer(socket_path)
+    except FileExistsError as err:
+        raise click.ClickException(str(err))
+    click.echo(f"laforge serve listening at {server.path}; Ctrl-C to stop.")
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
 @click.command(hidden=True, help="Receive a quick engineering consultation.")
 @click.option("-n", type=int, default=1, help="Receive N consultations.")
 @click.option(
@@ -189,9 +530,12 @@ def env(no_warning=False, path=None):
 
 
 run_cli.add_command(build)
+run_cli.add_command(cache)
 run_cli.add_command(consult)
 run_cli.add_command(create)
 run_cli.add_command(env)
+run_cli.add_command(plan)
+run_cli.add_command(serve)
 
 if __name__ == "__main__":
     run_cli()
@@ -1,13 +1,20 @@
+import csv
+import io
 import logging
 import math
+import os
 import re
+import tempfile
 from importlib import import_module
 from pathlib import Path
 from urllib import parse
 
+import numpy as np
+import pandas as pd
 import sqlalchemy as sa
+from sqlalchemy.dialects import mssql, mysql
 
-from .sql import Script, Table
+from .sql import Channel, Script, Table
 
 logger = logging.getLogger(__name__)
 logger.debug(__name__)
@@ -32,7 +39,15 @@ class Distro:
         sa.types.INT: 2 ** 31 - 101,
         sa.types.BIGINT: 2 ** 63 - 101,
     }
+    # Integer types taking no negative values
+    UNSIGNED_TYPES = ()
     NUMERIC_PADDING_FACTOR = 10
+    DECIMAL_MAX_PRECISION = 38
+    # Text all of one length up to this many characters is stored as CHAR
+    CHAR_MAX_LENGTH = 10
+    VARCHAR_STEP = 50
+    # Most parameters one statement can bind; None for no practical limit
+    max_parameters = None
 
     find_template = """--ANSI.find()
         select table_schema, table_name
@@ -41,6 +56,9 @@ class Distro:
             and table_name like '{object_pattern}';
         """
     untouchable_identifiers = []
+    create_as_template = "CREATE TABLE {target} AS {select}"
+    # None where a column's type cannot be changed in place
+    alter_column_template = "ALTER TABLE {target} ALTER COLUMN {column} TYPE {type}"
 
     def __init__(self, _):
         try:
@@ -90,36 +108,151 @@ class Distro:
     def known(cls):
         return {x.name: x.human_name for x in cls.__subclasses__()}
 
-    def determine_dtypes(self, df):
-        new_dtypes = {}
-        for column in df.columns:
-            col = df[column].copy()
-            col.dropna()
-            sql_specification = self._determine_dtype(df, column)
-            if sql_specification:
-                new_dtypes[column] = sql_specification
-        return new_dtypes
-
-    def _determine_dtype(self, df, column):
-        if df[column].dtype in ("object", "unicode_", "string_"):
-            return self._get_varchar_spec(df, column)
-        if df[column].dtype in ("float64",):
-            return self._check_float_spec(df, column)
-        if df[column].dtype in ("int64",):
-            return self._check_integer_spec(df, column)
+    @classmethod
+    def wider_dtype(cls, first, second):
+        """The SQL type accommodating both; None if there is no telling"""
+        if first is None or second is None:
+            return None
+        if repr(first) == repr(second):
+            return first
+        integers = list(cls.NUMERIC_RANGES)
+        if first in integers and second in integers:
+            return max(first, second, key=integers.index)
+        if isinstance(first, sa.VARCHAR) and isinstance(second, sa.VARCHAR):
+            return max(first, second, key=lambda x: x.length or 0)
+        texts = (sa.CHAR, sa.VARCHAR)
+        if isinstance(first, texts) and isinstance(second, texts):
+            return cls._create_varchar_spec(max(first.length or 0, second.length or 0))
+        if isinstance(first, sa.NUMERIC) and isinstance(second, sa.NUMERIC):
+            scale = max(first.scale or 0, second.scale or 0)
+            whole = max(x.precision - (x.scale or 0) for x in (first, second))
+            return cls._create_decimal_spec(whole + scale, scale)
+        if sa.types.DATE in (first, second):
+            other = second if first is sa.types.DATE else first
+            return other if is_datetime_type(other) else None
+        if is_datetime_type(first) and is_datetime_type(second):
+            if is_timezone_aware(first) == is_timezone_aware(second):
+                return max(first, second, key=lambda x: getattr(x, "fsp", None) or 0)
+        return None
+
+    def determine_dtypes(self, df, sample=None):
+        """Narrowest SQL types to hold each column, where pandas' own are too wide
+
+        Beyond narrower integers and VARCHAR, there are DATE for dates without
+        times, exact DECIMAL for :class:`decimal.Decimal`, BOOLEAN (or BIT), and
+        CHAR for short codes all of one length. Every check is vectorized over
+        the whole column, but for Decimal; only text with characters beyond
+        ASCII is ever encoded, and only the longest of it.
+
+        :param sample: Measure text from at most this many rows, drawn at
+            random. Faster for very long frames, but longer text outside the
+            sample may then not fit.
+        """
+        found = {
+            name: self._determine_dtype(name, df.iloc[:, i], sample=sample)
+            for i, name in enumerate(df.columns)
+        }
+        return {name: spec for name, spec in found.items() if spec}
+
+    def _determine_dtype(self, column, series, sample=None):
+        if series.dtype in ("object", "unicode_", "string_"):
+            return self._check_object_spec(column, series, sample=sample)
+        if series.dtype in ("float64",):
+            return self._check_float_spec(column, series)
+        if series.dtype in ("int64",):
+            return self._check_integer_spec(column, series)
+        if series.dtype in ("bool",):
+            return sa.types.Boolean
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            return self._check_datetime_spec(column, series)
         return None
 
     @classmethod
-    def _check_float_spec(cls, df, column):
-        if not df[column].apply(float.is_integer).all():
-            return None
+    def _check_object_spec(cls, column, series, sample=None):
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        if inferred == "decimal":
+            return cls._check_decimal_spec(column, series)
+        if inferred == "date":
+            return sa.types.DATE
+        if inferred == "boolean":
+            return sa.types.Boolean
+        if inferred == "datetime":
+            try:
+                return cls._check_datetime_spec(column, pd.to_datetime(series))
+            except (TypeError, ValueError):  # e.g., mixed time zones
+                return None
+        if sample and len(series) > sample:
+            series = series.sample(n=sample, random_state=0)
+        return cls._get_varchar_spec(column, series)
+
+    def fit_dtypes(self, df, known, sample=None):
+        """Keep the types in ``known`` for columns still fitting them; infer the rest
+
+        A column overflowing its known type is inferred afresh and widened to
+        hold both; should no one type hold both, it is left to pandas. Options
+        are as for :meth:`determine_dtypes`.
+        """
+        dtypes = {}
+        unfit = []
+        for i, column in enumerate(df.columns):
+            spec = known.get(column)
+            if spec is not None and self._still_fits(spec, df.iloc[:, i]):
+                dtypes[column] = spec
+            else:
+                unfit.append(i)
+        if unfit:
+            found = self.determine_dtypes(df.iloc[:, unfit], sample=sample)
+            for column, spec in found.items():
+                before = known.get(column)
+                if before is not None:
+                    logger.debug("Column [%s] outgrew %r", column, before)
+                    spec = self.wider_dtype(before, spec)
+                dtypes[column] = spec
+        return {k: v for k, v in dtypes.items() if v is not None}
+
+    def _still_fits(self, spec, series):
+        values = series.dropna()
+        if values.empty:
+            return True
+        if isinstance(spec, sa.VARCHAR):
+            return spec.length is not None and self._text_fits(values, spec.length)
+        if spec in self.NUMERIC_RANGES:
+            if values.dtype == "float64":
+                with np.errstate(invalid="ignore"):
+                    if np.any(np.mod(values.to_numpy(), 1) != 0):
+                        return False
+            elif values.dtype != "int64":
+                return False
+            return self._well_within_range([values.min(), values.max()], spec)
+        # Otherwise, checking is as much work as inferring
+        found = self._determine_dtype(None, values)
+        return found is not None and repr(self.wider_dtype(spec, found)) == repr(spec)
+
+    @staticmethod
+    def _text_fits(values, length):
+        strings = values.to_numpy()
+        if pd.api.types.infer_dtype(strings, skipna=False) != "string":
+            return False
+        characters = max(map(len, strings))
+        if characters * 4 <= length:
+            # Too short to overflow, however many bytes each character takes
+            return True
+        return characters <= length and utf8_max_length(values) <= length
+
+    @classmethod
+    def _check_float_spec(cls, column, series):
+        values = series.to_numpy()
+        with np.errstate(invalid="ignore"):
+            # NaN and infinity leave a NaN remainder, which is not 0
+            if not len(values) or np.any(np.mod(values, 1) != 0):
+                return None
         logger.debug("Demoting column [%s] from float...", column)
-        return cls._check_integer_spec(df, column)
+        return cls._check_integer_spec(column, series)
 
     @classmethod
-    def _check_integer_spec(cls, df, column):
-        observed_range = [df[column].min(), df[column].max()]
-        for sqltype in (sa.types.SMALLINT, sa.types.INT, sa.types.BIGINT):
+    def _check_integer_spec(cls, column, series):
+        observed_range = [series.min(), series.max()]
+        for sqltype in cls.NUMERIC_RANGES:
             if cls._well_within_range(observed_range, sqltype):
                 logger.debug(
                     "Column [%s] numeric type determined to be %s.", column, sqltype
@@ -130,6 +263,8 @@ class Distro:
     @classmethod
     def _well_within_range(cls, observed, sqltype):
         limit = cls.NUMERIC_RANGES[sqltype]
+        if sqltype in cls.UNSIGNED_TYPES and min(observed) < 0:
+            return False
         # Convert to Python's int because numpy's int64 will overflow
         max_observed = int(max(abs(x) for x in observed))
         test_level = max_observed * cls.NUMERIC_PADDING_FACTOR
@@ -137,22 +272,62 @@ class Distro:
         return valid
 
     @classmethod
-    def _get_varchar_spec(cls, df, column):
-        try:
-            stringed = df[column].str.encode(encoding="utf-8").str
-        except AttributeError:
+    def _get_varchar_spec(cls, column, series):
+        observed_len = utf8_max_length(series)
+        if observed_len is None:
             return None
-        observed_len = stringed.len().max()
+        if 0 < observed_len <= cls.CHAR_MAX_LENGTH:
+            strings = series.dropna().to_numpy()
+            # Every string of as many characters as bytes: all ASCII, all alike
+            text = pd.api.types.infer_dtype(strings, skipna=False) == "string"
+            if text and len(strings) > 1 and min(map(len, strings)) == observed_len:
+                logger.debug("Column [%s] has codes of %s", column, observed_len)
+                return sa.CHAR(observed_len)
         return cls._create_varchar_spec(observed_len)
 
-    @staticmethod
-    def _create_varchar_spec(max_length):
+    @classmethod
+    def _create_varchar_spec(cls, max_length):
         try:
-            rounded = round_up(max_length, nearest=50)
+            rounded = round_up(max_length, nearest=cls.VARCHAR_STEP)
         except ValueError:
             return None
         return sa.VARCHAR(rounded)
 
+    @classmethod
+    def _check_decimal_spec(cls, column, series):
+        whole = scale = 0
+        for value in series.dropna():
+            _, digits, exponent = value.as_tuple()
+            if not isinstance(exponent, int):  # NaN or infinity
+                return None
+            scale = max(scale, -exponent)
+            whole = max(whole, len(digits) + exponent)
+        logger.debug("Column [%s] holds decimals to %s places", column, scale)
+        return cls._create_decimal_spec(whole + scale, scale)
+
+    @classmethod
+    def _create_decimal_spec(cls, precision, scale):
+        if precision > cls.DECIMAL_MAX_PRECISION:
+            return None
+        return sa.NUMERIC(max(precision, 1), scale)
+
+    @classmethod
+    def _check_datetime_spec(cls, column, series):
+        values = series.dropna()
+        if values.empty:
+            return None
+        timezone = values.dt.tz is not None
+        if not timezone and (values == values.dt.normalize()).all():
+            logger.debug("Column [%s] holds dates alone", column)
+            return sa.types.DATE
+        fractional = bool((values != values.dt.floor("s")).any())
+        return cls._create_datetime_spec(timezone, fractional)
+
+    @staticmethod
+    def _create_datetime_spec(timezone, fractional):
+        # pylint: disable=unused-argument # Precision to the second is not universal
+        return sa.types.DateTime(timezone=timezone)
+
     def find(self, channel, object_pattern="%", schema_pattern="%"):
 
         # Lone % causes ValueError on unsupported format character 0x27
@@ -169,6 +344,94 @@ class Distro:
         ]
         return result_list
 
+    def bulk_load(self, table, df, dtypes=None, if_exists="replace"):
+        """Load DataFrame into table faster than row by row INSERTs
+
+        :return: Whether the DataFrame was loaded; if not, fall back to ``to_sql``.
+        """
+        # pylint: disable=unused-argument # No native bulk load in general
+        return False
+
+    @staticmethod
+    def _whole_numbers(df, dtypes=None):
+        """DataFrame with any floats bound for integer columns as nullable integers
+
+        pandas writes whole floats as ``1.0``, which a bulk load refuses for an
+        integer column; as ``Int64``, they are written ``1``.
+        """
+        whole = [
+            column
+            for column, sqltype in (dtypes or {}).items()
+            if column in df.columns
+            and df[column].dtype == "float64"
+            and is_integer_type(sqltype)
+        ]
+        if not whole:
+            return df
+        return df.astype({column: "Int64" for column in whole})
+
+    @staticmethod
+    def _quoted(table, df):
+        """Quoted target table and list of quoted columns for a bulk load"""
+        preparer = table.channel.engine.dialect.identifier_preparer
+        columns = ", ".join(preparer.quote(str(c)) for c in df.columns)
+        return Distro._quoted_name(table), columns
+
+    @staticmethod
+    def _quoted_name(table):
+        preparer = table.channel.engine.dialect.identifier_preparer
+        target = preparer.quote(table.name)
+        if table.schema:
+            target = f"{preparer.quote_schema(table.schema)}.{target}"
+        return target
+
+    def export_csv(self, channel, statement, path, chunksize=10000):
+        """Write the rows of a query to CSV, with a header, straight off a cursor"""
+        with channel.engine.connect() as connection:
+            connection = connection.execution_options(stream_results=True)
+            result = connection.execute(self._as_statement(statement))
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f, lineterminator=os.linesep)
+                writer.writerow(result.keys())
+                rows = result.fetchmany(chunksize)
+                while rows:
+                    writer.writerows(rows)
+                    rows = result.fetchmany(chunksize)
+
+    @staticmethod
+    def _as_statement(statement):
+        if isinstance(statement, str):
+            return Channel.clean_up_statement(statement).rstrip(";")
+        return statement
+
+    @classmethod
+    def _as_text(cls, channel, statement):
+        """SQL text of the statement, to embed in another"""
+        statement = cls._as_statement(statement)
+        if isinstance(statement, str):
+            return statement
+        return str(
+            statement.compile(
+                dialect=channel.engine.dialect,
+                compile_kwargs={"literal_binds": True},
+            )
+        )
+
+    def create_table_as(self, table, select):
+        """Statement creating table from the rows of a SELECT, all on the server"""
+        return self.create_as_template.format(
+            target=self._quoted_name(table), select=select
+        )
+
+    def alter_column(self, table, column, sqltype):
+        """Statement changing the type of a column of table to sqltype"""
+        dialect = table.channel.engine.dialect
+        return self.alter_column_template.format(
+            target=self._quoted_name(table),
+            column=dialect.identifier_preparer.quote(str(column)),
+            type=sa.types.to_instance(sqltype).compile(dialect=dialect),
+        )
+
     def create_spec(self, *, server, database, engine_kwargs):
         raise NotImplementedError
 
@@ -206,6 +469,15 @@ class MySQL(Distro):
     regex = "^(my|maria).*"
     driver = "pymysql"
     resolver = "{schema}.`{name}`"
+    alter_column_template = "ALTER TABLE {target} MODIFY COLUMN {column} {type}"
+    NUMERIC_RANGES = {mysql.TINYINT: 2 ** 7 - 1, **Distro.NUMERIC_RANGES}
+    DECIMAL_MAX_PRECISION = 65
+    VARCHAR_STEP = 10
+
+    @staticmethod
+    def _create_datetime_spec(timezone, fractional):
+        """DATETIME keeps no fractions of a second unless given the digits"""
+        return mysql.DATETIME(timezone=timezone, fsp=6 if fractional else None)
 
     def create_spec(self, *, server, database, engine_kwargs):
         username = engine_kwargs.pop("username")
@@ -216,8 +488,63 @@ class MySQL(Distro):
             + f"{server}/{database}"
             + f"?charset=utf8mb4"
         )
+        # LOAD DATA LOCAL INFILE must also be allowed by the client
+        engine_kwargs.setdefault("connect_args", {}).setdefault("local_infile", True)
         return (url, engine_kwargs)
 
+    def bulk_load(self, table, df, dtypes=None, if_exists="replace"):
+        """Load through ``LOAD DATA LOCAL INFILE`` from a temporary CSV
+
+        The server must allow it (``local_infile``); otherwise this fails and
+        the rows are inserted as usual.
+        """
+        table.create(df, dtypes=dtypes, if_exists=if_exists)
+        target, columns = self._quoted(table, df)
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8", newline="") as f:
+                self._prepare_rows(df, dtypes).to_csv(
+                    f, index=False, header=False, na_rep=r"\N"
+                )
+            # pandas ends lines with os.linesep
+            terminator = os.linesep.replace("\r", "\\r").replace("\n", "\\n")
+            statement = (
+                f"LOAD DATA LOCAL INFILE '{Path(path).as_posix()}' "
+                + f"INTO TABLE {target} CHARACTER SET utf8mb4 "
+                + "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+                + f"LINES TERMINATED BY '{terminator}' ({columns})"
+            )
+            with table.channel.engine.begin() as connection:
+                connection.execute(sa.text(statement))
+        finally:
+            os.remove(path)
+        return True
+
+    @classmethod
+    def _prepare_rows(cls, df, dtypes=None):
+        """Copy of DataFrame as LOAD DATA reads it: escaped text, numeric booleans
+
+        LOAD DATA takes the text "True" as 0, so booleans become 1 and 0 -- also
+        within object columns, where they sit among nulls. Whole floats bound for
+        integer columns lose their decimals.
+        """
+        df = cls._whole_numbers(df, dtypes).copy()
+        for column in df.columns[df.dtypes == "object"]:
+            # Built as object, lest 1 and 0 among nulls turn into floats
+            values = [_load_data_value(x) for x in df[column]]
+            df[column] = pd.Series(values, index=df.index, dtype=object)
+        for column in df.columns[df.dtypes == "bool"]:
+            df[column] = df[column].astype(int)
+        return df
+
+
+def _load_data_value(x):
+    if isinstance(x, str):
+        return x.replace("\\", "\\\\")
+    if isinstance(x, (bool, np.bool_)):
+        return int(x)
+    return x
+
 
 class PostgresQL(Distro):
     name = "postgresql"
@@ -225,6 +552,12 @@ class PostgresQL(Distro):
     regex = r"^post.*"
     driver = "psycopg2"
     resolver = "{schema}.{name}"
+    DECIMAL_MAX_PRECISION = 1000
+    COPY_CHUNKSIZE = 100000
+    # Casting explicitly, as from text to integer, which no implicit cast covers
+    alter_column_template = (
+        "ALTER TABLE {target} ALTER COLUMN {column} TYPE {type} USING {column}::{type}"
+    )
 
     def create_spec(self, *, server, database, engine_kwargs):
         username = engine_kwargs.pop("username")
@@ -232,6 +565,48 @@ class PostgresQL(Distro):
         url = f"{self.name}+{self.driver}://{username}:{password}@{server}/{database}"
         return (url, engine_kwargs)
 
+    def export_csv(self, channel, statement, path, chunksize=None):
+        """Write through ``COPY ... TO STDOUT``, the server producing the CSV"""
+        # pylint: disable=unused-argument # The server decides how much to send
+        # On lines of its own, lest a trailing -- comment swallow the parenthesis
+        query = self._as_text(channel, statement)
+        copy = f"COPY (\n{query}\n) TO STDOUT WITH CSV HEADER"
+        connection = channel.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                with open(path, "w", encoding="utf-8", newline="") as f:
+                    cursor.copy_expert(copy, f)
+        finally:
+            connection.close()
+
+    def bulk_load(self, table, df, dtypes=None, if_exists="replace"):
+        """Load through ``COPY ... FROM STDIN``, streaming the rows as CSV
+
+        Rows are turned into CSV ``COPY_CHUNKSIZE`` at a time, all within one
+        transaction, so that the whole frame is never held as text at once.
+        """
+        table.create(df, dtypes=dtypes, if_exists=if_exists)
+        target, columns = self._quoted(table, df)
+        statement = f"COPY {target} ({columns}) FROM STDIN WITH CSV NULL '\\N'"
+        connection = table.channel.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                for start in range(0, len(df), self.COPY_CHUNKSIZE):
+                    chunk = df.iloc[start : start + self.COPY_CHUNKSIZE]
+                    buffer = io.StringIO()
+                    self._whole_numbers(chunk, dtypes).to_csv(
+                        buffer, index=False, header=False, na_rep=r"\N"
+                    )
+                    buffer.seek(0)
+                    cursor.copy_expert(statement, buffer)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        return True
+
 
 class MSSQL(Distro):
     name = "mssql"
@@ -239,6 +614,13 @@ class MSSQL(Distro):
     regex = r"(^(mss|ms s|micro).*)|(.*server)"
     driver = "pyodbc"
     resolver = "[{database}].[{schema}].[{name}]"
+    max_parameters = 2099  # Fewer than 2100
+    create_as_template = "SELECT * INTO {target} FROM ({select}) AS source"
+    alter_column_template = "ALTER TABLE {target} ALTER COLUMN {column} {type}"
+    NUMERIC_RANGES = {mssql.TINYINT: 2 ** 8 - 1, **Distro.NUMERIC_RANGES}
+    UNSIGNED_TYPES = (mssql.TINYINT,)
+    # Memory for a query is granted by the declared width of VARCHAR
+    VARCHAR_STEP = 10
     find_template = """--MSSQL.find()
         select
             sch.name as [schema],
@@ -256,6 +638,12 @@ class MSSQL(Distro):
         and type_desc not in ('sql_stored_procedure');
         """
 
+    @staticmethod
+    def _create_datetime_spec(timezone, fractional):
+        """DATETIME2 and DATETIMEOFFSET, rather than DATETIME, to the 100ns"""
+        # pylint: disable=unused-argument # Both keep fractions anyway
+        return mssql.DATETIMEOFFSET if timezone else mssql.DATETIME2
+
     def create_spec(self, *, server, database, engine_kwargs):
         # https://docs.sqlalchemy.org/en/13/dialects/mssql.html
         spec_dict = {
@@ -333,6 +721,9 @@ class SQLite(Distro):
     regex = r"^.*lite\d?"
     driver = "sqlite3"
     resolver = "{name}"
+    # Default SQLITE_MAX_VARIABLE_NUMBER before 3.32
+    max_parameters = 999
+    alter_column_template = None
 
     # Filenames have wholly different semantics from other SQL identifiers
     untouchable_identifiers = ["database"]
@@ -342,9 +733,75 @@ class SQLite(Distro):
         where type = 'table' and name like '{object_pattern}';
         """
 
+    # Build outputs can be rebuilt, so trade durability for loading speed
+    PRAGMA_PROFILES = {
+        "bulk": {
+            "journal_mode": "WAL",
+            "synchronous": "OFF",
+            "cache_size": -(2 ** 18),  # KiB, i.e. 256 MiB
+            "mmap_size": 2 ** 28,
+            "temp_store": "MEMORY",
+        },
+        "safe": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    }
+    _listeners = {}
+
+    @classmethod
+    def use_profile(cls, engine, profile):
+        """Apply the named pragma profile to every connection the engine opens"""
+        try:
+            pragmas = cls.PRAGMA_PROFILES[str(profile).lower()]
+        except KeyError:
+            raise ValueError(
+                f"Unknown SQLite profile `{profile}`; use {list(cls.PRAGMA_PROFILES)}"
+            )
+        cls.restore(engine)
+
+        def set_pragmas(dbapi_connection, connection_record):
+            # pylint: disable=unused-argument
+            cls._set_pragmas(dbapi_connection, pragmas)
+
+        sa.event.listen(engine, "connect", set_pragmas)
+        cls._listeners[engine] = set_pragmas
+        # Pooled connections are already open and would miss the pragmas
+        engine.dispose()
+        logger.debug("Using SQLite %s profile for %s", profile, engine.url)
+
+    @classmethod
+    def restore(cls, engine):
+        """Stop applying any profile, returning the database to safe settings"""
+        listener = cls._listeners.pop(engine, None)
+        if listener is None:
+            return
+        sa.event.remove(engine, "connect", listener)
+        engine.dispose()
+        # Only the journal mode outlives the connection that set it
+        connection = engine.raw_connection()
+        try:
+            cls._set_pragmas(connection, cls.PRAGMA_PROFILES["safe"])
+        finally:
+            connection.close()
+        logger.debug("Restored safe SQLite settings for %s", engine.url)
+
+    @staticmethod
+    def _set_pragmas(dbapi_connection, pragmas):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma} = {value}")
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def is_memory(database):
+        """Whether the database refers to SQLite's in-memory database"""
+        return not database or bool(
+            re.match("[^a-z]*memory[^a-z]*", str(database).lower())
+        )
+
     def create_spec(self, *, server, database, engine_kwargs):
         # pylint: disable=unused-argument # server unneeded
-        if not database or re.match("[^a-z]*memory[^a-z]*", str(database).lower()):
+        if self.is_memory(database):
             final_database = ":memory:"
         else:
             resolved = Path(database).expanduser().resolve()
@@ -362,10 +819,197 @@ class SQLite(Distro):
         ]
         return result_list
 
-    def determine_dtypes(self, df):
+    def determine_dtypes(self, df, sample=None):
         """SQlite does not make gradations in integers or text, so don't try."""
         return None
 
+    def fit_dtypes(self, df, known, sample=None):
+        return None
+
+
+class DtypeAccumulator:
+    """Narrowest SQL types for every chunk seen so far, widening as more arrive
+
+    Running statistics of each column -- its range, whether every value is
+    whole, and the most bytes of its text -- are merged chunk by chunk, so
+    that no chunk need be seen twice. The types follow the same rules as
+    :meth:`Distro.determine_dtypes`; once a column can no longer be narrowed,
+    it takes the type pandas would have given it.
+
+    :param known: Types to start from (e.g., recorded in a
+        :class:`laforge.catalog.SchemaCatalog`), kept wherever wide enough.
+    """
+
+    FALLBACKS = {
+        "int": sa.types.BIGINT,
+        "float": sa.types.Float(precision=53),
+        "text": sa.types.Text,
+    }
+
+    def __init__(self, distro, known=None):
+        self.distro = distro
+        self.known = known or {}
+        self.stats = {}
+        self.dtypes = {}
+        self.sized = set()
+        self.started = False
+
+    def update(self, chunk):
+        """Take in another chunk; return the columns it needs widened, with types
+
+        The first chunk determines the types to create the table with, and
+        needs nothing widened.
+        """
+        for i, column in enumerate(chunk.columns):
+            self._observe(column, chunk.iloc[:, i])
+        if not self.started:
+            self.started = True
+            for column in chunk.columns:
+                self._start(column)
+            return {}
+        widened = {}
+        for column in chunk.columns:
+            spec = self._grow(column)
+            if spec is not None:
+                widened[column] = spec
+        return widened
+
+    def _start(self, column):
+        """Type to create the column with, from the first chunk and any known type"""
+        before = self.known.get(column)
+        if column not in self.stats:
+            spec = before
+        elif before is None:
+            spec = self._spec(column)
+        else:
+            spec = self._widened(column, before)
+        if spec is not None:
+            self.dtypes[column] = spec
+        if column in self.stats or before is not None:
+            self.sized.add(column)
+
+    def _grow(self, column):
+        """Wider type the column now needs, if any, taking it on as its own"""
+        if column not in self.stats:
+            return None
+        if column in self.sized and column not in self.dtypes:
+            return None  # Already as wide as pandas makes it
+        current = self.dtypes.get(column)
+        spec = self._widened(column, current)
+        self.sized.add(column)
+        if spec is None or repr(spec) == repr(current):
+            return None
+        logger.debug("Widening column [%s] from %r to %r", column, current, spec)
+        self.dtypes[column] = spec
+        return spec
+
+    def _observe(self, column, series):
+        values = series.dropna()
+        if values.empty:
+            return
+        stats = self.stats.setdefault(
+            column, {"kinds": set(), "range": [], "whole": True, "bytes": 0}
+        )
+        if series.dtype in ("int64", "float64"):
+            if series.dtype == "float64":
+                kind = "float"
+                with np.errstate(invalid="ignore"):
+                    whole = len(values) == len(series) and not np.any(
+                        np.mod(values.to_numpy(), 1) != 0
+                    )
+                stats["whole"] = stats["whole"] and whole
+            else:
+                kind = "int"
+            observed = [values.min(), values.max()] + stats["range"]
+            stats["range"] = [min(observed), max(observed)]
+        elif series.dtype in ("object", "unicode_", "string_"):
+            length = utf8_max_length(series)
+            kind = "other" if length is None else "text"
+            stats["bytes"] = max(stats["bytes"], length or 0)
+        else:
+            kind = "other"
+        stats["kinds"].add(kind)
+
+    def _spec(self, column):
+        """Narrowest type for all values seen; None if no one type narrows them"""
+        stats = self.stats[column]
+        if stats["kinds"] == {"text"}:
+            return self.distro._create_varchar_spec(stats["bytes"])
+        if stats["kinds"] <= {"int", "float"} and stats["whole"]:
+            return self.distro._check_integer_spec(column, pd.Series(stats["range"]))
+        return None
+
+    def _kind(self, column):
+        kinds = self.stats[column]["kinds"]
+        for kind in ("other", "text", "float", "int"):
+            if kind in kinds:
+                return kind
+        return None
+
+    def _widened(self, column, current):
+        spec = self._spec(column)
+        if current is not None and spec is not None:
+            spec = self.distro.wider_dtype(current, spec)
+        if spec is None:
+            return self.FALLBACKS.get(self._kind(column))
+        return spec
+
+
+def is_integer_type(sqltype):
+    return isinstance(sqltype, sa.types.Integer) or (
+        isinstance(sqltype, type) and issubclass(sqltype, sa.types.Integer)
+    )
+
+
+def is_datetime_type(sqltype):
+    return isinstance(sqltype, sa.types.DateTime) or (
+        isinstance(sqltype, type) and issubclass(sqltype, sa.types.DateTime)
+    )
+
+
+def is_timezone_aware(sqltype):
+    if sqltype is mssql.DATETIMEOFFSET:
+        return True
+    return bool(getattr(sqltype, "timezone", False))
+
+
+_BEYOND_ASCII = re.compile(r"[^\x00-\x7f]")
+
+
+def _has_only_ascii(text):
+    return _BEYOND_ASCII.search(text) is None
+
+
+# str.isascii is much the faster, but only from Python 3.7
+_is_ascii = getattr(str, "isascii", _has_only_ascii)
+
+
+def utf8_max_length(series):
+    """Most bytes any string in series takes as UTF-8; None if it has no strings
+
+    Characters are counted for every string, but only distinct text beyond
+    ASCII is encoded, longest first, until no shorter string could take more
+    bytes.
+    """
+    try:
+        series.str  # pylint: disable=pointless-statement # Refuses non-text
+    except AttributeError:
+        return None
+    strings = series.to_numpy()[series.notna().to_numpy()]
+    if pd.api.types.infer_dtype(strings, skipna=False) != "string":
+        # Other objects with a length (e.g., lists) are not text
+        strings = strings[[isinstance(x, str) for x in strings]]
+    if not len(strings):
+        return None
+    is_ascii = np.fromiter(map(_is_ascii, strings), dtype=bool, count=len(strings))
+    longest = max(map(len, strings[is_ascii]), default=0)
+    beyond_ascii = pd.unique(strings[~is_ascii])
+    for text in sorted(beyond_ascii, key=len, reverse=True):
+        if len(text) * 4 <= longest:
+            break
+        longest = max(longest, len(text.encode("utf-8")))
+    return int(longest)
+
 
 def round_up(n, nearest=1):
     """Round up ``n`` to the nearest ``nearest``.
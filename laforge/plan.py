@@ -0,0 +1,232 @@
+"""Compiled build plans: tasks as parsed and templated from an INI, kept on disk.
+
+Loading a plan skips parsing the INI and putting together the configuration of
+every section, which takes a while for INIs of thousands of sections. A plan
+is used only while the INI, its .env, and the sections chosen are unchanged.
+
+Values from .env, such as database credentials, are not written into the plan
+but filled in again from .env on loading, and only the owner may read the file.
+"""
+
+import logging
+import os
+import pickle
+import threading
+from pathlib import Path
+
+from . import __version__
+from .state import STATE_DIR, digest
+
+logger = logging.getLogger(__name__)
+logger.debug(__name__)
+
+
+def plan_key(from_string, location, env_path=None, targets=(), tags=()):
+    env_text = Path(env_path).read_text() if env_path else ""
+    return digest(
+        BuildPlan.VERSION,
+        __version__,
+        from_string,
+        Path(location).resolve(),
+        env_text,
+        sorted(targets or ()),
+        sorted(tags or ()),
+    )
+
+
+class FromEnv:
+    """Stands in, on disk, for the value of key in .env"""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __getstate__(self):
+        return self.key
+
+    def __setstate__(self, state):
+        self.key = state
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.key})>"
+
+
+def withhold_env(config, env):
+    """Copy of config with each value taken from env replaced by :class:`FromEnv`"""
+    withheld = {}
+    for key, value in config.items():
+        if isinstance(value, dict):
+            value = withhold_env(value, env)
+        elif isinstance(key, str) and value is not None and env.get(key) == value:
+            value = FromEnv(key)
+        withheld[key] = value
+    return withheld
+
+
+def restore_env(config, env):
+    """Fill in, in place, each value that :func:`withhold_env` took out"""
+    for key, value in config.items():
+        if isinstance(value, dict):
+            restore_env(value, env)
+        elif isinstance(value, FromEnv):
+            config[key] = env[value.key]
+    return config
+
+
+class PlannedTask:
+    """Everything needed to construct a task, with its section config by index"""
+
+    __slots__ = ("identifier", "verb", "target", "content", "section")
+
+    def __init__(self, identifier, verb, target, content, section):
+        self.identifier = identifier
+        self.verb = verb
+        self.target = target
+        self.content = content
+        self.section = section
+
+    def __getstate__(self):
+        return tuple(getattr(self, x) for x in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.identifier})>"
+
+
+class BuildPlan:
+    """The DEFAULT config, each section's config, and the tasks of a build
+
+    :param key: Digest of whatever the plan was compiled from (see
+        :func:`plan_key`).
+    """
+
+    VERSION = 2
+    FILENAME = "plan.pickle"
+
+    def __init__(self, key, config, sections, tasks):
+        self.key = key
+        self.config = config
+        self.sections = sections
+        self.tasks = tasks
+
+    @classmethod
+    def compile(cls, key, config, tasks):
+        sections = []
+        index = {}
+        planned = []
+        for task in tasks:
+            if id(task.config) not in index:
+                index[id(task.config)] = len(sections)
+                sections.append(task.config)
+            planned.append(
+                PlannedTask(
+                    task.identifier,
+                    task.verb,
+                    task.target,
+                    task.content,
+                    index[id(task.config)],
+                )
+            )
+        return cls(key, config, sections, planned)
+
+    @staticmethod
+    def path_in(location):
+        return Path(location) / STATE_DIR / BuildPlan.FILENAME
+
+    @classmethod
+    def load(cls, path, key, env=None):
+        """Plan stored at path if compiled with key; otherwise None
+
+        :param env: Values of .env, to fill in those left out on saving.
+        """
+        try:
+            with open(path, "rb") as stream:
+                plan = pickle.load(stream)
+        except FileNotFoundError:
+            return None
+        except Exception as err:  # pylint: disable=broad-except
+            logger.warning("Ignoring unreadable build plan %s: %s", path, err)
+            return None
+        if not isinstance(plan, cls) or plan.key != key:
+            logger.debug("Build plan %s is out of date.", path)
+            return None
+        try:
+            restore_env(plan.config, env or {})
+            for section in plan.sections:
+                restore_env(section, env or {})
+        except KeyError as err:
+            logger.debug("Build plan %s needs %s from .env", path, err)
+            return None
+        logger.debug("Loaded build plan from %s", path)
+        return plan
+
+    def save(self, path, env=None):
+        """Write the plan to path, leaving out any values from ``env``"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        env = env or {}
+        stored = BuildPlan(
+            self.key,
+            withhold_env(self.config, env),
+            [withhold_env(x, env) for x in self.sections],
+            self.tasks,
+        )
+        temporary = path.with_suffix(f".{threading.get_ident()}.tmp")
+        descriptor = os.open(
+            str(temporary), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+        )
+        with open(descriptor, "wb") as stream:
+            pickle.dump(stored, stream, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(str(temporary), str(path))
+        logger.debug("Saved build plan to %s", path)
+
+    def construct(self, factory):
+        """Tasks as made by ``factory(verb, target, content, config, identifier)``"""
+        return [
+            factory(
+                verb=x.verb,
+                target=x.target,
+                content=x.content,
+                config=self.sections[x.section],
+                identifier=x.identifier,
+            )
+            for x in self.tasks
+        ]
+
+    def describe(self):
+        """Line by line account of the plan"""
+        lines = [f"Plan {self.key[:12]}: {len(self.tasks)} tasks"]
+        lines.extend(
+            f"{x.identifier:<30} {x.verb.name:<8} {x.target.name:<10} {x.content}"
+            for x in self.tasks
+        )
+        return "\n".join(lines)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.key[:12]}, {len(self)} tasks)>"
+
+
+"""
+Copyright 2019 Matt VanEseltine.
+
+This file is part of laforge.
+
+laforge is free software: you can redistribute it and/or modify it under
+the terms of the GNU Affero General Public License as published by the Free
+Software Foundation, either version 3 of the License, or (at your option) any
+later version.
+
+laforge is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.  See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with laforge.  If not, see <https://www.gnu.org/licenses/>.
+"""
@@ -0,0 +1,258 @@
+"""Measure each task of a build: time, rows and columns, memory, and bytes moved.
+
+Each task can also be profiled separately, written as a ``.prof`` file for
+:mod:`pstats` or tools such as snakeviz.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import pstats
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+logger.debug(__name__)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# CPU time of this thread alone from Python 3.7; of the whole process before
+cpu_time = getattr(time, "thread_time", time.process_time)
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, where known"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def shape(results):
+    """Rows and columns of DataFrame-like results; None for anything else"""
+    try:
+        return len(results), len(results.columns)
+    except (AttributeError, TypeError):
+        return None, None
+
+
+def file_bytes(resources):
+    """Total size of the files among resources; None if there are none"""
+    sizes = []
+    for resource_ in resources:
+        if resource_.kind != "file":
+            continue
+        try:
+            sizes.append(Path(resource_.name).stat().st_size)
+        except OSError:
+            continue
+    return sum(sizes) if sizes else None
+
+
+class TaskMeasurement:
+    """What one task took and what it handled"""
+
+    FIELDS = [
+        "section",
+        "identifier",
+        "description",
+        "wall_seconds",
+        "cpu_seconds",
+        "rows_in",
+        "columns_in",
+        "rows_out",
+        "columns_out",
+        "memory_bytes",
+        "peak_rss_increase",
+        "bytes_read",
+        "bytes_written",
+        "cached",
+        "failed",
+        "profile",
+    ]
+
+    def __init__(self, task, section, prior_results=None):
+        self.task = task
+        self.section = section
+        self.identifier = task.identifier
+        self.description = task.description.strip()
+        self.rows_in, self.columns_in = shape(prior_results)
+        self.rows_out = self.columns_out = self.memory_bytes = None
+        self.wall_seconds = self.cpu_seconds = None
+        self.peak_rss_increase = self.bytes_read = self.bytes_written = None
+        self.cached = False
+        self.failed = False
+        self.profile = None
+        self.results = None
+        self._wall = time.perf_counter()
+        self._cpu = cpu_time()
+        self._rss = peak_rss()
+
+    def finish(self, failed=False):
+        """Take measurements, then let go of the results"""
+        from .results import frame_bytes
+
+        results, self.results = self.results, None
+        self.wall_seconds = time.perf_counter() - self._wall
+        self.cpu_seconds = cpu_time() - self._cpu
+        if self._rss is not None:
+            self.peak_rss_increase = peak_rss() - self._rss
+        self.failed = failed
+        self.rows_out, self.columns_out = shape(results)
+        if self.rows_out is not None:
+            # Counting every string would take as long as some tasks themselves
+            self.memory_bytes = getattr(results, "bytes", None) or frame_bytes(
+                results, deep=False
+            )
+        self.bytes_read = file_bytes(self.task.inputs)
+        self.bytes_written = file_bytes(self.task.outputs)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.identifier})>"
+
+
+class BuildReport:
+    """Measurements of every task executed in a build, plus sections skipped.
+
+    Peak RSS is for the whole process, so with several jobs at once the increase
+    seen by one task may be owed to another.
+
+    :param profile_dir: If given, profile each task into a file named for it here.
+    """
+
+    def __init__(self, profile_dir=None):
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.started = time.time()
+        self.finished = None
+        self.tasks = []
+        self.skipped = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, task, section, prior_results=None):
+        measurement = TaskMeasurement(task, section, prior_results)
+        profiler = cProfile.Profile() if self.profile_dir else None
+        try:
+            if profiler:
+                profiler.enable()
+            yield measurement
+        except BaseException:
+            measurement.finish(failed=True)
+            raise
+        else:
+            measurement.finish()
+        finally:
+            if profiler:
+                profiler.disable()
+                measurement.profile = self._dump(profiler, task.identifier)
+            with self._lock:
+                self.tasks.append(measurement)
+
+    def _dump(self, profiler, identifier):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.profile_dir / (re.sub(r"[^\w.-]", "_", identifier) + ".prof")
+        profiler.dump_stats(str(path))
+        return str(path)
+
+    def skip(self, section):
+        with self._lock:
+            self.skipped.append(section)
+
+    def finish(self):
+        self.finished = time.time()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    def to_dict(self):
+        return {
+            "started": self.started,
+            "elapsed_seconds": self.elapsed,
+            "skipped_sections": self.skipped,
+            "tasks": [measurement.to_dict() for measurement in self.tasks],
+        }
+
+    def write(self, path):
+        Path(path).write_text(json.dumps(self.to_dict(), indent=1))
+        logger.info("Wrote build report to %s", path)
+
+    def summary(self, limit=10):
+        """Table of the slowest tasks"""
+        slowest = sorted(self.tasks, key=lambda x: x.wall_seconds, reverse=True)
+        lines = [
+            f"{'Task':<30} {'Wall s':>9} {'CPU s':>9} {'Rows out':>12} "
+            f"{'Memory':>14} {'Peak RSS +':>14}"
+        ]
+        for measurement in slowest[:limit]:
+            lines.append(
+                f"{measurement.identifier:<30} "
+                f"{measurement.wall_seconds:>9.2f} "
+                f"{measurement.cpu_seconds:>9.2f} "
+                f"{_number(measurement.rows_out):>12} "
+                f"{_number(measurement.memory_bytes):>14} "
+                f"{_number(measurement.peak_rss_increase):>14}"
+            )
+        if len(slowest) > limit:
+            lines.append(f"... and {len(slowest) - limit} faster task(s)")
+        lines.append(
+            f"{len(self.tasks)} task(s) in {self.elapsed:.2f} seconds; "
+            f"{len(self.skipped)} section(s) skipped"
+        )
+        return "\n".join(lines)
+
+    def hotspots(self, tasks=3, limit=10):
+        """Functions taking the most cumulative time within the slowest tasks"""
+        profiled = [m for m in self.tasks if m.profile]
+        slowest = sorted(profiled, key=lambda x: x.wall_seconds, reverse=True)
+        sections = []
+        for measurement in slowest[:tasks]:
+            stream = io.StringIO()
+            stats = pstats.Stats(measurement.profile, stream=stream)
+            stats.sort_stats("cumulative").print_stats(limit)
+            sections.append(
+                f"{measurement.identifier} ({measurement.wall_seconds:.2f} s), "
+                f"profiled in {measurement.profile}:\n{stream.getvalue().strip()}"
+            )
+        return "\n\n".join(sections)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({len(self)} tasks)>"
+
+
+def _number(value):
+    return "-" if value is None else f"{value:,}"
+
+
+"""
+Copyright 2019 Matt VanEseltine.
+
+This file is part of laforge.
+
+laforge is free software: you can redistribute it and/or modify it under
+the terms of the GNU Affero General Public License as published by the Free
+Software Foundation, either version 3 of the License, or (at your option) any
+later version.
+
+laforge is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.  See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with laforge.  If not, see <https://www.gnu.org/licenses/>.
+"""
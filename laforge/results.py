@@ -0,0 +1,331 @@
+"""Results handed between tasks beyond the prior results of the task just before."""
+
+import logging
+import itertools
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+import sqlalchemy as sa
+
+from .cache import FRAME_SUFFIX, load_frame, save_frame
+
+logger = logging.getLogger(__name__)
+logger.debug(__name__)
+
+
+class ResultNotFound(KeyError):
+    pass
+
+
+def frame_bytes(df, deep=True):
+    """Bytes a DataFrame takes; without ``deep``, not counting what text holds"""
+    if not isinstance(df, pd.DataFrame):
+        return 0
+    return int(df.memory_usage(deep=deep).sum())
+
+
+def materialize(results):
+    """Full DataFrame from whatever form results have taken"""
+    if isinstance(results, (SpilledResult, StreamedResult)):
+        return results.to_frame()
+    return results
+
+
+class StreamedResult:
+    """DataFrame read piece by piece as it is used, never held whole in memory.
+
+    :param open_chunks: Callable returning a fresh iterator of DataFrames from
+        the source; it is called again each time the chunks are needed, except
+        just after :attr:`first` has opened it.
+    :param channel: The :class:`laforge.sql.Channel` read from, if any.
+    """
+
+    def __init__(self, open_chunks, label="", channel=None):
+        self._open_chunks = open_chunks
+        self.label = label
+        self.channel = channel
+        self._first = None
+        self._opened = None
+
+    def chunks(self):
+        """Yield the DataFrame piece by piece, reading from the source"""
+        opened, self._opened = self._opened, None
+        yield from self._open_chunks() if opened is None else opened
+
+    @property
+    def first(self):
+        """First chunk, read once and kept to describe the whole
+
+        The source is left open, with the chunk put back in front, for the next
+        pass through :meth:`chunks` to carry on from.
+        """
+        if self._first is None:
+            chunks = iter(self._open_chunks())
+            first = next(chunks, None)
+            self._first = pd.DataFrame() if first is None else first
+            self._opened = itertools.chain([] if first is None else [first], chunks)
+        return self._first
+
+    @property
+    def columns(self):
+        return self.first.columns
+
+    @property
+    def empty(self):
+        return self.first.empty
+
+    def to_frame(self):
+        logger.debug("Reading all of %s into memory", self)
+        frames = list(self.chunks())
+        if not frames:
+            return self.first
+        return pd.concat(frames, ignore_index=True)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.label})>"
+
+
+class QueryResult(StreamedResult):
+    """Rows of a SQL table or query left on the server, read only if needed.
+
+    A table write on the same channel copies a table there directly (see
+    :meth:`laforge.sql.Table.write`), and a CSV write exports the rows straight
+    from the server; anything else reads them chunk by chunk.
+    """
+
+    def __init__(self, channel, statement, table=None, chunksize=100000):
+        super().__init__(
+            partial(channel.read_chunks, statement, chunksize=chunksize),
+            label=str(table or statement),
+            channel=channel,
+        )
+        self.statement = statement
+        self.table = table
+
+    @classmethod
+    def of_table(cls, table, chunksize=100000):
+        select_all = sa.select([table.metal])
+        return cls(table.channel, select_all, table=table, chunksize=chunksize)
+
+    @property
+    def columns(self):
+        if self.table is None:
+            return super().columns
+        return pd.Index(self.table.metal.columns.keys())
+
+    @property
+    def empty(self):
+        if self.table is None:
+            return super().empty
+        probe = sa.select([sa.literal(1)]).select_from(self.table.metal).limit(1)
+        with self.channel.engine.connect() as connection:
+            return connection.execute(probe).first() is None
+
+    def export_csv(self, path):
+        """Write the rows, with a header, to CSV without pandas in between"""
+        self.channel.distro.export_csv(self.channel, self.statement, path)
+
+
+class SpilledResult:
+    """DataFrame moved out of memory into a file on disk, read back chunk by chunk.
+
+    The file is Arrow IPC, memory-mapped while reading, when pyarrow is
+    available; otherwise each chunk is pickled separately. Files are removed
+    once the result is no longer referenced.
+    """
+
+    def __init__(self, df, directory=None, chunksize=100000):
+        if directory:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+        self.directory = Path(tempfile.mkdtemp(prefix="spill-", dir=directory))
+        self._cleanup = weakref.finalize(self, shutil.rmtree, str(self.directory), True)
+        self.columns = df.columns
+        self.rows = len(df)
+        self.bytes = frame_bytes(df)
+        self.chunksize = max(int(chunksize), 1)
+        self._arrow = self._write_arrow(df) or self._write_pickles(df)
+        logger.info(
+            "Moved %s rows (%s bytes in memory) to %s",
+            self.rows,
+            self.bytes,
+            self.directory,
+        )
+
+    def _write_arrow(self, df):
+        try:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except Exception as err:  # pylint: disable=broad-except
+            logger.debug("Not spilling as Arrow: %s", err)
+            return False
+        with pa.OSFile(str(self.directory / "frame.arrow"), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=self.chunksize)
+        return True
+
+    def _write_pickles(self, df):
+        for i, start in enumerate(range(0, len(df), self.chunksize)):
+            chunk = df.iloc[start : start + self.chunksize]
+            chunk.to_pickle(self.directory / f"chunk-{i:08}.pickle")
+        return False
+
+    def chunks(self):
+        """Yield the DataFrame back piece by piece"""
+        if not self._arrow:
+            for path in sorted(self.directory.glob("chunk-*.pickle")):
+                yield pd.read_pickle(path)
+            return
+        import pyarrow as pa
+
+        with pa.memory_map(str(self.directory / "frame.arrow"), "r") as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pandas()
+
+    def to_frame(self):
+        logger.debug("Reading %s rows back into memory from %s", self.rows, self)
+        frames = list(self.chunks())
+        if not frames:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def discard(self):
+        self._cleanup()
+
+    @property
+    def empty(self):
+        return not self.rows or not len(self.columns)
+
+    def __len__(self):
+        return self.rows
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.rows} rows, {self.directory})>"
+
+
+class ResultRegistry:
+    """Results kept by name, each freed once its last expected reader has it.
+
+    Beyond ``max_bytes`` held in memory, the least recently used results are
+    moved into ``spill_dir`` until read again.
+    """
+
+    def __init__(self, max_bytes=None, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self._entries = {}
+        self._expected = {}
+        self._lock = threading.RLock()
+
+    def expect(self, name, readers):
+        """Set how many readers will ask for the named result"""
+        with self._lock:
+            self._expected[name] = readers
+
+    def readers(self, name):
+        """How many readers are expected for the named result"""
+        return self._expected.get(name, 0)
+
+    def put(self, name, df):
+        with self._lock:
+            self.discard(name)
+            readers = self.readers(name)
+            if not readers:
+                logger.warning("No later section reads @%s; not keeping it.", name)
+                return
+            self._entries[name] = {
+                "df": df,
+                "path": None,
+                "bytes": frame_bytes(df),
+                "readers": readers,
+                "used": time.monotonic(),
+            }
+            logger.debug("Keeping @%s for %s reader(s).", name, readers)
+            self._evict(keep=name)
+
+    def take(self, name):
+        """Retrieve the named result, freeing it if this is the last reader"""
+        with self._lock:
+            try:
+                entry = self._entries[name]
+            except KeyError:
+                raise ResultNotFound(f"No result named @{name} is available.")
+            entry["readers"] -= 1
+            entry["used"] = time.monotonic()
+            df = entry["df"] if entry["path"] is None else load_frame(entry["path"])
+            if entry["readers"] <= 0:
+                self.discard(name)
+                logger.debug("Freed @%s after its last reader.", name)
+            return df
+
+    def discard(self, name):
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry and entry["path"] is not None:
+                Path(entry["path"]).unlink()
+
+    def clear(self):
+        with self._lock:
+            for name in list(self._entries):
+                self.discard(name)
+
+    @property
+    def in_memory(self):
+        return sum(e["bytes"] for e in self._entries.values() if e["path"] is None)
+
+    def _evict(self, keep=None):
+        if self.max_bytes is None:
+            return
+        candidates = sorted(
+            (e["used"], name)
+            for name, e in self._entries.items()
+            if isinstance(e["df"], pd.DataFrame) and name != keep
+        )
+        while self.in_memory > self.max_bytes and candidates:
+            _, name = candidates.pop(0)
+            self._spill(name)
+
+    def _spill(self, name):
+        if self.spill_dir is None:
+            return
+        entry = self._entries[name]
+        path = self.spill_dir / f"{name}-{uuid.uuid4().hex}{FRAME_SUFFIX}"
+        entry["path"] = save_frame(entry["df"], path)
+        entry["df"] = None
+        logger.info("Moved @%s (%s bytes) out of memory to disk.", name, entry["bytes"])
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({', '.join(self._entries)})>"
+
+
+"""
+Copyright 2019 Matt VanEseltine.
+
+This file is part of laforge.
+
+laforge is free software: you can redistribute it and/or modify it under
+the terms of the GNU Affero General Public License as published by the Free
+Software Foundation, either version 3 of the License, or (at your option) any
+later version.
+
+laforge is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.  See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with laforge.  If not, see <https://www.gnu.org/licenses/>.
+"""
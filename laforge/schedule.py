@@ -0,0 +1,192 @@
+"""Work out dependencies between build sections and run independent ones at once."""
+
+import logging
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+logger.debug(__name__)
+
+
+class Resource(namedtuple("Resource", ["kind", "scope", "name"])):
+    """Something a task reads, writes, or checks: a file, a SQL table, etc.
+
+    A ``name`` of None covers everything within ``scope`` (e.g., any table
+    through one channel); a ``kind`` of None covers absolutely everything.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def everything(cls):
+        return cls(None, None, None)
+
+    def overlaps(self, other):
+        if self.kind is None or other.kind is None:
+            return True
+        if (self.kind, self.scope) != (other.kind, other.scope):
+            return False
+        return self.name is None or other.name is None or self.name == other.name
+
+
+def any_overlap(these, those):
+    return any(x.overlaps(y) for x in these for y in those)
+
+
+class Section:
+    """Tasks from a single INI section, always executed in their original order."""
+
+    def __init__(self, name, tasks, index):
+        self.name = name
+        self.tasks = list(tasks)
+        self.index = index
+        self.inputs = {r for task in self.tasks for r in task.inputs}
+        self.outputs = {r for task in self.tasks for r in task.outputs}
+
+    @property
+    def carries_in(self):
+        """Whether the first task consumes results left by the prior section"""
+        return bool(self.tasks) and self.tasks[0].consumes_results
+
+    def depends_on(self, earlier):
+        """Whether this section must wait for an earlier section to finish"""
+        if self.carries_in and earlier.index == self.index - 1:
+            return True
+        return (
+            any_overlap(earlier.outputs, self.inputs)
+            or any_overlap(earlier.inputs, self.outputs)
+            or any_overlap(earlier.outputs, self.outputs)
+        )
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.name}, {len(self)} tasks)>"
+
+
+class BuildGraph:
+    """Sections of a build along with the upstream sections each depends upon."""
+
+    def __init__(self, tasks):
+        self.sections = self._group(tasks)
+        self.upstream = {
+            section.name: {
+                earlier.name
+                for earlier in self.sections[: section.index]
+                if section.depends_on(earlier)
+            }
+            for section in self.sections
+        }
+
+    def closure(self, names):
+        """Names of the given sections along with everything upstream of them"""
+        found = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name not in found:
+                found.add(name)
+                pending.extend(self.upstream[name])
+        return found
+
+    @staticmethod
+    def _group(tasks):
+        grouped = []
+        for task in tasks:
+            name = task.config.get("section", "")
+            if not grouped or grouped[-1][0] != name:
+                grouped.append((name, []))
+            grouped[-1][1].append(task)
+        return [Section(name, group, i) for i, (name, group) in enumerate(grouped)]
+
+    def __getitem__(self, name):
+        for section in self.sections:
+            if section.name == name:
+                return section
+        raise KeyError(name)
+
+    def __len__(self):
+        return len(self.sections)
+
+
+class ParallelScheduler:
+    """Run sections on a thread pool as soon as their upstream sections finish.
+
+    Results carried from one section to the next are handed over only where the
+    following section begins by consuming them.
+    """
+
+    def __init__(self, graph, jobs):
+        self.graph = graph
+        self.jobs = jobs
+
+    def run(self, run_section):
+        """Run every section via ``run_section(section, prior_results)``.
+
+        Returns the results of the final section.
+        """
+        sections = self.graph.sections
+        pending = list(sections)
+        done = set()
+        carried = {}
+        running = {}
+        failures = []
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while (pending and not failures) or running:
+                ready = (
+                    [] if failures else [s for s in pending if self._is_ready(s, done)]
+                )
+                for section in ready:
+                    pending.remove(section)
+                    prior_results = None
+                    if section.carries_in:
+                        prior_results = carried.get(section.index - 1)
+                    future = pool.submit(run_section, section, prior_results)
+                    running[future] = section
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    section = running.pop(future)
+                    try:
+                        carried[section.index] = future.result()
+                    except Exception as err:  # pylint: disable=broad-except
+                        logger.error("Section [%s] failed: %s", section.name, err)
+                        failures.append(err)
+                    done.add(section.name)
+                self._release(carried, pending, keep=len(sections) - 1)
+        if failures:
+            raise failures[0]
+        return carried.get(len(sections) - 1)
+
+    def _is_ready(self, section, done):
+        return self.graph.upstream[section.name] <= done
+
+    @staticmethod
+    def _release(carried, pending, keep):
+        """Drop carried results once no pending section can still take them"""
+        wanted = {s.index - 1 for s in pending if s.carries_in}
+        wanted.add(keep)
+        for index in list(carried):
+            if index not in wanted:
+                del carried[index]
+
+
+"""
+Copyright 2019 Matt VanEseltine.
+
+This file is part of laforge.
+
+laforge is free software: you can redistribute it and/or modify it under
+the terms of the GNU Affero General Public License as published by the Free
+Software Foundation, either version 3 of the License, or (at your option) any
+later version.
+
+laforge is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.  See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with laforge.  If not, see <https://www.gnu.org/licenses/>.
+"""
@@ -0,0 +1,262 @@
+"""Resident build server, so builds need not start Python, import pandas and
+SQLAlchemy, or connect to databases afresh each time.
+
+``laforge serve`` listens on a Unix socket; while it runs, ``laforge build`` hands
+each build to it and relays the log. Builds run one at a time, as a build changes
+the working directory of the whole process while it runs. Where there are no Unix
+sockets, as on Windows, there is no server and every build runs in its own process.
+
+Requests and replies are single lines of JSON. The default socket sits in a
+directory only its user may enter, and it is created readable by that user
+alone; the client, in turn, talks only to a server run by the same user.
+"""
+
+import getpass
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import struct
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+logger.debug(__name__)
+
+SOCKET_VARIABLE = "LAFORGE_SOCKET"
+
+# Windows, for one, has no Unix sockets to serve on
+SERVABLE = hasattr(socket, "AF_UNIX")
+
+
+def default_socket():
+    """Socket named by $LAFORGE_SOCKET, else one in a per-user temp directory"""
+    if os.environ.get(SOCKET_VARIABLE):
+        return Path(os.environ[SOCKET_VARIABLE])
+    return Path(tempfile.gettempdir()) / f"laforge-{getpass.getuser()}" / "laforge.sock"
+
+
+def private_directory(path):
+    """Create the directory for this user alone, or check that it is so"""
+    path = Path(path)
+    path.mkdir(mode=0o700, exist_ok=True)
+    status = path.lstat()
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a directory of this user's own")
+    if status.st_mode & 0o077:
+        raise PermissionError(f"{path} is open to other users")
+    return path
+
+
+def check_owner(path, uid):
+    """Refuse a socket another user runs, who would see every build request"""
+    if uid != os.getuid():
+        raise PermissionError(f"{path} belongs to another user")
+
+
+def send(stream, message):
+    stream.write((json.dumps(message) + "\n").encode("utf-8"))
+    stream.flush()
+
+
+class RelayHandler(logging.Handler):
+    """Send each log record on to the client as it happens"""
+
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream
+
+    def emit(self, record):
+        try:
+            send(self.stream, {"log": self.format(record)})
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+
+
+class BuildRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            # Merely checking that the server is running
+            return
+        try:
+            request = json.loads(line)
+        except ValueError as err:
+            send(self.wfile, {"done": False, "message": f"Bad request: {err}"})
+            return
+        if request.get("stop"):
+            send(self.wfile, {"done": True, "message": "Stopping."})
+            threading.Thread(target=self.server.shutdown).start()
+            return
+        with self.server.build_lock:
+            succeeded, message = self.server.build(request, self.wfile)
+        send(self.wfile, {"done": succeeded, "message": message})
+
+
+class BuildServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Execute builds sent over a Unix socket within this one process
+
+    This is a :class:`socketserver.UnixStreamServer`, but for being defined even
+    where there are no Unix sockets, only to refuse to start.
+    """
+
+    address_family = getattr(socket, "AF_UNIX", None)
+    daemon_threads = True
+
+    def __init__(self, path=None):
+        if self.address_family is None:
+            raise OSError("laforge serve needs Unix sockets, which are missing")
+        self.path = Path(path or default_socket())
+        if path is None and SOCKET_VARIABLE not in os.environ:
+            private_directory(self.path.parent)
+        if BuildClient.if_running(self.path):
+            raise FileExistsError(f"laforge serve is already running at {self.path}")
+        if self.path.exists():
+            self.path.unlink()
+        self.build_lock = threading.Lock()
+        super().__init__(str(self.path), BuildRequestHandler)
+
+    def server_bind(self):
+        # Readable by this user alone from the moment it exists, not after a chmod
+        old_umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(old_umask)
+
+    @staticmethod
+    def warm_up():
+        """Import everything a build needs once, up front"""
+        from . import builder  # noqa: F401 pylint: disable=unused-import
+
+    def build(self, request, stream):
+        from .builder import TaskList
+        from .command import build_config, get_log_formatter
+
+        debug = request.get("debug", False)
+        formatter = get_log_formatter(debug)
+        handlers = [RelayHandler(stream), logging.FileHandler(request["log"])]
+        root = logging.getLogger()
+        old_level = root.level
+        root.setLevel(logging.DEBUG if debug else logging.INFO)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            root.addHandler(handler)
+        try:
+            build_config(
+                Path(request["ini"]),
+                list_class=TaskList,
+                dry_run=request.get("dry_run", False),
+                jobs=request.get("jobs", 1),
+                force=request.get("force", False),
+                explain=request.get("explain", False),
+                report=request.get("report"),
+                profile=request.get("profile", False),
+                resume=request.get("resume", False),
+                targets=request.get("targets", ()),
+                tags=request.get("tags", ()),
+                stream=request.get("stream", False),
+                logger=logger,
+            )
+            return True, "Build complete."
+        except Exception as err:  # pylint: disable=broad-except
+            logger.error("Build failed: %s", err)
+            logger.debug("Build failure", exc_info=True)
+            return False, f"{type(err).__name__}: {err}"
+        finally:
+            for handler in handlers:
+                root.removeHandler(handler)
+                handler.close()
+            root.setLevel(old_level)
+
+    def server_close(self):
+        super().server_close()
+        if self.path.exists():
+            self.path.unlink()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.path})>"
+
+
+class BuildClient:
+    """Send builds to a running :class:`BuildServer`"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    @classmethod
+    def if_running(cls, path=None):
+        """Client for the server at path, or None if no server is listening"""
+        path = Path(path or default_socket())
+        if not (SERVABLE and path.exists()):
+            return None
+        client = cls(path)
+        try:
+            client.connect().close()
+        except OSError:
+            return None
+        return client
+
+    def connect(self):
+        check_owner(self.path, self.path.stat().st_uid)
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(str(self.path))
+            if hasattr(socket, "SO_PEERCRED"):
+                # Linux names the user at the other end: pid, uid, gid
+                credentials = connection.getsockopt(
+                    socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+                )
+                check_owner(self.path, struct.unpack("3i", credentials)[1])
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    def request(self, message, echo=print):
+        """Send the message, echoing any log relayed back; return the final reply"""
+        with self.connect() as connection:
+            stream = connection.makefile("rwb")
+            send(stream, message)
+            for line in stream:
+                reply = json.loads(line)
+                if "log" in reply:
+                    echo(reply["log"])
+                    continue
+                return reply
+        return {"done": False, "message": "Connection to laforge serve lost."}
+
+    def build(self, *, ini, log, echo=print, **options):
+        options.update(ini=str(Path(ini).resolve()), log=str(Path(log).resolve()))
+        reply = self.request(options, echo=echo)
+        if not reply["done"]:
+            echo(reply["message"])
+        return reply["done"]
+
+    def stop(self):
+        return self.request({"stop": True})["done"]
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.path})>"
+
+
+"""
+Copyright 2019 Matt VanEseltine.
+
+This file is part of laforge.
+
+laforge is free software: you can redistribute it and/or modify it under
+the terms of the GNU Affero General Public License as published by the Free
+Software Foundation, either version 3 of the License, or (at your option) any
+later version.
+
+laforge is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.  See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with laforge.  If not, see <https://www.gnu.org/licenses/>.
+"""
@@ -9,8 +9,14 @@
 """
 
 import logging
+import numbers
 import re
 import textwrap
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import chain
 from keyword import kwlist
 from pathlib import Path
 
@@ -53,6 +59,8 @@ class Channel:
 
     known_engines = {}
     known_channels = {}
+    # Sections may run in parallel; engines should still be created only once
+    _engine_lock = threading.RLock()
 
     def __init__(
         self, distro, *, server=None, database=None, schema=None, **engine_kwargs
@@ -65,9 +73,9 @@ class Channel:
         self.database = database
         self.schema = schema
 
-        self.engine = self._construct_engine(**engine_kwargs)
-
-        self.save_engine()
+        with self._engine_lock:
+            self.engine = self._construct_engine(**engine_kwargs)
+            self.save_engine()
         self.metadata = sa.MetaData(bind=self.engine, schema=self.schema)
 
         if self.metadata.bind.url.database:
@@ -139,6 +147,14 @@ class Channel:
                     transxn.commit()
         return final_result
 
+    def read_chunks(self, statement, chunksize):
+        """Yield query results chunksize rows at a time via a server-side cursor"""
+        if isinstance(statement, str):
+            statement = self.clean_up_statement(statement)
+        with self.engine.connect() as cnxn:
+            cnxn = cnxn.execution_options(stream_results=True)
+            yield from pd.read_sql(statement, con=cnxn, chunksize=chunksize)
+
     @staticmethod
     def clean_up_statement(s):
         s = s.strip()
@@ -393,32 +409,421 @@ class Table:
             raise SQLTableNotFound("{} does not exist.".format(self))
         return self.distro.resolver.format(**self.identifiers)
 
-    def write(self, df, if_exists="replace"):
-        """From DataFrame, create a new table and fill it with values"""
+    # Adaptive inserts aim for batches of about this size and duration
+    BATCH_BYTES = 2 ** 20
+    BATCH_SECONDS = 1.0
+
+    def write(
+        self,
+        df,
+        if_exists="replace",
+        chunksize=None,
+        method=None,
+        workers=1,
+        inference=None,
+        catalog=None,
+    ):
+        """From DataFrame, create a new table and fill it with values
+
+        Rather than a DataFrame, ``df`` may provide ``chunks()`` to write piece by
+        piece (e.g., :class:`laforge.results.SpilledResult`).
+        Given a :class:`laforge.results.QueryResult` from a table on the same
+        channel, the rows are copied without ever leaving the server.
+
+        Without a bulk load, rows are inserted ``chunksize`` at a time -- or with
+        ``"auto"``, in batches tuned to the rows' width and observed throughput.
+        ``method`` is passed to :meth:`pandas.DataFrame.to_sql` (e.g., ``"multi"``
+        for multi-row INSERT statements, each kept within the distro's limit on
+        bound parameters).
+
+        With more than one of ``workers``, the table is created first and then
+        filled in partitions over that many connections at once, each partition
+        committed on its own; should one fail, others may already be written.
+
+        Any ``inference`` options (``sample``) are passed on to
+        :meth:`laforge.distros.Distro.determine_dtypes`. Given a
+        :class:`laforge.catalog.SchemaCatalog`, types recorded for this table are
+        kept for as long as the columns fit them, and the types written are
+        recorded in turn.
+        """
         try:
             if df.empty:
                 raise RuntimeError("DataFrame to write is empty!")
         except AttributeError:
             raise RuntimeError(f"Can only write DataFrame, not {type(df)}")
 
+        source = getattr(df, "table", None)
+        if isinstance(source, Table) and source.identifiers != self.identifiers:
+            if source.channel.engine is self.channel.engine:
+                return self._write_on_server(source, if_exists=if_exists)
+
+        if workers > 1 and self.distro.name == "sqlite":
+            logger.warning("SQLite takes one writer at a time; writing %s alone.", self)
+            workers = 1
+
+        if self._reads_own_file(df):
+            logger.info("Reading all of %s before writing to %s", df, self)
+            df = df.to_frame()
+
+        inserts = {"chunksize": chunksize, "method": method}
+        known = catalog.get(self) if catalog is not None else None
+        dtypes = self._write_rows(df, if_exists, workers, inference, known, **inserts)
+        if catalog is not None and dtypes is not None:
+            catalog.put(self, dtypes)
+
+    def _write_rows(self, df, if_exists, workers, inference, known, **inserts):
+        """Write a DataFrame or anything providing chunks; return the types written"""
+        if hasattr(df, "chunks"):
+            return self._write_chunks(
+                df, if_exists, workers, inference=inference, known=known, **inserts
+            )
         if "" in df.columns:
             df = fix_bad_columns(df)
-        dtypes = self.distro.determine_dtypes(df)
+        dtypes = self._determine_dtypes(df, inference, known)
+        if workers > 1:
+            size = -(-len(df) // workers)
+            partitions = (df.iloc[i : i + size] for i in range(0, len(df), size))
+            self._write_parallel(partitions, dtypes, if_exists, workers, **inserts)
+        else:
+            self._load(df, dtypes=dtypes, if_exists=if_exists, **inserts)
+        return dtypes
 
-        df.to_sql(
+    def _reads_own_file(self, chunked):
+        """Whether chunks are read from the very SQLite file this table is in
+
+        The reading cursor holds its lock until the last chunk, so that a write
+        to the same file would only wait on it until "database is locked".
+        """
+        channel = getattr(chunked, "channel", None)
+        return (
+            channel is not None
+            and self.distro.name == "sqlite"
+            and channel.engine.url == self.channel.engine.url
+        )
+
+    def transfer_from(self, source, chunksize=100000, if_exists="replace"):
+        """Copy the rows of a table on any channel into this one, fetchmany at a time
+
+        Column types are the generic forms of the source table's own.
+
+        :return: Number of rows copied.
+        """
+        columns = [
+            sa.Column(c.name, portable_type(c.type), nullable=c.nullable)
+            for c in source.metal.columns
+        ]
+        new = sa.Table(self.name, sa.MetaData(schema=self.schema or None), *columns)
+        exists = self.exists()
+        if exists and if_exists == "fail":
+            raise ValueError(f"Table '{self.name}' already exists.")
+        if exists and if_exists == "replace":
+            self.drop()
+        new.create(bind=self.channel.engine, checkfirst=True)
+        self.__metal = None
+
+        rows = 0
+        select_all = sa.select([source.metal])
+        with source.channel.engine.connect() as reading:
+            reading = reading.execution_options(stream_results=True)
+            result = reading.execute(select_all)
+            keys = list(result.keys())
+            with self.channel.engine.begin() as writing:
+                batch = result.fetchmany(chunksize)
+                while batch:
+                    writing.execute(new.insert(), [dict(zip(keys, r)) for r in batch])
+                    rows += len(batch)
+                    logger.debug("Transferred %s rows to %s", rows, self)
+                    batch = result.fetchmany(chunksize)
+        return rows
+
+    def _write_on_server(self, source, if_exists="replace"):
+        """Copy the rows of source, on the same channel, into this table"""
+        select_all = sa.select([source.metal])
+        exists = self.exists()
+        if exists and if_exists == "fail":
+            raise ValueError(f"Table '{self.name}' already exists.")
+        if exists and if_exists == "append":
+            statement = self.metal.insert().from_select(
+                list(source.metal.columns.keys()), select_all
+            )
+        else:
+            if exists:
+                self.drop()
+            compiled = select_all.compile(dialect=self.channel.engine.dialect)
+            statement = sa.text(self.distro.create_table_as(self, str(compiled)))
+        with self.channel.engine.begin() as connection:
+            connection.execute(statement)
+        self.__metal = None
+        logger.info("Copied %s into %s on the server", source, self)
+
+    def create(self, df, dtypes=None, if_exists="replace"):
+        """Create (or keep, on append) the table with the DataFrame's columns"""
+        df.head(0).to_sql(
             name=self.name,
             con=self.channel.engine,
+            schema=self.schema or None,
+            if_exists=if_exists,
+            index=False,
+            dtype=dtypes,
+        )
+
+    def _write_chunks(
+        self,
+        chunked,
+        if_exists="replace",
+        workers=1,
+        inference=None,
+        known=None,
+        **inserts,
+    ):
+        """Write chunk by chunk; return the types written
+
+        Where the distro can alter columns, the table is written in a single
+        pass, widening columns as later chunks need (see :meth:`_write_growing`).
+        Otherwise -- or over several workers, or appending to a table already
+        there -- types are first worked out across every chunk, and any inserts
+        are then all in one transaction.
+        """
+        appending = if_exists == "append" and self.exists()
+        if workers == 1 and self.distro.alter_column_template and not appending:
+            return self._write_growing(chunked, if_exists, known=known, **inserts)
+        dtypes = self._determine_chunked_dtypes(chunked, inference, known)
+        if workers > 1:
+            partitions = (fix_bad_columns(chunk) for chunk in chunked.chunks())
+            self._write_parallel(partitions, dtypes, if_exists, workers, **inserts)
+            return dtypes
+        with self.channel.engine.begin() as connection:
+            for i, chunk in enumerate(chunked.chunks()):
+                logger.debug(
+                    "Writing chunk %s (%s rows) to %s", i + 1, len(chunk), self
+                )
+                self._load(
+                    fix_bad_columns(chunk),
+                    dtypes=dtypes,
+                    if_exists=if_exists if i == 0 else "append",
+                    con=connection,
+                    **inserts,
+                )
+        return dtypes
+
+    def _write_growing(self, chunked, if_exists="replace", known=None, **inserts):
+        """Write chunks in one pass, altering columns wherever a chunk overflows them
+
+        The table is created with the types the first chunk needs (or any
+        ``known`` types, where wider). Each chunk is committed on its own, after
+        any columns it overflows have been widened; should one fail, those before
+        it remain written.
+        """
+        from .distros import DtypeAccumulator
+
+        accumulator = DtypeAccumulator(self.distro, known=known)
+        for i, chunk in enumerate(chunked.chunks()):
+            chunk = fix_bad_columns(chunk)
+            widened = accumulator.update(chunk)
+            if widened:
+                # Committed first, lest a bulk load on another connection wait on it
+                with self.channel.engine.begin() as connection:
+                    for column, sqltype in widened.items():
+                        logger.info("Widening column [%s] of %s", column, self)
+                        alter = self.distro.alter_column(self, column, sqltype)
+                        connection.execute(sa.text(alter))
+                self.__metal = None
+            logger.debug("Writing chunk %s (%s rows) to %s", i + 1, len(chunk), self)
+            self._load(
+                chunk,
+                dtypes=dict(accumulator.dtypes),
+                if_exists=if_exists if i == 0 else "append",
+                **inserts,
+            )
+        return accumulator.dtypes
+
+    def _write_parallel(self, partitions, dtypes, if_exists, workers, **inserts):
+        """Create the table, then load partitions over several connections at once
+
+        No more than ``workers`` partitions are held at a time.
+        """
+        partitions = iter(partitions)
+        first = next(partitions)
+        self.create(first, dtypes=dtypes, if_exists=if_exists)
+        logger.info("Writing %s over %s connections", self, workers)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for i, partition in enumerate(chain([first], partitions)):
+                if len(pending) >= workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        future.result()
+                logger.debug(
+                    "Writing partition %s (%s rows) to %s", i + 1, len(partition), self
+                )
+                pending.add(
+                    pool.submit(
+                        self._load,
+                        partition,
+                        dtypes=dtypes,
+                        if_exists="append",
+                        **inserts,
+                    )
+                )
+            for future in pending:
+                future.result()
+
+    def _load(self, df, dtypes, if_exists, con=None, chunksize=None, method=None):
+        """Bulk load through the distro if it can, otherwise insert via pandas"""
+        try:
+            if self.distro.bulk_load(self, df, dtypes=dtypes, if_exists=if_exists):
+                logger.debug("Bulk loaded %s rows into %s", len(df), self)
+                return
+        except Exception as err:  # pylint: disable=broad-except
+            logger.warning("Bulk load into %s failed, inserting instead: %s", self, err)
+        if str(chunksize).lower() == "auto":
+            return self._insert_adaptively(df, dtypes, if_exists, con, method)
+        if method == "multi":
+            chunksize = min(chunksize or len(df), self._batch_limit(df, method)) or None
+        df.to_sql(
+            name=self.name,
+            con=self.channel.engine if con is None else con,
             schema=self.schema or None,  # sqlite can't use "" or it craps out
             if_exists=if_exists,
             index=False,
             dtype=dtypes,
+            chunksize=chunksize,
+            method=method,
         )
 
-    def read(self):
-        """Return the full table as a DataFrame"""
+    def _insert_adaptively(self, df, dtypes, if_exists, con, method):
+        """Insert batch by batch, resizing each to take about BATCH_SECONDS"""
+        limit = self._batch_limit(df, method)
+        rows = min(limit, self._first_batch_rows(df))
+        done = 0
+        if con is None:
+            transaction = self.channel.engine.begin()
+        else:
+            transaction = _already_open(con)
+        with transaction as connection:
+            while done < len(df):
+                batch = df.iloc[done : done + rows]
+                started = time.perf_counter()
+                batch.to_sql(
+                    name=self.name,
+                    con=connection,
+                    schema=self.schema or None,
+                    if_exists=if_exists if not done else "append",
+                    index=False,
+                    dtype=dtypes,
+                    method=method,
+                )
+                elapsed = max(time.perf_counter() - started, 1e-6)
+                done += len(batch)
+                logger.info(
+                    "Inserted %s of %s rows into %s (%.0f rows/s)",
+                    done,
+                    len(df),
+                    self,
+                    len(batch) / elapsed,
+                )
+                rows = self._next_batch_rows(len(batch), elapsed, limit)
+
+    def _first_batch_rows(self, df):
+        row_bytes = df.memory_usage(deep=True, index=False).sum() / max(len(df), 1)
+        return max(int(self.BATCH_BYTES // max(row_bytes, 1)), 1)
+
+    def _batch_limit(self, df, method):
+        """Most rows per batch the server takes as bound parameters"""
+        if method != "multi" or not self.distro.max_parameters:
+            return len(df)
+        return max(self.distro.max_parameters // max(len(df.columns), 1), 1)
+
+    @classmethod
+    def _next_batch_rows(cls, rows, elapsed, limit):
+        """Rows expected to take BATCH_SECONDS, changing at most twofold at once"""
+        wanted = rows * cls.BATCH_SECONDS / elapsed
+        return int(min(max(wanted, rows / 2, 1), rows * 2, limit))
+
+    def _determine_dtypes(self, df, inference=None, known=None):
+        """Types for df's columns, fitting any ``known`` where they still can"""
+        if known is None:
+            return self.distro.determine_dtypes(df, **(inference or {}))
+        return self.distro.fit_dtypes(df, known, **(inference or {}))
+
+    def _determine_chunked_dtypes(self, chunked, inference=None, known=None):
+        """Widest types needed across every chunk, ignoring entirely null columns"""
+        dtypes = {}
+        undetermined = set()
+        for chunk in chunked.chunks():
+            chunk = fix_bad_columns(chunk).dropna(axis="columns", how="all")
+            found = self._determine_dtypes(chunk, inference, known)
+            if found is None:
+                return None
+            undetermined.update(c for c in chunk.columns if c not in found)
+            for column, dtype in found.items():
+                known = dtypes.get(column, dtype)
+                dtypes[column] = self.distro.wider_dtype(known, dtype)
+        return {
+            k: v for k, v in dtypes.items() if v is not None and k not in undetermined
+        }
+
+    def read(self, partitions=1, partition_column=None):
+        """Return the full table as a DataFrame
+
+        With more than one of ``partitions``, the table is read as that many
+        ranges of ``partition_column`` (by default, an integer primary key) over
+        as many connections at once.
+        """
         select_all = sa.select([self.metal])
+        if partitions > 1:
+            ranges = self._partition_ranges(partitions, partition_column)
+            if ranges:
+                return self._read_partitions(ranges)
         return pd.read_sql(select_all, con=self.metadata.bind)
 
+    def _partition_ranges(self, partitions, partition_column=None):
+        """WHERE clauses splitting the table into ranges; None to read it whole"""
+        if self.distro.name == "sqlite" and self.distro.is_memory(self.database):
+            logger.warning("In-memory SQLite cannot be read in parallel: %s", self)
+            return None
+        if partition_column:
+            column = self.metal.c[partition_column]
+        else:
+            keys = list(self.metal.primary_key.columns)
+            if len(keys) != 1 or not isinstance(keys[0].type, sa.Integer):
+                logger.warning("No integer primary key to partition %s", self)
+                return None
+            column = keys[0]
+        low_high = sa.select([sa.func.min(column), sa.func.max(column)])
+        with self.channel.engine.connect() as connection:
+            low, high = connection.execute(low_high).first()
+        if not all(isinstance(x, numbers.Real) for x in (low, high)):
+            logger.warning("Cannot partition %s by %s", self, column.name)
+            return None
+        step = (high - low) / partitions
+        bounds = [low + step * i for i in range(1, partitions)]
+        lower = [column >= bound for bound in bounds]
+        upper = [column < bound for bound in bounds]
+        ranges = [sa.or_(upper[0], column.is_(None))]
+        ranges += [sa.and_(*pair) for pair in zip(lower, upper[1:])]
+        ranges.append(lower[-1])
+        logger.debug("Reading %s in %s ranges of %s", self, len(ranges), column.name)
+        return ranges
+
+    def _read_partitions(self, ranges):
+        select_all = sa.select([self.metal])
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            frames = list(
+                pool.map(
+                    lambda where: pd.read_sql(
+                        select_all.where(where), con=self.channel.engine
+                    ),
+                    ranges,
+                )
+            )
+        return pd.concat(frames, ignore_index=True)
+
+    def read_chunks(self, chunksize):
+        """Yield the table chunksize rows at a time"""
+        select_all = sa.select([self.metal])
+        yield from self.channel.read_chunks(select_all, chunksize=chunksize)
+
     def drop(self, ignore_existence=False):
         """Delete the table within SQL"""
 
@@ -594,6 +999,30 @@ class Identifier:
         return self.normalized
 
 
+@contextmanager
+def _already_open(connection):
+    """Use a connection given, leaving it to its owner to close"""
+    yield connection
+
+
+def portable_type(sql_type):
+    """Generic form of a reflected SQL type, usable on any other distro"""
+    try:
+        return sql_type.as_generic()
+    # Before SQLAlchemy 1.4, there is no as_generic to ask
+    except (AttributeError, NotImplementedError):
+        pass
+    # The dialect's type builds on one of SQLAlchemy's own; take the nearest
+    for cls in type(sql_type).__mro__:
+        if (
+            cls.__module__ == sa.sql.sqltypes.__name__
+            and issubclass(cls, sa.types.TypeEngine)
+            and not cls.__name__.startswith("_")
+        ):
+            return sql_type.adapt(cls)
+    return sql_type
+
+
 def fix_bad_columns(df):
     badnames = set(Identifier.BLACKLIST).intersection(df.columns)
     leading_numbers = any(x for x in df.columns if x[:1].isdigit())
@@ -0,0 +1,249 @@
+"""Remember what each section was built from, so up-to-date sections can be skipped.
+
+Much like make, a section is considered up to date when its configuration, task
+contents, source files, and upstream sections are unchanged since it last ran, and
+its outputs remain as it left them. SQL read from outside of the build cannot be
+fingerprinted, so sections doing so -- or executing SQL scripts, which may read
+any table -- always run.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+from .schedule import Resource
+
+logger = logging.getLogger(__name__)
+logger.debug(__name__)
+
+STATE_DIR = ".laforge"
+
+
+def digest(*pieces):
+    hasher = hashlib.sha256()
+    for piece in pieces:
+        hasher.update(str(piece).encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def file_digest(path, block_size=2 ** 20):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as stream:
+        for block in iter(lambda: stream.read(block_size), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def stable(obj):
+    """Reduce nested config into something with a reliable text representation"""
+    if isinstance(obj, dict):
+        return sorted((str(k), stable(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        return [stable(x) for x in obj]
+    return str(obj)
+
+
+class BuildState:
+    """Fingerprints of sections as last built, stored as JSON in the build dir."""
+
+    FILENAME = "state.json"
+    VERSION = 1
+
+    def __init__(self, path, force=False, explain=False):
+        self.path = Path(path)
+        self.force = force
+        self.explain = explain
+        self.sections = {}
+        self.files = {}
+        self.fingerprints = {}
+        self.reasons = {}
+        self._load()
+
+    @classmethod
+    def in_build_dir(cls, build_dir, **kwargs):
+        return cls(Path(build_dir) / STATE_DIR / cls.FILENAME, **kwargs)
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            content = json.loads(self.path.read_text())
+        except (OSError, ValueError) as err:
+            logger.warning("Ignoring unreadable build state %s: %s", self.path, err)
+            return
+        if content.get("version") != self.VERSION:
+            logger.warning("Ignoring build state from another version: %s", self.path)
+            return
+        self.sections = content.get("sections", {})
+        self.files = content.get("files", {})
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        content = {
+            "version": self.VERSION,
+            "sections": self.sections,
+            "files": self.files,
+        }
+        temporary = self.path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(content, indent=1, sort_keys=True))
+        os.replace(str(temporary), str(self.path))
+        logger.debug("Saved build state to %s", self.path)
+
+    def file_digest(self, path):
+        """Content digest, recalculated only when size or modification time change"""
+        path = Path(path).resolve()
+        try:
+            stat = path.stat()
+        except OSError:
+            return "missing"
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        known = self.files.get(str(path))
+        if known and known[:2] == stamp:
+            return known[2]
+        result = file_digest(path)
+        self.files[str(path)] = stamp + [result]
+        return result
+
+    def fingerprint(self, section, upstream, produced=()):
+        """Digest everything determining what a section does.
+
+        Files produced upstream are represented by their upstream sections' keys.
+        Only files and tables certain to be written count as produced; whatever
+        a script might write does not.
+        """
+        parts = {"config": digest(stable(section.tasks[0].config))}
+        for task in section.tasks:
+            parts[f"task:{task.identifier}"] = digest(
+                task.verb.value, task.target.name, task.content
+            )
+            for path in task.source_files:
+                path = Path(path).resolve()
+                resource = Resource("file", None, str(path))
+                if any(resource.overlaps(p) for p in produced):
+                    continue
+                parts[f"file:{path}"] = self.file_digest(path)
+        for name in sorted(upstream):
+            parts[f"upstream:{name}"] = self.fingerprints[name]["key"]
+        key = digest(*sorted(f"{k}={v}" for k, v in parts.items()))
+        return {"key": key, "parts": parts}
+
+    def plan(self, graph):
+        """Work out which sections are up to date; return the names to skip."""
+        self.reasons = {}
+        for section in graph.sections:
+            upstream = graph.upstream[section.name]
+            produced = {
+                r for name in upstream for t in graph[name].tasks for r in t.produces
+            }
+            fingerprint = self.fingerprint(section, upstream, produced)
+            self.fingerprints[section.name] = fingerprint
+            reason = self._check(section, produced)
+            if reason:
+                self.reasons[section.name] = reason
+        self._propagate(graph)
+
+        skip = {s.name for s in graph.sections if s.name not in self.reasons}
+        for section in graph.sections:
+            if section.name in skip:
+                message, args = "Skipping [%s]: up to date.", (section.name,)
+            else:
+                message = "Building [%s]: %s."
+                args = (section.name, self.reasons[section.name])
+            logger.log(logging.INFO if self.explain else logging.DEBUG, message, *args)
+        if skip:
+            logger.info(
+                "Skipping %s of %s sections as up to date.", len(skip), len(graph)
+            )
+        return skip
+
+    def _check(self, section, produced):
+        if self.force:
+            return "forced"
+        recorded = self.sections.get(section.name)
+        if not recorded:
+            return "no record of a prior build"
+        current = self.fingerprints[section.name]
+        if recorded["key"] != current["key"]:
+            changed = sorted(
+                k
+                for k in set(recorded["parts"]) | set(current["parts"])
+                if recorded["parts"].get(k) != current["parts"].get(k)
+            )
+            return "changed " + ", ".join(changed)
+        if any(task.reads_unknown for task in section.tasks):
+            return "executes SQL that may read from outside of the build"
+        for resource in section.inputs:
+            if resource.kind == "sql" and not any(
+                resource.overlaps(p) for p in produced
+            ):
+                return "reads SQL from outside of the build"
+        for task in section.tasks:
+            if task.output_stamp() != recorded["outputs"].get(task.identifier):
+                return f"output of {task.identifier} missing or modified"
+        return None
+
+    def _propagate(self, graph):
+        """Re-run downstream of anything re-run; re-run whatever feeds a re-run"""
+        changed = True
+        while changed:
+            changed = False
+            for section in graph.sections:
+                if section.name in self.reasons:
+                    continue
+                for name in sorted(graph.upstream[section.name]):
+                    if name in self.reasons:
+                        self.reasons[section.name] = f"upstream [{name}] re-built"
+                        changed = True
+                        break
+            for section in reversed(graph.sections):
+                if section.name not in self.reasons:
+                    continue
+                for name in self._feeders(section, graph):
+                    if name not in self.reasons:
+                        self.reasons[name] = f"results needed by [{section.name}]"
+                        changed = True
+
+    @staticmethod
+    def _feeders(section, graph):
+        """Upstream sections whose results exist only while a build runs"""
+        if section.carries_in and section.index > 0:
+            yield graph.sections[section.index - 1].name
+        kept = {r for r in section.inputs if r.kind == "result"}
+        for name in sorted(graph.upstream[section.name]):
+            outputs = {r for r in graph[name].outputs if r.kind == "result"}
+            if any(r.overlaps(k) for r in outputs for k in kept):
+                yield name
+
+    def forget(self, section):
+        """Forget a section before (re-)building it, in case it fails partway"""
+        self.sections.pop(section.name, None)
+
+    def record(self, section):
+        """Remember a section as successfully built"""
+        fingerprint = self.fingerprints.get(section.name)
+        if fingerprint is None:
+            return
+        outputs = {task.identifier: task.output_stamp() for task in section.tasks}
+        self.sections[section.name] = dict(fingerprint, outputs=outputs)
+
+
+"""
+Copyright 2019 Matt VanEseltine.
+
+This file is part of laforge.
+
+laforge is free software: you can redistribute it and/or modify it under
+the terms of the GNU Affero General Public License as published by the Free
+Software Foundation, either version 3 of the License, or (at your option) any
+later version.
+
+laforge is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.  See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with laforge.  If not, see <https://www.gnu.org/licenses/>.
+"""
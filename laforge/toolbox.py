@@ -30,6 +30,30 @@ def flatten(foo):
             yield x
 
 
+def is_true(value):
+    """Interpret INI-style values like yes/no, on/off, true/false, 1/0.
+
+    :param value:
+    """
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "yes", "true", "on")
+    return bool(value)
+
+
+def parse_size(value):
+    """Interpret sizes like 512, 64KB, 1.5 GB as a number of bytes.
+
+    :param value:
+    """
+    units = {"": 1, "B": 1, "KB": 2 ** 10, "MB": 2 ** 20, "GB": 2 ** 30, "TB": 2 ** 40}
+    text = str(value).strip().upper().replace(" ", "")
+    number = text.rstrip("KMGTB")
+    unit = text[len(number) :]
+    if unit not in units:
+        raise ValueError(f"Unknown unit in size: {value}")
+    return int(float(number) * units[unit])
+
+
 """
 Copyright 2019 Matt VanEseltine.
 
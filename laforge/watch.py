@@ -0,0 +1,191 @@
+"""Rebuild whenever a file of the build changes, staying warm between builds.
+
+The parsed :class:`laforge.builder.TaskList` is kept until its INI or .env
+changes, as are the :class:`laforge.state.BuildState` deciding which sections
+are affected, the result cache, and each channel's database engine.
+"""
+
+import logging
+import time
+from pathlib import Path
+
+from .builder import find_env
+from .state import BuildState
+
+logger = logging.getLogger(__name__)
+logger.debug(__name__)
+
+POLL_SECONDS = 1.0
+
+
+def snapshot(paths):
+    """Size and modification time of each path; None for those missing"""
+    stamps = {}
+    for path in paths:
+        try:
+            stat = Path(path).stat()
+            stamps[path] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            stamps[path] = None
+    return stamps
+
+
+def changes(before, after):
+    return sorted(
+        str(p) for p in set(before) | set(after) if before.get(p) != after.get(p)
+    )
+
+
+class Watcher:
+    """Build, then build again after any change to the files a build is made from.
+
+    Files the build itself writes are not watched, so a build does not set
+    off another.
+    """
+
+    def __init__(
+        self,
+        path,
+        *,
+        list_class,
+        jobs=1,
+        force=False,
+        explain=False,
+        targets=(),
+        tags=(),
+        stream=False,
+        interval=POLL_SECONDS,
+    ):
+        self.path = Path(path).resolve()
+        self.list_class = list_class
+        self.jobs = jobs
+        self.force = force
+        self.explain = explain
+        self.targets = targets
+        self.tags = tags
+        self.stream = stream
+        self.interval = interval
+        self.task_list = None
+        self.state = None
+        self.cache = None
+        self.catalog = None
+        self.stamps = {}
+
+    @property
+    def config_files(self):
+        env_path = find_env(self.path.parent)
+        return {self.path} | ({env_path.resolve()} if env_path else set())
+
+    @property
+    def watched(self):
+        """The INI, its .env, and every file read but not written by the build"""
+        if self.task_list is None:
+            return self.config_files
+        tasks = self.task_list.tasks
+        written = {r.name for task in tasks for r in task.outputs if r.kind == "file"}
+        sources = {Path(path).resolve() for task in tasks for path in task.source_files}
+        return self.config_files | {p for p in sources if str(p) not in written}
+
+    def changes(self):
+        return changes(self.stamps, snapshot(self.watched))
+
+    def load(self):
+        """Parse the INI afresh"""
+        from .command import get_result_cache, get_schema_catalog
+
+        self.task_list = None
+        self.task_list = self.list_class(
+            self.path.read_text(),
+            location=self.path.parent,
+            targets=self.targets,
+            tags=self.tags,
+        )
+        build_dir = self.task_list.config["build_dir"]
+        state_path = BuildState.in_build_dir(build_dir).path
+        if self.state is None or self.state.path != state_path:
+            self.state = BuildState(state_path, force=self.force, explain=self.explain)
+            self.cache = get_result_cache(
+                self.task_list, refresh=self.force, keep_in_memory=True
+            )
+            self.catalog = get_schema_catalog(self.task_list, refresh=self.force)
+
+    def build(self, changed=()):
+        """Build once, reloading the INI first if it (or .env) has changed
+
+        Failures are logged rather than raised so that watching can continue.
+        """
+        start_time = time.time()
+        config_files = {str(p) for p in self.config_files}
+        try:
+            if self.task_list is None or config_files.intersection(changed):
+                self.load()
+            self.stamps = snapshot(self.watched)
+            self.task_list.execute(
+                jobs=self.jobs,
+                state=self.state,
+                cache=self.cache,
+                stream=self.stream,
+                catalog=self.catalog,
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            logger.error("Build failed: %s", err)
+            logger.debug("Build failure", exc_info=True)
+            if self.task_list is None:
+                self.stamps = snapshot(self.watched)
+            return False
+        finally:
+            if self.state:
+                self.state.force = False
+            if self.cache is not None:
+                self.cache.refresh = False
+            if self.catalog is not None:
+                self.catalog.refresh = False
+        elapsed = round(time.time() - start_time, 2)
+        logger.info("%s completed in %s seconds.", self.path, elapsed)
+        return True
+
+    def wait(self):
+        """Block until a watched file changes; return the changed paths"""
+        logger.info("Watching %s files for changes...", len(self.watched))
+        while True:
+            time.sleep(self.interval)
+            changed = self.changes()
+            if changed:
+                logger.info("Changed: %s", ", ".join(changed))
+                return changed
+
+    def run(self, builds=None):
+        """Build and rebuild until interrupted (or after a number of builds)"""
+        count = 0
+        changed = ()
+        try:
+            while True:
+                self.build(changed)
+                count += 1
+                if builds is not None and count >= builds:
+                    return
+                changed = self.wait()
+        except KeyboardInterrupt:
+            logger.info("Stopped watching %s.", self.path)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.path})>"
+
+
+"""
+Copyright 2019 Matt VanEseltine.
+
+This file is part of laforge.
+
+laforge is free software: you can redistribute it and/or modify it under
+the terms of the GNU Affero General Public License as published by the Free
+Software Foundation, either version 3 of the License, or (at your option) any
+later version.
+
+laforge is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.  See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with laforge.  If not, see <https://www.gnu.org/licenses/>.
+"""
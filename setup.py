@@ -14,6 +14,7 @@ extras = {
     "mysql": ["pymysql>=0.9"],  # MySQL or MariaDB
     "mssql": ["pyodbc>=4.0"],  # Microsoft SQL Server
     "excel": ["xlrd==1.2.0", "XlsxWriter==1.1.8"],  # Pandas backends
+    "parquet": ["pyarrow>=0.15"],  # Columnar result cache
 }
 extras["mariadb"] = extras["mysql"]
 extras["all"] = [*{x for y in extras.values() for x in y}]
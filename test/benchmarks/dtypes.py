@@ -0,0 +1,85 @@
+"""Time Distro.determine_dtypes against the column-by-column approach it replaced.
+
+Run directly; pytest does not collect it::
+
+    python test/benchmarks/dtypes.py --rows 1000000 --columns 200
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from laforge.distros import Distro
+
+
+def sample_frame(rows, columns, seed=0):
+    """Integers, integral and fractional floats, and (partly accented) text"""
+    rng = np.random.default_rng(seed)
+    words = np.array(["Picard", "Riker", "Data", "La Forge", "Worf", "Crusher", "Trói"])
+    makers = [
+        lambda: rng.integers(-(2 ** 20), 2 ** 20, rows),
+        lambda: rng.integers(0, 100, rows).astype("float64"),
+        lambda: rng.random(rows),
+        lambda: words[rng.integers(0, len(words), rows)].astype(object),
+    ]
+    return pd.DataFrame({f"c{i}": makers[i % len(makers)]() for i in range(columns)})
+
+
+def column_by_column(distro, df):
+    """The former approach: apply, copy, and encode for every column"""
+    found = {}
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == "object":
+            length = series.str.encode(encoding="utf-8").str.len().max()
+            found[column] = distro._create_varchar_spec(length)
+        elif series.dtype == "float64":
+            if series.apply(float.is_integer).all():
+                found[column] = distro._check_integer_spec(column, series)
+        elif series.dtype == "int64":
+            found[column] = distro._check_integer_spec(column, series)
+    return {k: v for k, v in found.items() if v}
+
+
+def timed(label, function, repeat):
+    best = min(_once(function) for _ in range(repeat))
+    print(f"{label:<28} {best:8.3f} s")
+    return best
+
+
+def _once(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--columns", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sample", type=int, default=10000)
+    args = parser.parse_args()
+
+    distro = Distro("postgresql")
+    df = sample_frame(args.rows, args.columns)
+    print(f"{args.rows:,} rows x {args.columns} columns")
+    # Type instances do not compare equal, so compare how they print
+    assert repr(column_by_column(distro, df)) == repr(distro.determine_dtypes(df))
+
+    before = timed(
+        "column by column", lambda: column_by_column(distro, df), args.repeat
+    )
+    after = timed("vectorized", lambda: distro.determine_dtypes(df), args.repeat)
+    timed(
+        f"vectorized, {args.sample:,} sampled",
+        lambda: distro.determine_dtypes(df, sample=args.sample),
+        args.repeat,
+    )
+    print(f"Speed-up: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
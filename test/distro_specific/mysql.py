@@ -45,3 +45,42 @@ def test_numeric_data_types_myorpost(n, expectation, arbitrary_table):
     for c in t.metal.columns:
         assert str(c.type).startswith(expectation)
     t.drop()
+
+
+def test_bulk_load_round_trip(arbitrary_table):
+    df = pd.DataFrame(
+        {
+            "words": ["Make it so", 'Say "Engage"', "back\\slash", None],
+            "numbers": [1.5, None, 3.0, 4.25],
+        }
+    )
+    assert arbitrary_table.distro.bulk_load(arbitrary_table, df)
+    result = arbitrary_table.read()
+    assert result["words"].tolist() == df["words"].tolist()
+    assert result["numbers"].isna().tolist() == df["numbers"].isna().tolist()
+    arbitrary_table.drop()
+
+
+def test_bulk_load_nullable_booleans(arbitrary_table):
+    df = pd.DataFrame({"flags": [True, None, False, True]})
+    arbitrary_table.write(df)
+    result = arbitrary_table.read()
+    assert result["flags"].isna().tolist() == [False, True, False, False]
+    assert result["flags"].dropna().tolist() == [1, 0, 1]
+    arbitrary_table.drop()
+
+
+
+def test_bulk_load_whole_floats(arbitrary_table):
+    df = pd.DataFrame({"counts": [1.0, None, 3.0]})
+    dtypes = {"counts": sa.types.INTEGER()}
+    assert arbitrary_table.distro.bulk_load(arbitrary_table, df, dtypes=dtypes)
+    result = arbitrary_table.read()
+    assert result["counts"].isna().tolist() == [False, True, False]
+    assert result["counts"].dropna().tolist() == [1, 3]
+    arbitrary_table.drop()
+
+def test_write_over_several_connections(arbitrary_table, medium_df):
+    arbitrary_table.write(medium_df, workers=4)
+    assert len(arbitrary_table) == len(medium_df)
+    arbitrary_table.drop()
@@ -1,6 +1,10 @@
+from decimal import Decimal
+
 import pytest
 from laforge.sql import Script, execute
 from laforge.distros import Distro
+from laforge.results import StreamedResult
+import sqlalchemy as sa
 import pandas as pd
 
 
@@ -27,3 +31,78 @@ def test_numeric_data_types_myorpost(n, expectation, arbitrary_table):
         assert str(c.type).startswith(expectation)
 
     t.drop()
+
+
+@pytest.mark.parametrize("chunksize", [100000, 3])
+def test_bulk_load_round_trip(arbitrary_table, monkeypatch, chunksize):
+    monkeypatch.setattr(arbitrary_table.distro, "COPY_CHUNKSIZE", chunksize)
+    df = pd.DataFrame(
+        {
+            "words": ["Make it so", 'Say "Engage"', "back\\slash", None],
+            "numbers": [1.5, None, 3.0, 4.25],
+        }
+    )
+    assert arbitrary_table.distro.bulk_load(arbitrary_table, df)
+    result = arbitrary_table.read()
+    assert result["words"].tolist() == df["words"].tolist()
+    assert result["numbers"].isna().tolist() == df["numbers"].isna().tolist()
+    arbitrary_table.drop()
+
+
+
+def test_bulk_load_whole_floats(arbitrary_table):
+    df = pd.DataFrame({"counts": [1.0, None, 3.0]})
+    dtypes = {"counts": sa.types.INTEGER()}
+    assert arbitrary_table.distro.bulk_load(arbitrary_table, df, dtypes=dtypes)
+    result = arbitrary_table.read()
+    assert result["counts"].isna().tolist() == [False, True, False]
+    assert result["counts"].dropna().tolist() == [1, 3]
+    arbitrary_table.drop()
+
+def test_write_over_several_connections(arbitrary_table, medium_df):
+    arbitrary_table.write(medium_df, workers=4)
+    assert len(arbitrary_table) == len(medium_df)
+    arbitrary_table.drop()
+
+
+@pytest.mark.parametrize("ending", ["", ";", " -- every row"])
+def test_copy_to_csv(arbitrary_table, medium_df, tmp_path, ending):
+    arbitrary_table.write(medium_df)
+    path = tmp_path / "exported.csv"
+    query = f"select * from {arbitrary_table.resolve()}{ending}"
+    arbitrary_table.distro.export_csv(arbitrary_table.channel, query, path)
+    assert len(pd.read_csv(path)) == len(medium_df)
+    arbitrary_table.drop()
+
+
+def test_widen_columns_while_streaming(arbitrary_table):
+    chunks = [
+        pd.DataFrame({"n": [1, 2], "words": ["Data", None]}),
+        pd.DataFrame({"n": [2 ** 20, None], "words": ["Make it so" * 10, "Worf"]}),
+    ]
+    arbitrary_table.write(StreamedResult(lambda: iter(chunks)))
+    columns = {c.name: str(c.type) for c in arbitrary_table.metal.columns}
+    assert columns == {"n": "DOUBLE PRECISION", "words": "VARCHAR(100)"}
+    assert len(arbitrary_table) == 4
+    arbitrary_table.drop()
+
+
+def test_narrower_types_round_trip(arbitrary_table):
+    df = pd.DataFrame(
+        {
+            "day": pd.to_datetime(["2020-01-01", "2020-01-02"]),
+            "flag": [True, False],
+            "amount": [Decimal("1.25"), Decimal("-100.50")],
+            "code": ["AB", "CD"],
+        }
+    )
+    arbitrary_table.write(df)
+    columns = {c.name: str(c.type) for c in arbitrary_table.metal.columns}
+    assert columns == {
+        "day": "DATE",
+        "flag": "BOOLEAN",
+        "amount": "NUMERIC(5, 2)",
+        "code": "CHAR(2)",
+    }
+    assert arbitrary_table.read()["amount"].tolist() == df["amount"].tolist()
+    arbitrary_table.drop()
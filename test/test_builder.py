@@ -12,7 +12,9 @@ from laforge.builder import (
     SQLReaderWriter,
     Target,
     Task,
+    TaskConstructionError,
     TaskExecutionError,
+    TaskList,
     Verb,
 )
 
@@ -226,6 +228,37 @@ class TestExistenceChecker:
 
 
 class TestSQLReaderWriter:
+    @pytest.mark.parametrize("chunksize", ["0", "-5", "some"])
+    def t_write_chunksize_at_least_one(self, tmpdir, chunksize):
+        build = f"[DEFAULT]\nwrite_chunksize = {chunksize}\n\n[one]\nwrite = crew\n"
+        with pytest.raises(TaskConstructionError, match=r"write_chunksize of \[one\]"):
+            TaskList(build, location=tmpdir)
+
+    @pytest.mark.parametrize("chunksize, expected", [("", None), ("Auto", "auto")])
+    def t_write_chunksize(self, tmpdir, chunksize, expected):
+        build = f"[DEFAULT]\nwrite_chunksize = {chunksize}\n\n[one]\nwrite = crew\n"
+        assert TaskList(build, location=tmpdir).tasks[0].write_chunksize == expected
+
+    @pytest.mark.parametrize("method, expected", [("", None), ("Multi", "multi")])
+    def t_write_method(self, tmpdir, method, expected):
+        build = f"[DEFAULT]\nwrite_method = {method}\n\n[one]\nwrite = crew\n"
+        assert TaskList(build, location=tmpdir).tasks[0].write_method == expected
+
+    def t_write_method_known(self, tmpdir):
+        build = "[DEFAULT]\nwrite_method = many\n\n[one]\nwrite = crew\n"
+        with pytest.raises(TaskConstructionError, match=r"write_method of \[one\]"):
+            TaskList(build, location=tmpdir)
+
+    @pytest.mark.parametrize("workers", ["0", "-2", "many"])
+    def t_write_workers_at_least_one(self, tmpdir, workers):
+        build = f"[DEFAULT]\nwrite_workers = {workers}\n\n[one]\nwrite = crew\n"
+        with pytest.raises(TaskConstructionError, match=r"write_workers of \[one\]"):
+            TaskList(build, location=tmpdir)
+
+    def t_write_workers(self, tmpdir):
+        build = "[DEFAULT]\nwrite_workers = 4\n\n[one]\nwrite = crew\n"
+        assert TaskList(build, location=tmpdir).tasks[0].write_workers == 4
+
     @pytest.mark.xfail(reason="Test to be implemented")
     def t_write(self):
         assert False
@@ -239,6 +272,39 @@ class TestSQLReaderWriter:
         assert False
 
 
+class TestSQLTransfer:
+    BUILD = dedent(
+        """\
+        [DEFAULT]
+        distro = sqlite
+        database = {mart}
+        source_distro = sqlite
+        source_database = {staging}
+
+        [stage]
+        database = {staging}
+        read = a.csv
+        write = raw
+
+        [copy]
+        transfer = raw -> clean
+
+        [check]
+        read = clean
+        write = b.csv
+        """
+    )
+
+    def t_build_through_transfer(self, tmpdir, medium_df):
+        medium_df.to_csv(Path(tmpdir, "a.csv"), index=False)
+        paths = {"mart": tmpdir / "mart.db", "staging": tmpdir / "staging.db"}
+        task_list = TaskList(self.BUILD.format(**paths), location=tmpdir)
+        assert [t.verb for t in task_list.tasks][2] is Verb.TRANSFER
+        task_list.execute()
+        expected = pd.read_csv(Path(tmpdir, "a.csv"))
+        assert pd.read_csv(Path(tmpdir, "b.csv")).equals(expected)
+
+
 class TestEchoer:
     @pytest.mark.xfail(reason="Test to be implemented")
     def t_echo(self):
@@ -0,0 +1,109 @@
+import time
+from pathlib import Path
+from textwrap import dedent
+
+import pandas as pd
+import pytest
+
+from laforge.builder import TaskList
+from laforge.cache import ResultCache, load_frame, save_frame
+from laforge.command import run_cli
+from laforge.state import BuildState
+
+BUILD = dedent(
+    """\
+    [DEFAULT]
+    cache = true
+
+    [one]
+    read = a.csv
+    write = a2.csv
+    """
+)
+
+
+@pytest.fixture(scope="function")
+def result_cache(tmpdir):
+    return ResultCache(Path(tmpdir, "cache"), max_bytes=10 ** 9)
+
+
+class TestFrames:
+    @pytest.mark.parametrize("suffix", [".parquet", ".pickle"])
+    def t_round_trip(self, tmpdir, medium_df, suffix):
+        path = save_frame(medium_df, Path(tmpdir, "frame").with_suffix(suffix))
+        assert load_frame(path).equals(medium_df)
+
+    def t_unparquetable_frame_is_pickled(self, tmpdir):
+        df = pd.DataFrame({"mixed": [1, "two", 3.0]})
+        path = save_frame(df, Path(tmpdir, "frame.parquet"))
+        assert load_frame(path).equals(df)
+
+
+class TestResultCache:
+    def t_miss(self, result_cache):
+        assert result_cache.get("nothing") is None
+
+    def t_hit(self, result_cache, minimal_df):
+        result_cache.put("k", minimal_df, label="small")
+        assert result_cache.get("k").equals(minimal_df)
+        assert result_cache.entries()[0]["label"] == "small"
+
+    def t_refresh_ignores_existing(self, tmpdir, minimal_df):
+        ResultCache(tmpdir, max_bytes=10 ** 9).put("k", minimal_df)
+        assert ResultCache(tmpdir, max_bytes=10 ** 9, refresh=True).get("k") is None
+
+    def t_too_old(self, result_cache, minimal_df):
+        result_cache.put("k", minimal_df)
+        time.sleep(0.01)
+        assert result_cache.get("k", max_age=0.001) is None
+
+    def t_evicts_least_recently_used(self, result_cache, minimal_df):
+        for key in ("first", "second", "third"):
+            result_cache.put(key, minimal_df)
+            time.sleep(0.01)
+        result_cache.get("first")
+        result_cache.prune(max_bytes=result_cache.size() - 1)
+        assert {e["key"] for e in result_cache.entries()} == {"first", "third"}
+
+    def t_clear(self, result_cache, minimal_df):
+        result_cache.put("k", minimal_df)
+        result_cache.clear()
+        assert not result_cache.entries()
+        assert not list(result_cache.directory.iterdir())
+
+
+class TestCachedBuild:
+    def t_read_reused(self, tmpdir, minimal_df, caplog):
+        minimal_df.to_csv(Path(tmpdir, "a.csv"), index=False)
+        result_cache = ResultCache.in_build_dir(tmpdir, max_bytes=10 ** 9)
+        for _ in range(2):
+            TaskList(BUILD, location=tmpdir).execute(
+                state=BuildState.in_build_dir(tmpdir, force=True), cache=result_cache
+            )
+        assert "Reused cached result of one.read" in caplog.text
+        assert len(result_cache) == 1
+
+    def t_changed_input_not_reused(self, tmpdir, minimal_df, caplog):
+        minimal_df.to_csv(Path(tmpdir, "a.csv"), index=False)
+        result_cache = ResultCache.in_build_dir(tmpdir, max_bytes=10 ** 9)
+        for df in (minimal_df, minimal_df.head(1)):
+            df.to_csv(Path(tmpdir, "a.csv"), index=False)
+            TaskList(BUILD, location=tmpdir).execute(
+                state=BuildState.in_build_dir(tmpdir), cache=result_cache
+            )
+        assert "Reused" not in caplog.text
+        assert len(pd.read_csv(Path(tmpdir, "a2.csv"))) == 1
+
+
+class TestCacheCommand:
+    def t_list_and_clear(self, cli_runner, minimal_df):
+        with cli_runner.isolated_filesystem():
+            Path("build.ini").write_text(BUILD)
+            minimal_df.to_csv("a.csv", index=False)
+            cli_runner.invoke(run_cli, ["build"])
+            result = cli_runner.invoke(run_cli, ["cache"])
+            assert result.exit_code == 0
+            assert "one.read" in result.output
+            result = cli_runner.invoke(run_cli, ["cache", "--clear"])
+            assert "Evicted 1" in result.output
+            assert "0 cached result(s)" in result.output
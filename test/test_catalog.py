@@ -0,0 +1,146 @@
+from pathlib import Path
+from textwrap import dedent
+
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import mssql, mysql
+
+from laforge.builder import TaskList
+from laforge.catalog import SchemaCatalog, dump_type, load_type
+from laforge.distros import Distro, SQLite
+from laforge.sql import Channel, Table
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        sa.types.SMALLINT,
+        sa.types.BIGINT,
+        sa.VARCHAR(150),
+        sa.NUMERIC(12, 2),
+        sa.CHAR(3),
+        sa.types.DATE,
+        sa.types.DateTime(timezone=True),
+        mssql.TINYINT,
+        mysql.DATETIME(fsp=6),
+    ],
+)
+def t_type_round_trip(spec):
+    assert repr(load_type(dump_type(spec))) == repr(spec)
+
+
+def t_unknown_type():
+    assert load_type({"type": "WARP_CORE"}) is None
+
+
+class TestSchemaCatalog:
+    @pytest.fixture
+    def table(self):
+        return Table("crew", channel=Channel(distro="sqlite"))
+
+    def t_saved_and_loaded(self, tmpdir, table):
+        catalog = SchemaCatalog.in_build_dir(tmpdir)
+        catalog.put(table, {"rank": sa.types.SMALLINT, "name": sa.VARCHAR(50)})
+        catalog.save()
+        loaded = SchemaCatalog.in_build_dir(tmpdir).get(table)
+        assert loaded["rank"] is sa.types.SMALLINT
+        assert loaded["name"].length == 50
+
+    def t_unknown_table(self, tmpdir, table):
+        assert SchemaCatalog.in_build_dir(tmpdir).get(table) is None
+
+    def t_refresh_ignores_record(self, tmpdir, table):
+        catalog = SchemaCatalog.in_build_dir(tmpdir)
+        catalog.put(table, {"rank": sa.types.SMALLINT})
+        catalog.save()
+        assert SchemaCatalog.in_build_dir(tmpdir, refresh=True).get(table) is None
+
+    def t_other_version_ignored(self, tmpdir, table, caplog):
+        path = Path(tmpdir, "catalog.json")
+        path.write_text('{"version": -1, "tables": {}}')
+        assert not len(SchemaCatalog(path))
+        assert "another version" in caplog.text
+
+
+class TestFitDtypes:
+    @pytest.fixture
+    def distro(self):
+        return Distro("postgresql")
+
+    @pytest.fixture
+    def known(self):
+        return {"rank": sa.types.SMALLINT, "name": sa.VARCHAR(50)}
+
+    def t_kept_while_fitting(self, distro, known, monkeypatch):
+        monkeypatch.setattr(distro, "determine_dtypes", None)
+        df = pd.DataFrame({"rank": [1, 2], "name": ["Data", "Trói"]})
+        assert distro.fit_dtypes(df, known) == known
+
+    def t_never_narrowed(self, distro):
+        known = {"name": sa.VARCHAR(200)}
+        df = pd.DataFrame({"name": ["Data"]})
+        assert distro.fit_dtypes(df, known)["name"].length == 200
+
+    def t_widened_on_overflow(self, distro, known):
+        df = pd.DataFrame({"rank": [1, 2 ** 20], "name": ["é" * 30, "Worf"]})
+        dtypes = distro.fit_dtypes(df, known)
+        assert dtypes["rank"] is sa.types.INT
+        assert dtypes["name"].length == 100
+
+    def t_dropped_when_no_longer_whole(self, distro, known):
+        df = pd.DataFrame({"rank": [1.5, 2.0], "name": ["Data", "Worf"]})
+        assert set(distro.fit_dtypes(df, known)) == {"name"}
+
+    def t_dates_outgrown_by_times(self, distro):
+        known = {"stardate": sa.types.DATE}
+        dates = pd.DataFrame({"stardate": pd.to_datetime(["2164-01-01"])})
+        assert distro.fit_dtypes(dates, known) == known
+        times = pd.DataFrame({"stardate": pd.to_datetime(["2164-01-01 10:00"])})
+        assert isinstance(distro.fit_dtypes(times, known)["stardate"], sa.DateTime)
+
+    def t_new_and_empty_columns(self, distro, known):
+        df = pd.DataFrame({"rank": [None, None], "name": ["a", "b"], "age": [1, 2]})
+        dtypes = distro.fit_dtypes(df, known)
+        assert dtypes["rank"] is sa.types.SMALLINT
+        assert dtypes["age"] is sa.types.SMALLINT
+
+
+class TestWriteWithCatalog:
+    @pytest.fixture
+    def narrowing_sqlite(self, monkeypatch):
+        """Let SQLite take (and record) narrowed types like any other distro"""
+        monkeypatch.setattr(SQLite, "determine_dtypes", Distro.determine_dtypes)
+        monkeypatch.setattr(SQLite, "fit_dtypes", Distro.fit_dtypes)
+
+    def t_reused_then_widened(self, tmpdir, narrowing_sqlite, monkeypatch):
+        table = Table("crew", channel=Channel(distro="sqlite"))
+        catalog = SchemaCatalog.in_build_dir(tmpdir)
+        table.write(pd.DataFrame({"rank": [1, 2]}), catalog=catalog)
+        assert catalog.get(table)["rank"] is sa.types.SMALLINT
+
+        with monkeypatch.context() as m:
+            m.setattr(table.distro, "determine_dtypes", None)
+            table.write(pd.DataFrame({"rank": [3, 4]}), catalog=catalog)
+
+        table.write(pd.DataFrame({"rank": [5, 2 ** 20]}), catalog=catalog)
+        assert catalog.get(table)["rank"] is sa.types.INT
+        assert table.read()["rank"].tolist() == [5, 2 ** 20]
+
+    def t_build_saves_catalog(self, tmpdir, minimal_df):
+        minimal_df.to_csv(Path(tmpdir, "a.csv"), index=False)
+        database = Path(tmpdir, "x.db")
+        ini = dedent(
+            f"""\
+            [DEFAULT]
+            distro = sqlite
+            database = {database}
+
+            [load]
+            read = a.csv
+            write = crew
+            """
+        )
+        catalog = SchemaCatalog.in_build_dir(tmpdir)
+        TaskList(ini, location=tmpdir).execute(catalog=catalog)
+        assert SchemaCatalog.in_build_dir(tmpdir).path.exists()
@@ -0,0 +1,132 @@
+import sqlite3
+from pathlib import Path
+from textwrap import dedent
+
+import pandas as pd
+import pytest
+
+from laforge.builder import TaskList
+from laforge.checkpoint import Checkpoint
+from laforge.command import run_cli
+from laforge.results import SpilledResult
+
+BUILD = dedent(
+    """\
+    [one]
+    read = a.csv
+    write = @raw
+
+    [two]
+    read = b.csv
+
+    [three]
+    distro = sqlite
+    database = {}
+    write = b_table
+
+    [four]
+    read = @raw
+    write = a2.csv
+    """
+)
+
+
+@pytest.fixture(scope="function")
+def build(tmpdir, minimal_df):
+    for name in ("a", "b"):
+        minimal_df.to_csv(Path(tmpdir, f"{name}.csv"), index=False)
+    return BUILD.format(Path(tmpdir, "db", "test.db"))
+
+
+def run(build, location, resume=False):
+    task_list = TaskList(build, location=location)
+    checkpoint = Checkpoint.in_build_dir(location, task_list.tasks, resume=resume)
+    task_list.execute(checkpoint=checkpoint)
+    return task_list
+
+
+def fail_then_resume(build, location):
+    with pytest.raises(Exception):
+        run(build, location)
+    Path(location, "db").mkdir()
+    return run(build, location, resume=True)
+
+
+class TestCheckpoint:
+    def t_resume_skips_completed_tasks(self, build, tmpdir):
+        task_list = fail_then_resume(build, tmpdir)
+        executed = [m.identifier for m in task_list.report.tasks]
+        assert executed == ["three.write", "four.read", "four.write"]
+
+    def t_resume_carries_results(self, build, tmpdir, minimal_df):
+        fail_then_resume(build, tmpdir)
+        with sqlite3.connect(str(Path(tmpdir, "db", "test.db"))) as conn:
+            written = pd.read_sql("select * from b_table", conn)
+        assert len(written) == len(minimal_df)
+        assert pd.read_csv(Path(tmpdir, "a2.csv")).equals(minimal_df)
+
+    def t_cleared_after_success(self, build, tmpdir):
+        task_list = fail_then_resume(build, tmpdir)
+        checkpoint = Checkpoint.in_build_dir(tmpdir, task_list.tasks, resume=True)
+        assert not len(checkpoint)
+
+    def t_changed_build_starts_over(self, build, tmpdir, caplog):
+        with pytest.raises(Exception):
+            run(build, tmpdir)
+        Path(tmpdir, "db").mkdir()
+        task_list = run(build.replace("a2.csv", "a3.csv"), tmpdir, resume=True)
+        assert "starting over" in caplog.text
+        assert len(task_list.report) == 6
+
+    def t_changed_connection_starts_over(self, build, tmpdir, caplog):
+        with pytest.raises(Exception):
+            run(build, tmpdir)
+        Path(tmpdir, "db").mkdir()
+        task_list = run(build.replace("test.db", "other.db"), tmpdir, resume=True)
+        assert "starting over" in caplog.text
+        assert len(task_list.report) == 6
+
+    def t_only_carried_results_kept(self, build, tmpdir):
+        with pytest.raises(Exception):
+            run(build, tmpdir)
+        task_list = TaskList(build, location=tmpdir)
+        checkpoint = Checkpoint.in_build_dir(tmpdir, task_list.tasks, resume=True)
+        assert len(checkpoint) == 3
+        assert set(checkpoint.results) == {"one.write", "two.read"}
+
+    def t_spilled_results_left_on_disk(self, build, tmpdir, monkeypatch):
+        loaded = []
+        to_frame = SpilledResult.to_frame
+        monkeypatch.setattr(
+            SpilledResult, "to_frame", lambda x: loaded.append(x) or to_frame(x)
+        )
+        spilling = "[DEFAULT]\nspill_threshold = 1\n\n" + build
+        with pytest.raises(Exception, match="test.db"):
+            run(spilling, tmpdir)
+        assert not loaded
+        task_list = TaskList(spilling, location=tmpdir)
+        checkpoint = Checkpoint.in_build_dir(tmpdir, task_list.tasks, resume=True)
+        assert not checkpoint.results
+
+
+class TestResumeCommand:
+    def t_resume(self, cli_runner, minimal_df):
+        with cli_runner.isolated_filesystem():
+            ini = BUILD.format(Path("db", "test.db").resolve())
+            Path("build.ini").write_text("[DEFAULT]\ncheckpoint = true\n\n" + ini)
+            for name in ("a", "b"):
+                minimal_df.to_csv(f"{name}.csv", index=False)
+            assert cli_runner.invoke(run_cli, ["build", "--local"]).exit_code != 0
+            Path("db").mkdir()
+            result = cli_runner.invoke(run_cli, ["build", "--local", "--resume"])
+            assert result.exit_code == 0
+            assert Path("a2.csv").exists()
+
+    def t_off_by_default(self, cli_runner, minimal_df):
+        with cli_runner.isolated_filesystem():
+            Path("build.ini").write_text("[one]\nread = a.csv\nwrite = a2.csv\n")
+            minimal_df.to_csv("a.csv", index=False)
+            assert cli_runner.invoke(run_cli, ["build", "--local"]).exit_code == 0
+            assert not Path(".laforge", "checkpoint").exists()
+            result = cli_runner.invoke(run_cli, ["build", "--local", "--resume"])
+            assert "checkpoint = true" in result.output
@@ -142,6 +142,21 @@ class TestBuild:
             assert "launched" not in result.output
             assert "launched" not in caplog.text
 
+    def t_jobs(self, cli_runner, barebones_build, caplog):
+        with cli_runner.isolated_filesystem():
+            Path("build.ini").write_text(barebones_build)
+            result = cli_runner.invoke(run_cli, ["build", "--jobs", "2"])
+            assert result.exit_code == 0
+            assert "build.ini completed" in caplog.text
+
+    def t_target(self, cli_runner, barebones_build, caplog):
+        with cli_runner.isolated_filesystem():
+            Path("build.ini").write_text(barebones_build + "[task2]\necho: Engage.\n")
+            result = cli_runner.invoke(run_cli, ["build", "--target", "task2"])
+            assert result.exit_code == 0
+            assert "Engage." in result.output
+            assert "galaxy" not in result.output
+
     def t_dry_run(self, cli_runner, barebones_build, caplog):
         with cli_runner.isolated_filesystem():
             Path("build.ini").write_text(barebones_build)
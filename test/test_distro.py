@@ -1,8 +1,21 @@
+from decimal import Decimal
+from pathlib import Path
+from textwrap import dedent
+
 import pandas as pd
 import pytest
 import sqlalchemy as sa
 
-from laforge.distros import Distro, SQLDistroNotFound, round_up
+from laforge import distros
+from laforge.builder import TaskList
+from laforge.distros import (
+    Distro,
+    DtypeAccumulator,
+    SQLDistroNotFound,
+    SQLite,
+    round_up,
+    utf8_max_length,
+)
 
 
 class TestDistroGet:
@@ -111,3 +124,237 @@ class TestRoundUp:
     )
     def t_rounds_up_fifties(self, n, expected):
         assert round_up(n, nearest=50) == expected
+
+
+class TestUTF8MaxLength:
+    @pytest.mark.parametrize(
+        "values, expected",
+        [
+            (["Geordi", "Data"], 6),
+            (["Worf", "Trói"], 5),
+            (["ééé", "abcd"], 6),
+            ([None, "Data", pd.np.nan], 4),
+            ([["not", "text"], "Data"], 4),
+            ([1, 2], None),
+            ([None], None),
+        ],
+    )
+    @pytest.mark.parametrize("without_isascii", [False, True])
+    def t_bytes_not_characters(self, values, expected, without_isascii, monkeypatch):
+        if without_isascii:  # As before Python 3.7
+            monkeypatch.setattr(distros, "_is_ascii", distros._has_only_ascii)
+        assert utf8_max_length(pd.Series(values, dtype=object)) == expected
+
+
+class TestDetermineDtypes:
+    @pytest.fixture
+    def distro(self):
+        return Distro("mocky")
+
+    @pytest.fixture
+    def df(self):
+        return pd.DataFrame(
+            {
+                "whole": [1.0, 2.0, 3.0],
+                "fraction": [1.0, 2.5, 3.0],
+                "missing": [1.0, pd.np.nan, 3.0],
+                "infinite": [1.0, pd.np.inf, 3.0],
+                "big": [1, 2, 2 ** 40],
+                "text": ["a", "b" * 60, "ç"],
+            }
+        )
+
+    def t_narrowest_types(self, distro, df):
+        dtypes = distro.determine_dtypes(df)
+        assert set(dtypes) == {"whole", "big", "text"}
+        assert dtypes["whole"] is sa.types.SMALLINT
+        assert dtypes["big"] is sa.types.BIGINT
+        assert dtypes["text"].length == 100
+
+    def t_same_types_sampled(self, distro, df):
+        expected = distro.determine_dtypes(df)
+        assert repr(distro.determine_dtypes(df, sample=10)) == repr(expected)
+
+    def t_sample_text(self, distro):
+        df = pd.DataFrame({"text": ["a", "bb"] * 500 + ["b" * 60]})
+        assert distro.determine_dtypes(df)["text"].length == 100
+        assert distro.determine_dtypes(df, sample=10)["text"].length == 50
+
+
+class TestDtypeAccumulator:
+    @pytest.fixture
+    def accumulator(self):
+        return DtypeAccumulator(Distro("mocky"))
+
+    def t_first_chunk_as_determined(self, accumulator):
+        df = pd.DataFrame(
+            {"rank": [1, 2], "ship": [1.5, 2.0], "name": ["Data", "Riker"]}
+        )
+        assert accumulator.update(df) == {}
+        expected = Distro("mocky").determine_dtypes(df)
+        assert repr(accumulator.dtypes) == repr(expected)
+
+    def t_widened_only_when_needed(self, accumulator):
+        accumulator.update(pd.DataFrame({"rank": [1], "name": ["Data"]}))
+        assert accumulator.update(pd.DataFrame({"rank": [2], "name": ["Worf"]})) == {}
+        widened = accumulator.update(
+            pd.DataFrame({"rank": [2 ** 20], "name": ["é" * 40]})
+        )
+        assert widened["rank"] is sa.types.INT
+        assert widened["name"].length == 100
+
+    @pytest.mark.parametrize(
+        "later, expected",
+        [
+            ([1.5], "FLOAT"),
+            ([pd.np.nan, 2.0], "FLOAT"),
+            (["Data"], "TEXT"),
+        ],
+    )
+    def t_falls_back_to_pandas(self, accumulator, later, expected):
+        accumulator.update(pd.DataFrame({"rank": [1, 2]}))
+        widened = accumulator.update(pd.DataFrame({"rank": later}))
+        assert str(sa.types.to_instance(widened["rank"])) == expected
+
+    def t_sized_once_values_arrive(self, accumulator):
+        accumulator.update(pd.DataFrame({"rank": [None, None]}))
+        widened = accumulator.update(pd.DataFrame({"rank": [1, 2]}))
+        assert widened == {"rank": sa.types.SMALLINT}
+        assert accumulator.update(pd.DataFrame({"rank": [3]})) == {}
+
+    def t_known_kept_where_wider(self):
+        known = {"name": sa.VARCHAR(200), "rank": sa.types.SMALLINT}
+        accumulator = DtypeAccumulator(Distro("mocky"), known=known)
+        accumulator.update(pd.DataFrame({"name": ["Data"], "rank": [2 ** 20]}))
+        assert accumulator.dtypes["name"].length == 200
+        assert accumulator.dtypes["rank"] is sa.types.INT
+
+
+class TestRicherTypes:
+    @pytest.fixture
+    def df(self):
+        return pd.DataFrame(
+            {
+                "stardate": pd.to_datetime(["2164-01-01", "2164-02-01"]),
+                "logged": pd.to_datetime(["2164-01-01 10:00", "2164-02-01 00:00"]),
+                "on_duty": [True, False],
+                "pay": [Decimal("1.25"), Decimal("-100.5")],
+                "deck": ["AB", "CD"],
+                "shift": [1, 3],
+                "offset": [-3, 2],
+            }
+        )
+
+    def t_types_beyond_text_and_integers(self, df):
+        dtypes = Distro("mocky").determine_dtypes(df)
+        assert dtypes["stardate"] is sa.types.DATE
+        assert isinstance(dtypes["logged"], sa.types.DateTime)
+        assert dtypes["on_duty"] is sa.types.Boolean
+        assert repr(dtypes["pay"]) == repr(sa.NUMERIC(5, 2))
+        assert repr(dtypes["deck"]) == repr(sa.CHAR(2))
+
+    @pytest.mark.parametrize(
+        "distro, shift, offset",
+        [
+            # Not quite canonical names, which would be skipped off that distro
+            ("postgres", "SMALLINT", "SMALLINT"),
+            ("maria", "TINYINT", "TINYINT"),
+            ("ms sql", "TINYINT", "SMALLINT"),
+        ],
+    )
+    def t_tinyint_where_there_is_one(self, df, distro, shift, offset):
+        dtypes = Distro(distro).determine_dtypes(df)
+        assert dtypes["shift"].__name__ == shift
+        assert dtypes["offset"].__name__ == offset
+
+    def t_distro_timestamps(self, df):
+        assert Distro("mssql").determine_dtypes(df)["logged"].__name__ == "DATETIME2"
+        assert Distro("mysql").determine_dtypes(df)["logged"].fsp is None
+        df["logged"] += pd.Timedelta("500ms")
+        assert Distro("mysql").determine_dtypes(df)["logged"].fsp == 6
+
+    def t_mysql_loads_booleans_as_numbers(self):
+        df = pd.DataFrame(
+            {"on_duty": [True, False], "on_leave": [False, None], "rank": ["1", None]}
+        )
+        distro = Distro("mysql")
+        assert distro.determine_dtypes(df)["on_leave"] is sa.types.Boolean
+        loaded = distro._prepare_rows(df).to_csv(index=False, na_rep=r"\N")
+        assert loaded.splitlines() == ["on_duty,on_leave,rank", "1,0,1", "0,\\N,\\N"]
+
+    def t_bulk_loads_whole_floats_as_integers(self):
+        df = pd.DataFrame({"count": [1.0, 2.0, 3.0], "score": [1.0, None, 3.5]})
+        df["rank"] = [4.0, None, 6.0]
+        distro = Distro("mysql")
+        dtypes = {**distro.determine_dtypes(df), "rank": sa.types.INTEGER()}
+        assert set(dtypes) == {"count", "rank"}
+        expected = ["1,1.0,4", "2,\\N,\\N", "3,3.5,6"]
+        for prepare in (distro._whole_numbers, distro._prepare_rows):
+            loaded = prepare(df, dtypes).to_csv(index=False, header=False, na_rep=r"\N")
+            assert loaded.splitlines() == expected
+        assert df["count"].dtype == "float64"
+
+    @pytest.mark.parametrize(
+        "values, expected",
+        [
+            (["AB", "C"], "VARCHAR(length=50)"),
+            (["AB", None], "VARCHAR(length=50)"),
+            (["ÄB", "CD"], "VARCHAR(length=50)"),
+            (["ABCDEFGHIJK", "ABCDEFGHIJL"], "VARCHAR(length=50)"),
+        ],
+    )
+    def t_char_only_for_short_codes(self, values, expected):
+        df = pd.DataFrame({"deck": values})
+        assert repr(Distro("mocky").determine_dtypes(df)["deck"]) == expected
+
+    @pytest.mark.parametrize(
+        "first, second, expected",
+        [
+            (sa.CHAR(2), sa.CHAR(3), "VARCHAR(length=50)"),
+            (sa.NUMERIC(5, 2), sa.NUMERIC(4, 0), "NUMERIC(precision=6, scale=2)"),
+            (sa.types.DATE, sa.types.DateTime(), "DateTime()"),
+            (sa.types.DATE, sa.types.Boolean, "None"),
+        ],
+    )
+    def t_wider(self, first, second, expected):
+        assert repr(Distro.wider_dtype(first, second)) == expected
+        assert repr(Distro.wider_dtype(second, first)) == expected
+
+
+class TestSQLiteProfile:
+    @staticmethod
+    def pragma(engine, name):
+        with engine.connect() as connection:
+            return connection.execute(sa.text(f"PRAGMA {name}")).scalar()
+
+    def t_bulk_then_restore(self, tmpdir):
+        engine = sa.create_engine(f"sqlite:///{Path(tmpdir, 'bulk.db')}")
+        SQLite.use_profile(engine, "bulk")
+        assert self.pragma(engine, "journal_mode") == "wal"
+        assert self.pragma(engine, "synchronous") == 0
+        SQLite.restore(engine)
+        assert self.pragma(engine, "journal_mode") == "delete"
+        assert self.pragma(engine, "synchronous") == 2
+
+    def t_unknown_profile(self, tmpdir):
+        engine = sa.create_engine(f"sqlite:///{Path(tmpdir, 'bulk.db')}")
+        with pytest.raises(ValueError):
+            SQLite.use_profile(engine, "ludicrous")
+
+    def t_build_with_profile(self, tmpdir):
+        ini = dedent(
+            """\
+            [DEFAULT]
+            distro = sqlite
+            database = {}
+            sqlite_profile = bulk
+
+            [one]
+            read = PRAGMA synchronous;
+            write = synchronous.csv
+            """
+        ).format(Path(tmpdir, "test.db"))
+        TaskList(ini, location=tmpdir).execute()
+        assert pd.read_csv(Path(tmpdir, "synchronous.csv")).iloc[0, 0] == 0
+        assert Path(tmpdir, "test.db").exists()
+        assert not Path(tmpdir, "test.db-wal").exists()
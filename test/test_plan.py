@@ -0,0 +1,93 @@
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+from laforge.builder import TaskList
+from laforge.command import run_cli
+from laforge.plan import BuildPlan, PlannedTask
+
+BUILD = dedent(
+    """\
+    [DEFAULT]
+    out = output
+
+    [one]
+    read = a.csv
+    write = {out}/a2.csv
+
+    [two]
+    read = b.csv
+    write = b2.csv
+    """
+)
+
+
+def load(location, build=BUILD, **kwargs):
+    return TaskList(build, location=location, use_plan=True, **kwargs)
+
+
+def summarize(task_list):
+    return [(t.identifier, t.verb, t.target, t.content) for t in task_list.tasks]
+
+
+class TestBuildPlan:
+    def t_reused(self, tmpdir, caplog):
+        caplog.set_level("DEBUG")
+        compiled = load(tmpdir)
+        assert BuildPlan.path_in(tmpdir).exists()
+        loaded = load(tmpdir)
+        assert "Loaded 4 tasks from" in caplog.text
+        assert loaded._parser is None
+        assert summarize(loaded) == summarize(compiled)
+        assert loaded.tasks[1].content == "output/a2.csv"
+        assert loaded.tasks[0].config is loaded.tasks[1].config
+
+    def t_changed_ini_recompiled(self, tmpdir):
+        load(tmpdir)
+        task_list = load(tmpdir, BUILD.replace("b2.csv", "b3.csv"))
+        assert task_list.tasks[-1].content == "b3.csv"
+
+    def t_changed_env_recompiled(self, tmpdir):
+        Path(tmpdir, ".env").write_text("out = first\n")
+        load(tmpdir)
+        Path(tmpdir, ".env").write_text("out = second\n")
+        assert load(tmpdir).config["out"] == "output"
+        without_default = BUILD.replace("out = output\n", "")
+        assert load(tmpdir, without_default).config["out"] == "second"
+
+    def t_env_values_left_out(self, tmpdir, caplog):
+        caplog.set_level("DEBUG")
+        Path(tmpdir, ".env").write_text("password = Tea.Earl-Grey.Hot\n")
+        load(tmpdir)
+        path = BuildPlan.path_in(tmpdir)
+        assert b"Tea.Earl-Grey.Hot" not in path.read_bytes()
+        assert path.stat().st_mode & 0o777 == 0o600
+        loaded = load(tmpdir)
+        assert "Loaded 4 tasks from" in caplog.text
+        assert loaded.config["password"] == "Tea.Earl-Grey.Hot"
+        assert loaded.tasks[0].config["password"] == "Tea.Earl-Grey.Hot"
+
+    def t_targets_are_part_of_the_key(self, tmpdir):
+        assert len(load(tmpdir, targets=["two"])) == 2
+        assert len(load(tmpdir)) == 4
+
+    def t_unreadable_plan_ignored(self, tmpdir, caplog):
+        load(tmpdir)
+        BuildPlan.path_in(tmpdir).write_bytes(b"garbage")
+        assert len(load(tmpdir)) == 4
+        assert "unreadable" in caplog.text
+
+    def t_slotted(self):
+        with pytest.raises(AttributeError):
+            PlannedTask("x.read", None, None, "", 0).extra = True
+
+
+class TestPlanCommand:
+    def t_shows_plan(self, cli_runner):
+        with cli_runner.isolated_filesystem():
+            Path("build.ini").write_text(BUILD)
+            result = cli_runner.invoke(run_cli, ["plan"])
+            assert result.exit_code == 0
+            assert "4 tasks" in result.output
+            assert "output/a2.csv" in result.output
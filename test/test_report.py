@@ -0,0 +1,103 @@
+import json
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+from laforge.builder import TaskList
+from laforge.command import run_cli
+from laforge.state import BuildState
+
+BUILD = dedent(
+    """\
+    [one]
+    read = a.csv
+    write = a2.csv
+
+    [two]
+    read = a2.csv
+    write = a3.csv
+    """
+)
+
+
+@pytest.fixture(scope="function")
+def task_list(tmpdir, minimal_df):
+    minimal_df.to_csv(Path(tmpdir, "a.csv"), index=False)
+    return TaskList(BUILD, location=tmpdir)
+
+
+class TestBuildReport:
+    def t_measures_each_task(self, task_list, minimal_df):
+        task_list.execute()
+        report = task_list.report
+        assert [m.identifier for m in report.tasks] == [
+            "one.read",
+            "one.write",
+            "two.read",
+            "two.write",
+        ]
+        read, write = report.tasks[:2]
+        assert (read.rows_out, read.columns_out) == minimal_df.shape
+        assert (write.rows_in, write.columns_in) == minimal_df.shape
+        assert read.bytes_read == Path(task_list.location, "a.csv").stat().st_size
+        assert write.bytes_written == Path(task_list.location, "a2.csv").stat().st_size
+        assert read.memory_bytes == minimal_df.memory_usage(deep=False).sum()
+        assert all(m.wall_seconds >= 0 and not m.failed for m in report.tasks)
+
+    def t_skipped_sections(self, task_list):
+        for _ in range(2):
+            task_list.execute(state=BuildState.in_build_dir(task_list.location))
+        assert task_list.report.skipped == ["one", "two"]
+        assert not len(task_list.report)
+
+    def t_failure_recorded(self, tmpdir):
+        task_list = TaskList("[one]\nread = missing.csv\n", location=tmpdir)
+        with pytest.raises(FileNotFoundError):
+            task_list.execute()
+        assert task_list.report.tasks[0].failed
+
+    def t_summary(self, task_list):
+        task_list.execute()
+        summary = task_list.report.summary(limit=2)
+        assert "... and 2 faster task(s)" in summary
+        assert "4 task(s)" in summary
+
+
+class TestReportCommand:
+    def t_writes_json(self, cli_runner, minimal_df):
+        with cli_runner.isolated_filesystem():
+            Path("build.ini").write_text(BUILD)
+            minimal_df.to_csv("a.csv", index=False)
+            result = cli_runner.invoke(
+                run_cli, ["build", "--local", "--report", "report.json"]
+            )
+            assert result.exit_code == 0
+            report = json.loads(Path("report.json").read_text())
+            assert len(report["tasks"]) == 4
+            assert report["tasks"][0]["rows_out"] == len(minimal_df)
+
+
+class TestProfile:
+    def t_profile_per_task(self, task_list, tmpdir):
+        task_list.execute(profile_dir=Path(tmpdir, "profile"))
+        names = sorted(p.name for p in Path(tmpdir, "profile").iterdir())
+        assert names == [
+            "one.read.prof",
+            "one.write.prof",
+            "two.read.prof",
+            "two.write.prof",
+        ]
+        hotspots = task_list.report.hotspots(tasks=1, limit=5)
+        assert "cumulative" in hotspots
+
+    def t_profile_command(self, cli_runner, minimal_df, caplog):
+        with cli_runner.isolated_filesystem():
+            Path("build.ini").write_text(BUILD)
+            minimal_df.to_csv("a.csv", index=False)
+            result = cli_runner.invoke(
+                run_cli, ["build", "--local", "--profile", "--jobs", "2"]
+            )
+            assert result.exit_code == 0
+            assert "Hotspots" in caplog.text
+            assert Path(".laforge", "profile", "one.read.prof").exists()
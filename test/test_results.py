@@ -0,0 +1,234 @@
+import sqlite3
+from pathlib import Path
+from textwrap import dedent
+
+import pandas as pd
+import pytest
+
+from laforge.builder import TaskExecutionError, TaskList, Target
+from laforge.results import (
+    ResultNotFound,
+    ResultRegistry,
+    SpilledResult,
+    StreamedResult,
+    frame_bytes,
+    materialize,
+)
+from laforge.state import BuildState
+
+BUILD = dedent(
+    """\
+    [load]
+    read = a.csv
+    write = @raw
+
+    [elsewhere]
+    read = b.csv
+    write = b2.csv
+
+    [first_use]
+    read = @raw
+    write = a2.csv
+
+    [second_use]
+    read = @raw
+    write = a3.csv
+    """
+)
+
+
+class TestResultRegistry:
+    def t_freed_after_last_reader(self, minimal_df):
+        registry = ResultRegistry()
+        registry.expect("raw", 2)
+        registry.put("raw", minimal_df)
+        assert registry.take("raw").equals(minimal_df)
+        assert "raw" in registry
+        registry.take("raw")
+        assert "raw" not in registry
+
+    def t_unread_results_not_kept(self, minimal_df, caplog):
+        registry = ResultRegistry()
+        registry.put("raw", minimal_df)
+        assert "raw" not in registry
+        assert "No later section" in caplog.text
+
+    def t_missing(self):
+        with pytest.raises(ResultNotFound):
+            ResultRegistry().take("nothing")
+
+    def t_least_recently_used_moved_to_disk(self, tmpdir, minimal_df, medium_df):
+        registry = ResultRegistry(max_bytes=frame_bytes(medium_df), spill_dir=tmpdir)
+        for name in ("small", "medium"):
+            registry.expect(name, 1)
+        registry.put("small", minimal_df)
+        registry.put("medium", medium_df)
+        assert registry.in_memory == frame_bytes(medium_df)
+        assert len(list(Path(tmpdir).iterdir())) == 1
+        assert registry.take("small").equals(minimal_df)
+        assert not list(Path(tmpdir).iterdir())
+
+
+class TestNamedResults:
+    def t_parse(self):
+        assert Target.parse("@raw") is Target.RESULT
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def t_build(self, tmpdir, minimal_df, jobs):
+        for name in ("a", "b"):
+            minimal_df.to_csv(Path(tmpdir, f"{name}.csv"), index=False)
+        task_list = TaskList(BUILD, location=tmpdir)
+        task_list.execute(jobs=jobs)
+        for name in ("a2", "a3", "b2"):
+            assert Path(tmpdir, f"{name}.csv").exists()
+        assert not len(task_list.registry)
+
+    def t_read_without_write(self, tmpdir):
+        task_list = TaskList("[x]\nread = @nothing\n", location=tmpdir)
+        with pytest.raises(TaskExecutionError):
+            task_list.execute()
+
+    def t_incremental_rebuild_reruns_producer(self, tmpdir, minimal_df):
+        for name in ("a", "b"):
+            minimal_df.to_csv(Path(tmpdir, f"{name}.csv"), index=False)
+        TaskList(BUILD, location=tmpdir).execute(state=BuildState.in_build_dir(tmpdir))
+        Path(tmpdir, "a3.csv").unlink()
+        state = BuildState.in_build_dir(tmpdir)
+        TaskList(BUILD, location=tmpdir).execute(state=state)
+        assert set(state.reasons) == {"load", "first_use", "second_use"}
+        assert "needed by [second_use]" in state.reasons["load"]
+
+
+class TestSpilledResult:
+    @pytest.mark.parametrize("arrow", [True, False])
+    def t_round_trip(self, tmpdir, medium_df, monkeypatch, arrow):
+        if not arrow:
+            monkeypatch.setattr(SpilledResult, "_write_arrow", lambda self, df: False)
+        spilled = SpilledResult(medium_df, directory=tmpdir, chunksize=7)
+        assert len(spilled) == len(medium_df)
+        assert len(list(spilled.chunks())) == -(-len(medium_df) // 7)
+        assert materialize(spilled).equals(medium_df.reset_index(drop=True))
+
+    def t_removed_when_discarded(self, tmpdir, minimal_df):
+        spilled = SpilledResult(minimal_df, directory=tmpdir)
+        spilled.discard()
+        assert not spilled.directory.exists()
+
+    def t_build_writes_chunks(self, tmpdir, medium_df):
+        medium_df.to_csv(Path(tmpdir, "a.csv"), index=False)
+        build = dedent(
+            """\
+            [DEFAULT]
+            spill_threshold = 1
+            spill_chunksize = 5
+            distro = sqlite
+            database = {}
+
+            [one]
+            read = a.csv
+            write = a2.csv
+
+            [two]
+            read = a.csv
+            write = spilled
+            """
+        ).format(Path(tmpdir, "test.db"))
+        TaskList(build, location=tmpdir).execute()
+        expected = pd.read_csv(Path(tmpdir, "a.csv"))
+        assert pd.read_csv(Path(tmpdir, "a2.csv")).equals(expected)
+        with sqlite3.connect(str(Path(tmpdir, "test.db"))) as conn:
+            assert len(pd.read_sql("select * from spilled", conn)) == len(expected)
+
+
+class TestStreamedResult:
+    def t_chunks_read_afresh(self, medium_df):
+        stream = StreamedResult(lambda: iter([medium_df.head(3), medium_df.tail(2)]))
+        assert list(stream.columns) == list(medium_df.columns)
+        assert not stream.empty
+        assert len(list(stream.chunks())) == 2
+        assert len(materialize(stream)) == 5
+
+    def t_source_not_reopened_after_first(self, medium_df):
+        opened = []
+
+        def open_chunks():
+            opened.append(True)
+            return iter([medium_df.head(3), medium_df.tail(2)])
+
+        stream = StreamedResult(open_chunks)
+        assert list(stream.columns) == list(medium_df.columns)
+        assert not stream.empty
+        assert len(materialize(stream)) == 5
+        assert len(opened) == 1
+        assert len(materialize(stream)) == 5
+        assert len(opened) == 2
+
+    def t_empty(self):
+        stream = StreamedResult(lambda: iter([]))
+        assert stream.empty
+        assert materialize(stream).empty
+
+    def t_build_streams_csv_to_table_and_back(self, tmpdir, medium_df, caplog):
+        caplog.set_level("DEBUG")
+        medium_df.to_csv(Path(tmpdir, "a.csv"), index=False)
+        build = dedent(
+            """\
+            [DEFAULT]
+            stream = true
+            stream_chunksize = 4
+            distro = sqlite
+            database = {}
+
+            [load]
+            read = a.csv
+            write = streamed
+
+            [unload]
+            read = streamed
+            write = a2.csv
+
+            [query]
+            read = select * from streamed;
+            write = a3.csv
+            """
+        ).format(Path(tmpdir, "test.db"))
+        task_list = TaskList(build, location=tmpdir)
+        task_list.execute()
+        expected = pd.read_csv(Path(tmpdir, "a.csv"))
+        for name in ("a2", "a3"):
+            assert pd.read_csv(Path(tmpdir, f"{name}.csv")).equals(expected)
+        assert "Writing chunk 2 (4 rows) to streamed" in caplog.text
+        assert all(m.rows_out is None for m in task_list.report.tasks)
+
+    @pytest.mark.parametrize("kept", ["", "[keep]\nread = first\nwrite = @first\n"])
+    def t_stream_within_one_sqlite_file(self, tmpdir, medium_df, kept):
+        medium_df.to_csv(Path(tmpdir, "a.csv"), index=False)
+        build = dedent(
+            """\
+            [DEFAULT]
+            stream = true
+            stream_chunksize = 4
+            pushdown = false
+            distro = sqlite
+            database = {}
+
+            [load]
+            read = a.csv
+            write = first
+
+            {}
+            [copy]
+            read = {}
+            write = second
+            """
+        ).format(Path(tmpdir, "test.db"), kept, "@first" if kept else "first")
+        TaskList(build, location=tmpdir).execute()
+        with sqlite3.connect(str(Path(tmpdir, "test.db"))) as connection:
+            copied = pd.read_sql("select * from second", connection)
+        assert copied.equals(pd.read_csv(Path(tmpdir, "a.csv")))
+
+    def t_stream_option(self, tmpdir, minimal_df):
+        minimal_df.to_csv(Path(tmpdir, "a.csv"), index=False)
+        task_list = TaskList("[one]\nread = a.csv\n", location=tmpdir)
+        task_list.execute(stream=True)
+        assert isinstance(task_list.prior_results, StreamedResult)
@@ -0,0 +1,236 @@
+import threading
+import time
+from pathlib import Path
+from textwrap import dedent
+
+import pandas as pd
+import pytest
+
+from laforge.builder import TaskConstructionError, TaskList
+from laforge.schedule import BuildGraph, ParallelScheduler, Resource
+
+
+def file_build(tmpdir, sections):
+    ini = "\n".join(
+        f"[{name}]\n" + "\n".join(f"{k} = {v}" for k, v in options)
+        for name, options in sections
+    )
+    return TaskList(ini, location=tmpdir)
+
+
+@pytest.fixture(scope="function")
+def csv_dir(tmpdir, minimal_df):
+    for name in ("a", "b", "c"):
+        minimal_df.to_csv(Path(tmpdir, f"{name}.csv"), index=False)
+    return tmpdir
+
+
+class TestResource:
+    def t_same_file_overlaps(self):
+        assert Resource("file", None, "x").overlaps(Resource("file", None, "x"))
+
+    def t_different_files_do_not_overlap(self):
+        assert not Resource("file", None, "x").overlaps(Resource("file", None, "y"))
+
+    def t_wildcard_covers_scope(self):
+        anything = Resource("sql", ("mysql", "s", "d"), None)
+        assert anything.overlaps(Resource("sql", ("mysql", "s", "d"), "t"))
+        assert not anything.overlaps(Resource("sql", ("mysql", "s", "e"), "t"))
+
+    def t_everything_covers_everything(self):
+        assert Resource.everything().overlaps(Resource("file", None, "x"))
+
+
+class TestBuildGraph:
+    def t_independent_sections(self, csv_dir):
+        task_list = file_build(
+            csv_dir,
+            [
+                ("one", [("read", "a.csv"), ("write", "a2.csv")]),
+                ("two", [("read", "b.csv"), ("write", "b2.csv")]),
+            ],
+        )
+        graph = BuildGraph(task_list.tasks)
+        assert graph.upstream == {"one": set(), "two": set()}
+
+    def t_read_after_write(self, csv_dir):
+        task_list = file_build(
+            csv_dir,
+            [
+                ("one", [("read", "a.csv"), ("write", "a2.csv")]),
+                ("two", [("read", "a2.csv"), ("write", "b2.csv")]),
+                ("three", [("read", "c.csv"), ("write", "c2.csv")]),
+            ],
+        )
+        graph = BuildGraph(task_list.tasks)
+        assert graph.upstream["two"] == {"one"}
+        assert graph.upstream["three"] == set()
+
+    def t_write_after_read(self, csv_dir):
+        task_list = file_build(
+            csv_dir,
+            [
+                ("one", [("read", "a.csv"), ("write", "a2.csv")]),
+                ("two", [("read", "b.csv"), ("write", "a.csv")]),
+            ],
+        )
+        assert BuildGraph(task_list.tasks).upstream["two"] == {"one"}
+
+    def t_carried_results(self, csv_dir):
+        task_list = file_build(
+            csv_dir,
+            [("one", [("read", "a.csv")]), ("two", [("write", "a2.csv")])],
+        )
+        assert BuildGraph(task_list.tasks).upstream["two"] == {"one"}
+
+    def t_python_is_a_barrier(self, csv_dir):
+        Path(csv_dir, "x.py").write_text("pass")
+        task_list = file_build(
+            csv_dir,
+            [
+                ("one", [("read", "a.csv"), ("write", "a2.csv")]),
+                ("two", [("execute", "x.py")]),
+                ("three", [("read", "b.csv"), ("write", "b2.csv")]),
+            ],
+        )
+        graph = BuildGraph(task_list.tasks)
+        assert graph.upstream["two"] == {"one"}
+        assert graph.upstream["three"] == {"two"}
+
+    def t_echo_has_no_dependencies(self, csv_dir):
+        task_list = file_build(
+            csv_dir,
+            [
+                ("one", [("read", "a.csv"), ("write", "a2.csv")]),
+                ("two", [("echo", "Make it so.")]),
+            ],
+        )
+        assert BuildGraph(task_list.tasks).upstream["two"] == set()
+
+
+class TestParallelScheduler:
+    def t_runs_independent_sections_at_once(self, csv_dir):
+        task_list = file_build(
+            csv_dir,
+            [
+                ("one", [("read", "a.csv"), ("write", "a2.csv")]),
+                ("two", [("read", "b.csv"), ("write", "b2.csv")]),
+            ],
+        )
+        barrier = threading.Barrier(2, timeout=5)
+
+        def run_section(section, prior_results):
+            barrier.wait()
+            return section.name
+
+        scheduler = ParallelScheduler(BuildGraph(task_list.tasks), jobs=2)
+        assert scheduler.run(run_section) == "two"
+
+    def t_waits_for_upstream(self, csv_dir):
+        task_list = file_build(
+            csv_dir,
+            [
+                ("one", [("read", "a.csv")]),
+                ("two", [("write", "a2.csv")]),
+                ("three", [("read", "a2.csv"), ("write", "c2.csv")]),
+            ],
+        )
+        order = []
+
+        def run_section(section, prior_results):
+            time.sleep(0.01 * (3 - section.index))
+            order.append((section.name, prior_results))
+            return section.name
+
+        scheduler = ParallelScheduler(BuildGraph(task_list.tasks), jobs=3)
+        scheduler.run(run_section)
+        assert order == [("one", None), ("two", "one"), ("three", None)]
+
+    def t_failure_stops_dependents(self, csv_dir):
+        task_list = file_build(
+            csv_dir,
+            [
+                ("one", [("read", "a.csv"), ("write", "a2.csv")]),
+                ("two", [("read", "a2.csv"), ("write", "b2.csv")]),
+            ],
+        )
+        ran = []
+
+        def run_section(section, prior_results):
+            ran.append(section.name)
+            raise RuntimeError("Warp core breach")
+
+        scheduler = ParallelScheduler(BuildGraph(task_list.tasks), jobs=2)
+        with pytest.raises(RuntimeError):
+            scheduler.run(run_section)
+        assert ran == ["one"]
+
+
+class TestParallelBuild:
+    def t_execute_with_jobs(self, csv_dir, minimal_df):
+        task_list = file_build(
+            csv_dir,
+            [
+                ("one", [("read", "a.csv"), ("write", "a2.csv")]),
+                ("two", [("read", "b.csv")]),
+                ("three", [("write", "b2.csv")]),
+                ("four", [("read", "a2.csv"), ("write", "a3.csv")]),
+            ],
+        )
+        task_list.execute(jobs=4)
+        for name in ("a2", "a3", "b2"):
+            df = pd.read_csv(Path(csv_dir, f"{name}.csv"))
+            assert (df == minimal_df).all().all()
+
+    def t_memory_sqlite_falls_back(self, tmpdir, caplog):
+        ini = dedent(
+            """\
+            [DEFAULT]
+            distro = sqlite
+            database = :memory:
+
+            [one]
+            read = select 1 as x;
+            """
+        )
+        task_list = TaskList(ini, location=tmpdir)
+        task_list.execute(jobs=2)
+        assert "one section at a time" in caplog.text
+
+
+class TestTargets:
+    SECTIONS = [
+        ("one", [("read", "a.csv"), ("write", "a2.csv")]),
+        ("two", [("read", "b.csv"), ("write", "b2.csv"), ("tags", "daily")]),
+        ("three", [("read", "a2.csv"), ("write", "a3.csv"), ("tags", "daily, pdf")]),
+        ("four", [("read", "c.csv")]),
+        ("five", [("write", "c2.csv")]),
+    ]
+
+    def sections(self, csv_dir, **kwargs):
+        ini = "\n".join(
+            f"[{name}]\n" + "\n".join(f"{k} = {v}" for k, v in options)
+            for name, options in self.SECTIONS
+        )
+        task_list = TaskList(ini, location=csv_dir, **kwargs)
+        return [s.name for s in BuildGraph(task_list.tasks).sections]
+
+    def t_target_with_upstream(self, csv_dir):
+        assert self.sections(csv_dir, targets=["three"]) == ["one", "three"]
+
+    def t_carried_results_are_upstream(self, csv_dir):
+        assert self.sections(csv_dir, targets=["five"]) == ["four", "five"]
+
+    def t_tags(self, csv_dir):
+        assert self.sections(csv_dir, tags=["pdf"]) == ["one", "three"]
+        assert self.sections(csv_dir, tags=["daily"]) == ["one", "two", "three"]
+
+    def t_later_sections_not_loaded(self, csv_dir, caplog):
+        self.sections(csv_dir, targets=["two"])
+        assert "Loading section three" not in caplog.text
+
+    def t_unknown(self, csv_dir):
+        with pytest.raises(TaskConstructionError):
+            self.sections(csv_dir, targets=["six"])
+        with pytest.raises(TaskConstructionError):
+            self.sections(csv_dir, tags=["weekly"])
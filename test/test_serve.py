@@ -0,0 +1,147 @@
+import os
+import socket
+import stat
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from laforge.command import run_cli
+from laforge import serve
+from laforge.serve import BuildClient
+
+needs_unix_sockets = pytest.mark.skipif(
+    not serve.SERVABLE, reason="Requires Unix sockets."
+)
+
+BUILD = "[one]\nread = a.csv\nwrite = a2.csv\n"
+
+
+@pytest.fixture(scope="function")
+def server(tmpdir, monkeypatch):
+    path = Path(tmpdir, "laforge.sock")
+    monkeypatch.setenv("LAFORGE_SOCKET", str(path))
+    server = serve.BuildServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture(scope="function")
+def build_ini(tmpdir, minimal_df):
+    minimal_df.to_csv(Path(tmpdir, "a.csv"), index=False)
+    path = Path(tmpdir, "build.ini")
+    path.write_text(BUILD)
+    return path
+
+
+@needs_unix_sockets
+class TestBuildServer:
+    def t_not_running(self, tmpdir):
+        assert BuildClient.if_running(Path(tmpdir, "nothing.sock")) is None
+
+    def t_builds(self, server, build_ini):
+        lines = []
+        client = BuildClient.if_running()
+        assert client.build(
+            ini=build_ini, log=build_ini.parent / "x.log", echo=lines.append
+        )
+        assert (build_ini.parent / "a2.csv").exists()
+        assert any("completed" in line for line in lines)
+        assert "completed" in (build_ini.parent / "x.log").read_text()
+
+    def t_failure(self, server, build_ini):
+        build_ini.write_text("[one]\nread = missing.csv\n")
+        lines = []
+        client = BuildClient.if_running()
+        assert not client.build(
+            ini=build_ini, log=build_ini.parent / "x.log", echo=lines.append
+        )
+        assert any("Build failed" in line for line in lines)
+
+    def t_only_one_server(self, server):
+        with pytest.raises(FileExistsError):
+            serve.BuildServer(server.path)
+
+    def t_stale_socket_replaced(self, tmpdir):
+        path = Path(tmpdir, "stale.sock")
+        path.write_text("")
+        serve.BuildServer(path).server_close()
+        assert not path.exists()
+
+    def t_socket_for_this_user_alone(self, server):
+        assert not stat.S_IMODE(server.path.stat().st_mode) & 0o077
+
+    def t_default_socket_in_private_directory(self, tmpdir, monkeypatch):
+        monkeypatch.delenv("LAFORGE_SOCKET", raising=False)
+        monkeypatch.setattr(tempfile, "tempdir", str(tmpdir))
+        server = serve.BuildServer()
+        try:
+            assert server.path.parent.parent == Path(tmpdir)
+            assert stat.S_IMODE(server.path.parent.stat().st_mode) == 0o700
+        finally:
+            server.server_close()
+
+    def t_directory_open_to_others_refused(self, tmpdir):
+        path = Path(tmpdir, "open")
+        path.mkdir()
+        path.chmod(0o777)
+        with pytest.raises(PermissionError, match="open to other users"):
+            serve.private_directory(path)
+
+    def t_server_of_another_user_ignored(self, server, monkeypatch):
+        monkeypatch.setattr(os, "getuid", lambda: server.path.stat().st_uid + 1)
+        assert BuildClient.if_running() is None
+        with pytest.raises(PermissionError, match="another user"):
+            BuildClient(server.path).connect()
+
+    def t_refuses_without_unix_sockets(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(serve.BuildServer, "address_family", None)
+        with pytest.raises(OSError, match="Unix sockets"):
+            serve.BuildServer(Path(tmpdir, "laforge.sock"))
+
+
+@needs_unix_sockets
+class TestServeCommand:
+    def t_build_is_sent_to_server(self, cli_runner, server, build_ini):
+        result = cli_runner.invoke(
+            run_cli, ["build", str(build_ini), "--log", str(build_ini.parent / "x.log")]
+        )
+        assert result.exit_code == 0
+        assert "launched" in result.output
+        assert (build_ini.parent / "a2.csv").exists()
+
+    def t_failed_build_exits_nonzero(self, cli_runner, server, build_ini):
+        build_ini.write_text("[one]\nread = missing.csv\n")
+        result = cli_runner.invoke(
+            run_cli, ["build", str(build_ini), "--log", str(build_ini.parent / "x.log")]
+        )
+        assert result.exit_code == 1
+
+    def t_stop(self, cli_runner, server):
+        result = cli_runner.invoke(run_cli, ["serve", "--stop"])
+        assert result.exit_code == 0
+        assert "Stopped" in result.output
+
+
+class TestWithoutUnixSockets:
+    @pytest.fixture(autouse=True)
+    def no_unix_sockets(self, monkeypatch):
+        monkeypatch.delattr(socket, "AF_UNIX", raising=False)
+
+    def t_serve_refuses(self, cli_runner):
+        result = cli_runner.invoke(run_cli, ["serve"])
+        assert result.exit_code == 1
+        assert "Unix sockets" in result.output
+
+    def t_build_runs_locally(self, cli_runner, build_ini, monkeypatch):
+        monkeypatch.setenv("LAFORGE_SOCKET", str(build_ini.parent / "laforge.sock"))
+        result = cli_runner.invoke(
+            run_cli, ["build", str(build_ini), "--log", str(build_ini.parent / "x.log")]
+        )
+        assert result.exit_code == 0
+        assert (build_ini.parent / "a2.csv").exists()
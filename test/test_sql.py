@@ -1,9 +1,16 @@
 import re
+import threading
+from pathlib import Path
+from textwrap import dedent
 
 import pandas as pd
 import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import mssql, mysql, postgresql, sqlite
 from hypothesis import given, settings, strategies
 
+from laforge.builder import TaskConstructionError, TaskExecutionError, TaskList
+from laforge.results import QueryResult, StreamedResult
 from laforge.sql import (
     Channel,
     Identifier,
@@ -14,6 +21,7 @@ from laforge.sql import (
     Table,
     execute,
     is_reserved_word,
+    portable_type,
 )
 
 
@@ -527,6 +535,316 @@ class TestTable:
         with pytest.raises(SQLIdentifierProblem):
             _ = Table("", channel=test_channel)
 
+    @pytest.mark.parametrize("method", [None, "multi"])
+    def t_write_in_chunks(self, arbitrary_table, medium_df, method):
+        arbitrary_table.write(medium_df, chunksize=7, method=method)
+        assert len(arbitrary_table) == len(medium_df)
+        arbitrary_table.drop()
+
+    def t_write_chunks_in_one_pass(self, arbitrary_table, monkeypatch):
+        chunks = [pd.DataFrame({"rank": [1, 2]}), pd.DataFrame({"rank": [2 ** 20]})]
+        read = []
+        altered = []
+
+        def open_chunks():
+            for i, chunk in enumerate(chunks):
+                read.append(i)
+                yield chunk
+
+        def alter_column(table, column, sqltype):
+            altered.append((column, sqltype))
+            return "SELECT 1"
+
+        distro = arbitrary_table.distro
+        monkeypatch.setattr(distro, "alter_column_template", "ALTER {column}")
+        monkeypatch.setattr(distro, "alter_column", alter_column)
+        arbitrary_table.write(StreamedResult(open_chunks))
+        assert read.count(len(chunks) - 1) == 1
+        assert altered == [("rank", sa.types.INT)]
+        assert arbitrary_table.read()["rank"].tolist() == [1, 2, 2 ** 20]
+        arbitrary_table.drop()
+
+    def t_write_adaptively(self, arbitrary_table, medium_df, monkeypatch, caplog):
+        caplog.set_level("INFO")
+        monkeypatch.setattr(Table, "BATCH_BYTES", 1)
+        arbitrary_table.write(medium_df, chunksize="auto", method="multi")
+        assert f"Inserted 1 of {len(medium_df)} rows" in caplog.text
+        assert f"Inserted {len(medium_df)} of {len(medium_df)} rows" in caplog.text
+        assert len(arbitrary_table) == len(medium_df)
+        arbitrary_table.drop()
+
+    @pytest.mark.parametrize("chunksize", [None, 1000])
+    def t_multi_row_inserts_within_parameter_limit(
+        self, arbitrary_table, medium_df, monkeypatch, chunksize
+    ):
+        columns = len(medium_df.columns)
+        monkeypatch.setattr(arbitrary_table.distro, "max_parameters", columns * 3)
+        monkeypatch.setattr(arbitrary_table.distro, "bulk_load", lambda *a, **k: False)
+        chunksizes = []
+        to_sql = pd.DataFrame.to_sql
+
+        def spy(df, *args, **kwargs):
+            chunksizes.append(kwargs.get("chunksize"))
+            return to_sql(df, *args, **kwargs)
+
+        monkeypatch.setattr(pd.DataFrame, "to_sql", spy)
+        arbitrary_table.write(medium_df, chunksize=chunksize, method="multi")
+        assert 3 in chunksizes
+        assert len(arbitrary_table) == len(medium_df)
+        arbitrary_table.drop()
+
+    def t_write_chunks_adaptively(self, arbitrary_table, medium_df, monkeypatch):
+        monkeypatch.setattr(arbitrary_table.distro, "alter_column_template", None)
+        halves = [medium_df.iloc[:5], medium_df.iloc[5:]]
+        arbitrary_table.write(StreamedResult(lambda: iter(halves)), chunksize="auto")
+        assert len(arbitrary_table) == len(medium_df)
+        arbitrary_table.drop()
+
+    def t_sqlite_writes_alone(self, test_distro, arbitrary_table, medium_df, caplog):
+        if test_distro != "sqlite":
+            pytest.skip("Only SQLite refuses parallel writers.")
+        arbitrary_table.write(medium_df, workers=4)
+        assert "one writer at a time" in caplog.text
+        assert len(arbitrary_table) == len(medium_df)
+        arbitrary_table.drop()
+
+    def t_write_partitions_at_once(self, arbitrary_table, medium_df, monkeypatch):
+        barrier = threading.Barrier(2, timeout=5)
+        loaded = []
+
+        def load(df, **kwargs):
+            barrier.wait()
+            loaded.append((len(df), kwargs["if_exists"]))
+
+        monkeypatch.setattr(arbitrary_table, "_load", load)
+        halves = [medium_df.iloc[:5], medium_df.iloc[5:]]
+        arbitrary_table._write_parallel(halves, None, "replace", workers=2)
+        assert sorted(loaded) == sorted((len(x), "append") for x in halves)
+        assert arbitrary_table.exists()
+        arbitrary_table.drop()
+
+    @pytest.mark.parametrize(
+        "rows, elapsed, limit, expected",
+        [(100, 1.0, 10 ** 6, 100), (100, 0.01, 10 ** 6, 200), (100, 10.0, 10 ** 6, 50)],
+    )
+    def t_next_batch_rows(self, rows, elapsed, limit, expected):
+        assert Table._next_batch_rows(rows, elapsed, limit) == expected
+        assert Table._next_batch_rows(rows, elapsed, limit=10) <= 10
+
+    def t_bulk_load_preferred(self, arbitrary_table, minimal_df, monkeypatch):
+        loaded = []
+        monkeypatch.setattr(
+            type(arbitrary_table.distro),
+            "bulk_load",
+            lambda self, table, df, **kwargs: loaded.append(len(df)) or True,
+        )
+        arbitrary_table.write(minimal_df)
+        assert loaded == [len(minimal_df)]
+        assert not arbitrary_table.exists()
+
+    def t_bulk_load_falls_back(self, arbitrary_table, minimal_df, monkeypatch, caplog):
+        def fail(self, table, df, **kwargs):
+            raise RuntimeError("The local_infile setting is disabled")
+
+        monkeypatch.setattr(type(arbitrary_table.distro), "bulk_load", fail)
+        arbitrary_table.write(minimal_df)
+        assert "inserting instead" in caplog.text
+        assert len(arbitrary_table) == len(minimal_df)
+        arbitrary_table.drop()
+
+
+class TestPartitionedRead:
+    @pytest.fixture(scope="function")
+    def keyed_table(self, tmpdir):
+        channel = Channel(distro="sqlite", database=tmpdir / "partitions.db")
+        execute(
+            "create table keyed (id integer primary key, x int, label varchar(10));",
+            channel=channel,
+        )
+        rows = ", ".join(f"({i}, {i % 7 or 'null'}, 'row{i}')" for i in range(1, 101))
+        execute(f"insert into keyed values {rows};", channel=channel)
+        return Table("keyed", channel=channel)
+
+    def t_primary_key_ranges(self, keyed_table):
+        df = keyed_table.read(partitions=4)
+        assert df.equals(keyed_table.read())
+
+    def t_column_ranges_keep_nulls(self, keyed_table):
+        df = keyed_table.read(partitions=3, partition_column="x")
+        assert len(df) == 100
+        assert df.sort_values("id").reset_index(drop=True).equals(keyed_table.read())
+
+    def t_missing_column(self, keyed_table):
+        with pytest.raises(KeyError, match="'rank'"):
+            keyed_table.read(partitions=2, partition_column="rank")
+
+    def t_missing_column_named_with_section(self, keyed_table, tmpdir):
+        build = dedent(
+            """\
+            [DEFAULT]
+            distro = sqlite
+            database = {}
+
+            [crew]
+            read = keyed
+            read_partitions = 2
+            partition_column = rank
+            """
+        ).format(tmpdir / "partitions.db")
+        with pytest.raises(KeyError, match=r"\[crew\] is 'rank'"):
+            TaskList(build, location=tmpdir).execute()
+
+    @pytest.mark.parametrize("partitions", ["0", "two"])
+    def t_partitions_at_least_one(self, tmpdir, partitions):
+        build = f"[crew]\nread = keyed\nread_partitions = {partitions}\n"
+        with pytest.raises(TaskConstructionError, match=r"read_partitions of \[crew\]"):
+            TaskList(build, location=tmpdir)
+
+    def t_no_key_reads_whole(self, keyed_table, caplog):
+        channel = keyed_table.channel
+        execute("create table unkeyed as select * from keyed;", channel=channel)
+        unkeyed = Table("unkeyed", channel=channel)
+        assert len(unkeyed.read(partitions=4)) == 100
+        assert "No integer primary key" in caplog.text
+
+
+class TestPushdown:
+    @pytest.fixture(scope="function")
+    def channel(self, tmpdir, medium_df):
+        channel = Channel(distro="sqlite", database=tmpdir / "pushdown.db")
+        Table("source", channel=channel).write(medium_df)
+        return channel
+
+    def t_copy_on_server(self, channel, medium_df, caplog):
+        caplog.set_level("INFO")
+        target = Table("target", channel=channel)
+        target.write(QueryResult.of_table(Table("source", channel=channel)))
+        assert "on the server" in caplog.text
+        assert target.read().equals(medium_df)
+
+    def t_append_on_server(self, channel, medium_df):
+        target = Table("target", channel=channel)
+        source = QueryResult.of_table(Table("source", channel=channel))
+        target.write(medium_df)
+        target.write(source, if_exists="append")
+        assert len(target) == 2 * len(medium_df)
+        with pytest.raises(ValueError):
+            target.write(source, if_exists="fail")
+
+    @pytest.mark.parametrize("pushdown", ["true", "false"])
+    def t_build(self, tmpdir, channel, medium_df, caplog, pushdown):
+        ini = dedent(
+            """\
+            [DEFAULT]
+            distro = sqlite
+            database = {}
+            pushdown = {}
+
+            [copy]
+            read = source
+            write = target
+            """
+        ).format(Path(tmpdir, "pushdown.db"), pushdown)
+        TaskList(ini, location=tmpdir).execute()
+        assert ("on the server" in caplog.text) == (pushdown == "true")
+        assert Table("target", channel=channel).read().equals(medium_df)
+
+
+class TestExport:
+    @pytest.mark.parametrize("read", ["source", "select * from source;"])
+    def t_same_as_pandas(self, tmpdir, medium_df, caplog, read):
+        channel = Channel(distro="sqlite", database=tmpdir / "export.db")
+        Table("source", channel=channel).write(medium_df)
+        ini = dedent(
+            """\
+            [DEFAULT]
+            distro = sqlite
+            database = {}
+
+            [exported]
+            read = {}
+            write = exported.csv
+
+            [through_pandas]
+            pushdown = false
+            read = {}
+            write = through_pandas.csv
+            """
+        ).format(Path(tmpdir, "export.db"), read, read)
+        caplog.set_level("INFO")
+        TaskList(ini, location=tmpdir).execute()
+        assert caplog.text.count("on the server") == 1
+        exported = pd.read_csv(Path(tmpdir, "exported.csv"))
+        assert exported.equals(pd.read_csv(Path(tmpdir, "through_pandas.csv")))
+        assert len(exported) == len(medium_df)
+
+
+class TestTransfer:
+    INI = dedent(
+        """\
+        [DEFAULT]
+        distro = sqlite
+        database = {mart}
+        source_distro = sqlite
+        source_database = {staging}
+        stream_chunksize = 3
+
+        [copy]
+        transfer = raw -> clean
+        """
+    )
+
+    def t_between_channels(self, tmpdir, medium_df, caplog):
+        paths = {"mart": tmpdir / "mart.db", "staging": tmpdir / "staging.db"}
+        staging = Channel(distro="sqlite", database=paths["staging"])
+        Table("raw", channel=staging).write(medium_df)
+        caplog.set_level("INFO")
+        TaskList(self.INI.format(**paths), location=tmpdir).execute()
+        assert f"Transferred {len(medium_df)} rows" in caplog.text
+        mart = Channel(distro="sqlite", database=paths["mart"])
+        assert Table("clean", channel=mart).read().equals(medium_df)
+
+    def t_source_table_given_directly(self, tmpdir, medium_df):
+        a, b = (Channel(distro="sqlite", database=tmpdir / x) for x in ("a", "b"))
+        source = Table("raw", channel=a)
+        source.write(medium_df)
+        destination = Table("raw", channel=b)
+        assert destination.transfer_from(source, chunksize=4) == len(medium_df)
+        assert destination.transfer_from(source, if_exists="append") == len(medium_df)
+        assert len(destination) == 2 * len(medium_df)
+
+    def t_types_without_generic_form_kept(self):
+        class Bespoke:
+            pass
+
+        bespoke = Bespoke()
+        assert portable_type(bespoke) is bespoke
+        assert isinstance(portable_type(sa.types.INTEGER()), sa.types.Integer)
+
+    @pytest.mark.parametrize(
+        "dialect_type, generic",
+        [
+            (mssql.NVARCHAR(20), sa.types.NVARCHAR(20)),
+            (mssql.DATETIME2(), sa.types.DateTime()),
+            (mysql.TINYINT(), sa.types.Integer()),
+            (postgresql.BYTEA(), sa.types.LargeBinary()),
+            (postgresql.TIMESTAMP(timezone=True), sa.types.TIMESTAMP(timezone=True)),
+        ],
+    )
+    def t_types_mapped_without_as_generic(self, monkeypatch, dialect_type, generic):
+        monkeypatch.delattr(sa.types.TypeEngine, "as_generic", raising=False)
+        portable = portable_type(dialect_type)
+        assert type(portable) is type(generic)
+        assert repr(portable) == repr(generic)
+        assert portable.compile(dialect=sqlite.dialect())
+
+    def t_needs_source(self, tmpdir):
+        ini = self.INI.replace("source_distro = sqlite\n", "").format(
+            mart=tmpdir / "mart.db", staging=tmpdir / "staging.db"
+        )
+        with pytest.raises(TaskExecutionError, match="source_distro"):
+            TaskList(ini, location=tmpdir).execute()
+
 
 class TestReservedWords:
     @pytest.mark.parametrize(
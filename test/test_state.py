@@ -0,0 +1,134 @@
+from pathlib import Path
+from textwrap import dedent
+
+import pandas as pd
+import pytest
+
+from laforge.builder import TaskList
+from laforge.state import BuildState
+
+BUILD = dedent(
+    """\
+    [one]
+    read = a.csv
+    write = a2.csv
+
+    [two]
+    read = a2.csv
+    write = a3.csv
+
+    [three]
+    read = b.csv
+
+    [four]
+    write = b2.csv
+    """
+)
+
+
+@pytest.fixture(scope="function")
+def build_dir(tmpdir, minimal_df):
+    for name in ("a", "b"):
+        minimal_df.to_csv(Path(tmpdir, f"{name}.csv"), index=False)
+    return Path(tmpdir)
+
+
+def run(build_dir, **kwargs):
+    task_list = TaskList(BUILD, location=build_dir)
+    state = BuildState.in_build_dir(build_dir, **kwargs)
+    task_list.execute(state=state)
+    return state
+
+
+def built(state):
+    return set(state.reasons)
+
+
+class TestBuildState:
+    def t_first_build_runs_everything(self, build_dir):
+        state = run(build_dir)
+        assert built(state) == {"one", "two", "three", "four"}
+        assert state.path.exists()
+
+    def t_second_build_skips_everything(self, build_dir):
+        run(build_dir)
+        assert built(run(build_dir)) == set()
+
+    def t_changed_input_rebuilds_downstream(self, build_dir, minimal_df):
+        run(build_dir)
+        minimal_df.head(1).to_csv(build_dir / "a.csv", index=False)
+        state = run(build_dir)
+        assert built(state) == {"one", "two"}
+        assert "a.csv" in state.reasons["one"]
+        assert "upstream" in state.reasons["two"]
+
+    def t_carried_results_rebuild_their_source(self, build_dir):
+        run(build_dir)
+        (build_dir / "b2.csv").unlink()
+        state = run(build_dir)
+        assert built(state) == {"three", "four"}
+        assert "needed by [four]" in state.reasons["three"]
+        assert (build_dir / "b2.csv").exists()
+
+    def t_force(self, build_dir):
+        run(build_dir)
+        assert built(run(build_dir, force=True)) == {"one", "two", "three", "four"}
+
+    def t_explain(self, build_dir, caplog):
+        run(build_dir)
+        caplog.set_level("INFO")
+        run(build_dir, explain=True)
+        assert "Skipping [one]: up to date" in caplog.text
+
+    def t_sql_from_outside_the_build(self, tmpdir):
+        build = dedent(
+            """\
+            [DEFAULT]
+            distro = sqlite
+            database = {}
+
+            [one]
+            read = select 1 as x;
+            write = x.csv
+            """
+        ).format(Path(tmpdir, "test.db"))
+        for _ in range(2):
+            state = BuildState.in_build_dir(tmpdir)
+            TaskList(build, location=tmpdir).execute(state=state)
+        assert state.reasons["one"] == "reads SQL from outside of the build"
+
+    def t_inputs_after_a_script(self, build_dir, minimal_df):
+        (build_dir / "noop.py").write_text("")
+        build = "[script]\nexecute = noop.py\n\n" + BUILD
+        for _ in range(2):
+            state = BuildState.in_build_dir(build_dir)
+            TaskList(build, location=build_dir).execute(state=state)
+        assert not built(state)
+        minimal_df.head(1).to_csv(build_dir / "a.csv", index=False)
+        state = BuildState.in_build_dir(build_dir)
+        TaskList(build, location=build_dir).execute(state=state)
+        assert built(state) == {"one", "two"}
+        assert len(pd.read_csv(build_dir / "a3.csv")) == 1
+
+    def t_sql_scripts_always_run(self, tmpdir):
+        Path(tmpdir, "script.sql").write_text("select 1;")
+        build = dedent(
+            """\
+            [DEFAULT]
+            distro = sqlite
+            database = {}
+
+            [one]
+            execute = script.sql
+            """
+        ).format(Path(tmpdir, "test.db"))
+        for _ in range(2):
+            state = BuildState.in_build_dir(tmpdir)
+            TaskList(build, location=tmpdir).execute(state=state)
+        assert "executes SQL" in state.reasons["one"]
+
+    def t_unreadable_state_is_ignored(self, build_dir, caplog):
+        run(build_dir)
+        BuildState.in_build_dir(build_dir).path.write_text("{{{")
+        assert built(run(build_dir)) == {"one", "two", "three", "four"}
+        assert "unreadable" in caplog.text
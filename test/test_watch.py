@@ -0,0 +1,99 @@
+from pathlib import Path
+from textwrap import dedent
+
+import pandas as pd
+import pytest
+
+from laforge.builder import TaskList
+from laforge.command import run_cli
+from laforge.watch import Watcher, changes, snapshot
+
+BUILD = dedent(
+    """\
+    [one]
+    read = a.csv
+    write = a2.csv
+
+    [two]
+    read = b.csv
+    write = b2.csv
+    """
+)
+
+
+@pytest.fixture(scope="function")
+def watcher(tmpdir, minimal_df):
+    for name in ("a", "b"):
+        minimal_df.to_csv(Path(tmpdir, f"{name}.csv"), index=False)
+    Path(tmpdir, "build.ini").write_text(BUILD)
+    watcher = Watcher(Path(tmpdir, "build.ini"), list_class=TaskList)
+    watcher.build()
+    return watcher
+
+
+class TestSnapshot:
+    def t_changes(self, tmpdir):
+        path = Path(tmpdir, "x.txt")
+        before = snapshot([path])
+        path.write_text("Engage.")
+        assert changes(before, snapshot([path])) == [str(path)]
+        assert not changes(before, before)
+
+
+class TestWatcher:
+    def t_watches_sources_not_outputs(self, watcher):
+        watched = {p.name for p in watcher.watched}
+        assert watched == {"build.ini", "a.csv", "b.csv"}
+
+    def t_rebuilds_only_affected(self, watcher, minimal_df):
+        assert not watcher.changes()
+        minimal_df.head(1).to_csv(watcher.path.parent / "a.csv", index=False)
+        changed = watcher.changes()
+        assert [Path(p).name for p in changed] == ["a.csv"]
+        task_list = watcher.task_list
+        watcher.build(changed)
+        assert set(watcher.state.reasons) == {"one"}
+        assert watcher.task_list is task_list
+
+    def t_rebuilds_after_a_script(self, tmpdir, minimal_df):
+        minimal_df.to_csv(Path(tmpdir, "a.csv"), index=False)
+        Path(tmpdir, "noop.py").write_text("")
+        path = Path(tmpdir, "build.ini")
+        path.write_text(
+            "[script]\nexecute = noop.py\n\n[load]\nread = a.csv\nwrite = a2.csv\n"
+        )
+        watcher = Watcher(path, list_class=TaskList)
+        watcher.build()
+        minimal_df.head(1).to_csv(Path(tmpdir, "a.csv"), index=False)
+        watcher.build(watcher.changes())
+        assert set(watcher.state.reasons) == {"load"}
+        assert len(pd.read_csv(Path(tmpdir, "a2.csv"))) == 1
+
+    def t_changed_ini_reloads(self, watcher):
+        task_list = watcher.task_list
+        watcher.path.write_text(BUILD.replace("b2.csv", "b3.csv"))
+        watcher.build(watcher.changes())
+        assert watcher.task_list is not task_list
+        assert set(watcher.state.reasons) == {"two"}
+        assert (watcher.path.parent / "b3.csv").exists()
+
+    def t_failure_keeps_watching(self, watcher, caplog):
+        watcher.path.write_text("[broken]\nread = missing.csv\n")
+        assert not watcher.build(watcher.changes())
+        assert "Build failed" in caplog.text
+        assert not watcher.changes()
+
+
+class TestWatchCommand:
+    def t_stops_on_interrupt(self, cli_runner, minimal_df, monkeypatch):
+        def interrupt(self):
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(Watcher, "wait", interrupt)
+        with cli_runner.isolated_filesystem():
+            Path("build.ini").write_text(BUILD)
+            for name in ("a", "b"):
+                minimal_df.to_csv(f"{name}.csv", index=False)
+            result = cli_runner.invoke(run_cli, ["build", "--watch"])
+            assert result.exit_code == 0
+            assert Path("b2.csv").exists()